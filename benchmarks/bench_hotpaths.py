@@ -0,0 +1,141 @@
+"""
+热点路径基准测试
+
+用法:
+    python -m benchmarks.bench_hotpaths [--only parse,match] [--output result.json]
+"""
+
+import argparse
+import itertools
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import bench, load_fixture, quiet_logging, write_results
+from informer.config import DingTalkRobot, UserConfig
+from informer.database import Database
+from informer.fetcher import Fetcher
+from informer.notifier import DingTalkNotifier, MultiRobotNotifier
+
+# 生成关键词和标题时使用的词表
+BRANDS = ["rtx", "amd", "intel", "三星", "西数", "海盗船", "华硕", "微星", "技嘉", "索尼",
+          "苹果", "罗技", "雷蛇", "群晖", "铭瑄", "七彩虹", "影驰", "海韵", "猫头鹰", "利民"]
+MODELS = ["4090", "4080", "4070", "7900xtx", "7800x3d", "14900k", "990pro", "sn850x", "ddr5",
+          "b650", "z790", "wh1000xm5", "macbook", "iphone", "g pro", "ds923", "gx1000", "nh-d15"]
+
+
+def bench_parse():
+    """页面解析"""
+    forum_html = load_fixture("forum_list.html")
+    basic_html = load_fixture("thread_basic.html")
+    jammer_html = load_fixture("thread_jammer.html")
+    return [
+        bench("fetcher.parse_forum_content", lambda: Fetcher.parse_forum_content(forum_html), number=20),
+        bench("fetcher.parse_post_content", lambda: Fetcher.parse_post_content(basic_html), number=100),
+        bench("fetcher.extract_post_content", lambda: Fetcher.extract_post_content(basic_html), number=100),
+        bench("fetcher.extract_post_content[jammer]", lambda: Fetcher.extract_post_content(jammer_html), number=50),
+    ]
+
+
+def build_robots(robots=10, users_per_robot=100, keywords_per_user=10, seed=0):
+    """
+    生成机器人配置
+
+    Args:
+        robots: 机器人数量
+        users_per_robot: 每个机器人的用户数
+        keywords_per_user: 每个用户的关键词数
+        seed: 随机种子
+
+    Returns:
+        list: DingTalkRobot 列表
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"{brand}{model}" for brand, model in itertools.product(BRANDS, MODELS)]
+    configs = []
+    for robot_idx in range(robots):
+        users = [
+            UserConfig(
+                phone=f"1{robot_idx:02d}{user_idx:08d}",
+                keywords=rng.sample(vocabulary, keywords_per_user),
+                always_at=user_idx == 0,
+            )
+            for user_idx in range(users_per_robot)
+        ]
+        configs.append(DingTalkRobot(name=f"bench-{robot_idx}", token="t" * 64, secret="s" * 64,
+                                     receive_all=robot_idx % 2 == 0, users=users))
+    return configs
+
+
+def bench_match():
+    """关键词匹配（1000用户、10000关键词）"""
+    notifier = MultiRobotNotifier(build_robots())
+    rng = random.Random(1)
+    titles = []
+    for _ in range(100):
+        if rng.random() < 0.5:
+            titles.append(f"[上海] 出 {rng.choice(BRANDS)} {rng.choice(MODELS)} 自用九成新")
+        else:
+            titles.append(f"[北京] 收 {rng.choice(BRANDS)}{rng.choice(MODELS)} 全新未拆")
+
+    def run():
+        for title in titles:
+            notifier.match_keyword_to_robot(title)
+
+    return [bench("notifier.match_keyword_to_robot[1k users/10k kw]", run, number=3, ops_per_call=len(titles))]
+
+
+def bench_database():
+    """帖子去重表读写"""
+    directory = tempfile.mkdtemp(prefix="informer-bench-")
+    try:
+        database = Database(f"{directory}/posts.db")
+        counter = itertools.count()
+
+        def store():
+            post_id = str(next(counter))
+            database.store_post("bench", post_id, f"标题{post_id}", f"https://www.chiphell.com/thread-{post_id}-1-1.html")
+
+        results = [bench("database.store_post", store, number=200)]
+
+        stored = next(counter)
+        rng = random.Random(2)
+        lookups = [str(rng.randrange(stored * 2)) for _ in range(200)]
+        lookup_iter = itertools.cycle(lookups)
+        results.append(bench("database.is_new_post", lambda: database.is_new_post("bench", next(lookup_iter)), number=500))
+        database.close()
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_signing():
+    """钉钉签名"""
+    robot = DingTalkNotifier("t" * 64, "SEC" + "s" * 61, "bench")
+    return [bench("dingtalk._generate_signature", robot._generate_signature, number=2000)]
+
+
+SUITES = {
+    "parse": bench_parse,
+    "match": bench_match,
+    "database": bench_database,
+    "signing": bench_signing,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点路径基准测试")
+    parser.add_argument("--only", help=f"只运行指定的基准组，逗号分隔，可选: {','.join(SUITES)}")
+    parser.add_argument("--output", help="结果JSON路径，默认写入 benchmarks/results/")
+    args = parser.parse_args()
+
+    quiet_logging()
+    names = args.only.split(",") if args.only else list(SUITES)
+    results = []
+    for name in names:
+        results.extend(SUITES[name]())
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
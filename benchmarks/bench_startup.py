@@ -0,0 +1,96 @@
+"""
+启动耗时基准测试 - 在新的解释器中多次导入入口模块，检查导入耗时预算和不应在启动时加载的重依赖
+
+用法:
+    python -m benchmarks.bench_startup [--repeat 5] [--output result.json]
+"""
+
+import argparse
+import statistics
+import sys
+
+from benchmarks.common import write_results
+from informer.startup import format_report, measure_imports
+
+# 导入耗时预算（秒，取多次测量的最小值，不含解释器自身启动）
+STARTUP_BUDGETS = {
+    "informer.main": 0.8,
+    "informer.monitor": 0.6,
+}
+
+# 这些依赖只在对应功能启用时才应加载
+FORBIDDEN_IMPORTS = {
+    "informer.main": ["openai", "sqlalchemy", "bs4", "requests"],
+    "informer.monitor": ["openai"],
+}
+
+
+def bench_module(module, repeat):
+    """
+    多次测量模块导入耗时
+
+    Args:
+        module: 模块名
+        repeat: 测量次数
+
+    Returns:
+        tuple: (结果字典, 违规信息列表)
+    """
+    imports = []
+    walls = []
+    modules = set()
+    entries = []
+    for _ in range(repeat):
+        wall, entries = measure_imports(module)
+        walls.append(wall)
+        total = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), wall)
+        imports.append(total)
+        modules.update(name for name, _, _, _ in entries)
+
+    best = min(imports)
+    result = {
+        "name": f"startup.import[{module}]",
+        "number": 1,
+        "repeat": repeat,
+        "min": best,
+        "median": statistics.median(imports),
+        "wall_min": min(walls),
+        "budget": STARTUP_BUDGETS.get(module),
+        "modules": len(modules),
+    }
+    print(format_report(module, min(walls), entries, top=10))
+    print()
+
+    violations = []
+    budget = STARTUP_BUDGETS.get(module)
+    if budget is not None and best > budget:
+        violations.append(f"{module} 导入耗时 {best * 1000:.0f} ms 超出预算 {budget * 1000:.0f} ms")
+    for forbidden in FORBIDDEN_IMPORTS.get(module, []):
+        if forbidden in modules:
+            violations.append(f"{module} 启动时加载了 {forbidden}")
+    return result, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的测量次数，默认5")
+    parser.add_argument("--only", help=f"只测量指定的模块，逗号分隔，可选: {','.join(STARTUP_BUDGETS)}")
+    parser.add_argument("--output", help="结果JSON路径，默认写入 benchmarks/results/")
+    args = parser.parse_args()
+
+    modules = args.only.split(",") if args.only else list(STARTUP_BUDGETS)
+    results = []
+    violations = []
+    for module in modules:
+        result, problems = bench_module(module, args.repeat)
+        results.append(result)
+        violations.extend(problems)
+    write_results(results, args.output)
+
+    for violation in violations:
+        print(f"启动预算检查失败: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
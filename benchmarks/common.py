@@ -0,0 +1,123 @@
+"""
+基准测试公共工具 - 计时、夹具加载和结果输出
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from loguru import logger
+
+from informer.logger import set_levels
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+RESULT_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+
+def quiet_logging(level="WARNING"):
+    """
+    降低日志级别，避免日志输出干扰计时
+
+    Args:
+        level: 保留的最低日志级别
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+    set_levels(level)
+
+
+def load_fixture(name):
+    """
+    读取HTML夹具
+
+    Args:
+        name: 夹具文件名
+
+    Returns:
+        str: 文件内容
+    """
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def bench(name, func, number=100, repeat=5, ops_per_call=1):
+    """
+    多轮计时执行函数
+
+    Args:
+        name: 基准名称
+        func: 无参函数
+        number: 每轮调用次数
+        repeat: 轮数
+        ops_per_call: 每次调用包含的操作数，用于计算吞吐量
+
+    Returns:
+        dict: 计时结果，单位为秒
+    """
+    func()  # 预热
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+
+    best = min(rounds)
+    result = {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "min": best,
+        "median": statistics.median(rounds),
+        "mean": statistics.mean(rounds),
+        "stdev": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "ops_per_sec": ops_per_call / best if best > 0 else None,
+    }
+    print(f"{name:<45} {best * 1e6:>12.1f} us/call  {result['ops_per_sec']:>12.1f} ops/s")
+    return result
+
+
+def _git_revision():
+    """获取当前git提交，用于区分结果对应的版本"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def write_results(results, path=None):
+    """
+    将基准结果写为JSON
+
+    Args:
+        results: 基准结果列表
+        path: 输出路径，为空时写入 benchmarks/results/<时间>-<提交>.json
+
+    Returns:
+        str: 输出文件路径
+    """
+    revision = _git_revision()
+    if path is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULT_DIR, f"{stamp}-{revision or 'unknown'}.json")
+
+    document = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入: {path}")
+    return path
@@ -0,0 +1,54 @@
+"""
+对比两次基准测试结果
+
+用法:
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    """
+    读取基准结果
+
+    Args:
+        path: 结果JSON路径
+
+    Returns:
+        dict: 基准名称 -> 单次调用最短耗时（秒），不含压测等没有单次耗时的结果
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    return {item["name"]: item["min"] for item in document["benchmarks"] if "min" in item}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两次基准测试结果")
+    parser.add_argument("baseline", help="基线结果JSON")
+    parser.add_argument("current", help="当前结果JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="耗时增加超过该比例视为退化，默认0.1")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<45} {'仅在一侧存在':>12}")
+            continue
+        change = current[name] / baseline[name] - 1 if baseline[name] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  <-- 退化"
+            regressions.append(name)
+        print(f"{name:<45} {baseline[name] * 1e6:>12.1f} -> {current[name] * 1e6:>12.1f} us  {change:+.1%}{flag}")
+
+    # 存在退化时以非零状态码退出，便于在脚本中使用
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+合成负载压测 - 在本地替身服务上运行真实的 ChiphellMonitor -> MultiRobotNotifier 流程
+
+论坛页面按设定的发帖速率实时生成，机器人、用户和关键词按规模点生成。每个规模点在独立的子进程中运行，
+结束后汇总吞吐量、队列丢弃数、漏报数和从发帖到钉钉替身收到通知的延迟分位数（模拟时间）。
+
+用法:
+    python -m benchmarks.loadgen                                   # 运行默认规模点
+    python -m benchmarks.loadgen --point 100,10,100,10 --point 500,10,100,10 --duration 600
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from benchmarks.bench_hotpaths import BRANDS, MODELS, build_robots
+from benchmarks.common import load_fixture, quiet_logging, write_results
+from benchmarks.replay import SimulatedClock
+from benchmarks.stubs import DingTalkStub, LLMStub, PageStub
+from informer import metrics
+from informer.config import BoardConfig, CatchupConfig, LLMConfig, WaitTimeRange
+from informer.database import Database
+from informer.monitor import ChiphellMonitor
+from informer.notifier import DingTalkNotifier, MultiRobotNotifier
+
+LIST_SIZE = 50  # 列表页显示的帖子数，与论坛一致
+THREAD_LINK = re.compile(r"thread-(\d+)-1-1\.html")
+
+
+@dataclass
+class ScalePoint:
+    posts_per_minute: int  # 每分钟新帖数（模拟时间）
+    robots: int  # 机器人数量
+    users_per_robot: int  # 每个机器人的用户数
+    keywords_per_user: int  # 每个用户的关键词数
+
+    @property
+    def label(self):
+        keywords = self.robots * self.users_per_robot * self.keywords_per_user
+        return f"{self.posts_per_minute}ppm/{self.robots}robots/{self.robots * self.users_per_robot}users/{keywords}kw"
+
+
+DEFAULT_POINTS = [
+    ScalePoint(100, 10, 100, 10),
+    ScalePoint(500, 10, 100, 10),
+    ScalePoint(100, 500, 4, 10),
+    ScalePoint(100, 20, 100, 10),
+]
+
+
+class SyntheticForum:
+    """按固定发帖速率生成列表页和帖子页"""
+
+    def __init__(self, clock, posts_per_minute, seed=0):
+        """
+        初始化合成论坛
+
+        Args:
+            clock: 模拟时钟
+            posts_per_minute: 每分钟新帖数
+            seed: 生成标题的随机种子
+        """
+        self.clock = clock
+        self.start = clock.time()
+        self.interval = 60.0 / posts_per_minute
+        self.seed = seed
+        self.thread_template = load_fixture("thread_basic.html")
+
+    def created_at(self, tid):
+        """帖子的发布时间"""
+        return self.start + tid * self.interval
+
+    def count(self):
+        """截至当前模拟时间已发布的帖子数"""
+        return int((self.clock.time() - self.start) / self.interval) + 1
+
+    def title(self, tid):
+        """帖子标题，约一半可以命中生成的关键词"""
+        brand = BRANDS[(tid * 7 + self.seed) % len(BRANDS)]
+        model = MODELS[(tid * 13 + self.seed) % len(MODELS)]
+        if tid % 2:
+            return f"[上海] 出 {brand}{model} 自用九成新"
+        return f"[北京] 出 {brand} {model} 全新未拆"
+
+    def render(self, path):
+        """按请求路径生成页面"""
+        if path.startswith("/forum-"):
+            return self._render_list()
+        match = THREAD_LINK.search(path)
+        if match:
+            return self._render_thread(int(match.group(1)))
+        return None
+
+    def _render_list(self):
+        newest = self.count()
+        rows = []
+        for tid in range(newest - 1, max(newest - LIST_SIZE, 0) - 1, -1):
+            published = datetime.fromtimestamp(self.created_at(tid)).strftime("%Y-%m-%d %H:%M")
+            rows.append(
+                f'<tbody id="normalthread_{tid}"><tr><th class="new">'
+                f'<a href="thread-{tid}-1-1.html" class="s xst">{self.title(tid)}</a></th>'
+                f'<td class="by"><cite><a>user{tid}</a></cite><em><span title="{published}">刚刚</span></em></td>'
+                f'<td class="num"><a class="xi2">0</a><em>1</em></td></tr></tbody>'
+            )
+        return ('<html><body><table id="threadlisttableid">' + "".join(rows) + "</table></body></html>")
+
+    def _render_thread(self, tid):
+        published = datetime.fromtimestamp(self.created_at(tid)).strftime("%Y-%m-%d %H:%M:%S")
+        return self.thread_template.replace("2024-5-1 12:30:05", published)
+
+
+def _percentile(values, fraction):
+    """最近秩法计算分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_point(point, duration=300.0, speed=10.0, llm_delay=0.0, webhook_delay=0.0, log_level="ERROR"):
+    """
+    运行一个规模点
+
+    Args:
+        point: 规模点
+        duration: 模拟运行时长（秒）
+        speed: 模拟时间加速倍数
+        llm_delay: LLM替身的模拟耗时（真实秒）
+        webhook_delay: 钉钉替身的模拟耗时（真实秒）
+        log_level: 子进程日志级别
+
+    Returns:
+        dict: 规模点的运行结果
+    """
+    quiet_logging(log_level)
+    clock = SimulatedClock(time.time(), speed)
+    forum = SyntheticForum(clock, point.posts_per_minute)
+    pages = PageStub(forum.render).start()
+    dingtalk = DingTalkStub(delay=webhook_delay, clock=clock).start()
+    llm = LLMStub(delay=llm_delay).start()
+    directory = tempfile.mkdtemp(prefix="informer-loadgen-")
+    try:
+        DingTalkNotifier.WEBHOOK_BASE = dingtalk.webhook_base
+        notifier = MultiRobotNotifier(build_robots(point.robots, point.users_per_robot, point.keywords_per_user), clock=clock)
+        monitor = ChiphellMonitor(
+            "",
+            None,
+            notifier,
+            Database(f"{directory}/posts.db"),
+            WaitTimeRange(min=10, max=15),
+            None,
+            LLMConfig(api_key="loadgen", base_url=f"{llm.url}/v1/chat/completions",
+                      model="loadgen", provider="siliconflow"),
+            [BoardConfig(name="合成板块", url=f"{pages.url}/forum-26-1.html")],
+            None,
+            CatchupConfig(enabled=False),
+            clock=clock,
+        )
+
+        threading.Thread(target=monitor.monitor, daemon=True).start()
+        end = clock.start + duration
+        while clock.time() < end:
+            time.sleep(0.2)
+        generated = forum.count()
+
+        # 停止计时后等待队列清空
+        settle = time.monotonic() + 10
+        while time.monotonic() < settle and not monitor.message_queue.empty():
+            time.sleep(0.2)
+        time.sleep(4)  # 消息处理线程每3秒取一批
+
+        # 只统计运行时长内发布的帖子；同一帖子可能推送给多个机器人，以最早到达的一条计算延迟
+        delivered = {}
+        for message in list(dingtalk.messages):
+            for tid in set(THREAD_LINK.findall(json.dumps(message["payload"], ensure_ascii=False))):
+                tid = int(tid)
+                if tid >= generated:
+                    continue
+                if tid not in delivered or message["time"] < delivered[tid]:
+                    delivered[tid] = message["time"]
+        latencies = [max(0.0, arrived - forum.created_at(tid)) for tid, arrived in delivered.items()]
+        stats = monitor.board_stats["合成板块"]
+
+        return {
+            "name": point.label,
+            "point": asdict(point),
+            "simulated_seconds": duration,
+            "speed": speed,
+            "generated_posts": generated,
+            "detected_posts": stats.new_posts,
+            "delivered_posts": len(delivered),
+            "missed_posts": generated - len(delivered),
+            "webhook_messages": len(dingtalk.messages),
+            "queue_dropped": metrics.MESSAGE_QUEUE_DROPPED.value(),
+            "poll_failures": stats.failures,
+            "throughput_per_minute": len(delivered) / duration * 60,
+            "latency_seconds": {
+                "p50": _percentile(latencies, 0.5),
+                "p90": _percentile(latencies, 0.9),
+                "p99": _percentile(latencies, 0.99),
+                "max": max(latencies) if latencies else None,
+            },
+        }
+    finally:
+        # 监控线程会一直运行到子进程退出，停止替身服务后不再输出它们的请求错误
+        quiet_logging("CRITICAL")
+        for stub in (pages, dingtalk, llm):
+            stub.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _parse_point(text):
+    """解析 "每分钟帖数,机器人数,每机器人用户数,每用户关键词数" 格式的规模点"""
+    values = [int(value) for value in text.split(",")]
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError("规模点格式应为 每分钟帖数,机器人数,每机器人用户数,每用户关键词数")
+    return ScalePoint(*values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成负载压测")
+    parser.add_argument("--point", type=_parse_point, action="append",
+                        help="规模点：每分钟帖数,机器人数,每机器人用户数,每用户关键词数，可重复指定")
+    parser.add_argument("--duration", type=float, default=300.0, help="每个规模点的模拟运行时长（秒），默认300")
+    parser.add_argument("--speed", type=float, default=10.0, help="模拟时间加速倍数，默认10")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="LLM替身的耗时（秒）")
+    parser.add_argument("--webhook-delay", type=float, default=0.0, help="钉钉替身的耗时（秒）")
+    parser.add_argument("--output", help="结果JSON路径，默认写入 benchmarks/results/")
+    args = parser.parse_args()
+
+    results = []
+    # 每个规模点使用独立的进程，避免上一轮的监控线程和全局指标影响结果
+    context = multiprocessing.get_context("spawn")
+    for point in args.point or DEFAULT_POINTS:
+        print(f"运行规模点 {point.label} ...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_point, point, args.duration, args.speed,
+                                     args.llm_delay, args.webhook_delay).result()
+        latency = result["latency_seconds"]
+        print(f"  吞吐 {result['throughput_per_minute']:.1f} 帖/分钟，漏报 {result['missed_posts']}，"
+              f"队列丢弃 {result['queue_dropped']:.0f}，延迟 p50={latency['p50']} p90={latency['p90']} p99={latency['p99']}",
+              flush=True)
+        results.append(result)
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
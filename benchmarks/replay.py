@@ -0,0 +1,231 @@
+"""
+录制回放 - 将录制的页面按加速的模拟时间回放给 ChiphellMonitor
+
+钉钉Webhook、代理API和LLM都由本地替身服务代替，整个流程无需访问外部网络。
+
+用法:
+    python -m benchmarks.replay data/recordings/pages.jsonl.gz [--speed 60] [--config data/config.yaml]
+"""
+
+import argparse
+import bisect
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from loguru import logger
+
+from benchmarks.common import quiet_logging
+from benchmarks.stubs import DingTalkStub, LLMStub, ProxyApiStub
+from informer import metrics
+from informer.config import BoardConfig, DingTalkRobot, LLMConfig, WaitTimeRange, load_config
+from informer.database import Database
+from informer.fetcher import Fetcher
+from informer.monitor import DEFAULT_BOARD, ChiphellMonitor
+from informer.notifier import DingTalkNotifier, MultiRobotNotifier
+from informer.proxy_manager import ProxyManager
+from informer.recorder import load_recording
+
+
+class SimulatedClock:
+    """加速的模拟时钟，从录制开始时间起按指定倍速前进"""
+
+    def __init__(self, start, speed=60.0):
+        """
+        初始化模拟时钟
+
+        Args:
+            start: 模拟时间的起点（时间戳）
+            speed: 加速倍数
+        """
+        self.start = start
+        self.speed = speed
+        self.origin = time.monotonic()
+
+    def time(self):
+        """当前模拟时间戳"""
+        return self.start + (time.monotonic() - self.origin) * self.speed
+
+    def sleep(self, seconds):
+        """按模拟时间等待"""
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+
+class ReplayFetcher(Fetcher):
+    """从录制归档中取页面的获取器，同一URL返回模拟时间之前最近一次录制的内容"""
+
+    def __init__(self, records, clock):
+        """
+        初始化回放获取器
+
+        Args:
+            records: 按时间排序的录制记录列表
+            clock: 模拟时钟
+        """
+        super().__init__()
+        self.clock = clock
+        self.pages = {}  # URL -> ([录制时间...], [页面内容...])
+        for record in records:
+            times, bodies = self.pages.setdefault(record["url"], ([], []))
+            times.append(record["time"])
+            bodies.append(record["body"])
+        self.served = {}  # URL -> 上次返回的录制序号，用于模拟304
+        self.misses = 0  # 请求了录制中不存在的页面的次数
+
+    def fetch_with_proxies(self, url, max_retries=3, conditional=False, kind="page"):
+        entry = self.pages.get(url)
+        if entry is None:
+            with self.lock:
+                self.misses += 1
+            raise Exception(f"录制中没有该页面: {url}")
+
+        times, bodies = entry
+        index = max(bisect.bisect_right(times, self.clock.time()) - 1, 0)
+        with self.lock:
+            previous = self.served.get(url)
+            self.served[url] = index
+        if conditional and previous == index:
+            return None
+        return bodies[index]
+
+
+def _histogram_summary(histogram):
+    """汇总直方图各标签的次数和平均值"""
+    summary = {}
+    for key, state in histogram.merged().items():
+        count = sum(state[:-1])
+        label = ",".join(key) or "all"
+        summary[label] = {"count": count, "mean": state[-1] / count if count else None}
+    return summary
+
+
+def replay(path, speed=60.0, config_path=None, board_urls=None, llm=True,
+           llm_delay=0.0, webhook_delay=0.0, settle=5.0):
+    """
+    回放一次录制
+
+    Args:
+        path: 录制归档路径
+        speed: 模拟时间加速倍数
+        config_path: 配置文件路径，提供机器人、轮询间隔等配置；为空时使用一个接收所有通知的机器人
+        board_urls: 监控的板块URL列表，为空时使用配置中的板块或默认二手区
+        llm: 是否启用LLM替身
+        llm_delay: LLM替身的模拟耗时（秒）
+        webhook_delay: 钉钉替身的模拟耗时（秒）
+        settle: 录制结束后等待消息发送完毕的最长真实时间（秒）
+
+    Returns:
+        dict: 回放结果摘要
+    """
+    records = load_recording(path)
+    if not records:
+        raise ValueError(f"录制归档为空: {path}")
+    start, end = records[0]["time"], records[-1]["time"]
+    clock = SimulatedClock(start, speed)
+
+    config = load_config(config_path) if config_path else None
+    if board_urls:
+        boards = [BoardConfig(name=f"回放板块{i + 1}", url=url) for i, url in enumerate(board_urls)]
+    elif config and config.boards:
+        boards = config.boards
+    else:
+        boards = [DEFAULT_BOARD]
+    robots = config.dingtalk.robots if config else [
+        DingTalkRobot(name="回放机器人", token="replay", secret="replay", receive_all=True)
+    ]
+
+    dingtalk = DingTalkStub(delay=webhook_delay, clock=clock).start()
+    proxy_api = ProxyApiStub().start()
+    llm_stub = LLMStub(delay=llm_delay).start() if llm else None
+    directory = tempfile.mkdtemp(prefix="informer-replay-")
+    try:
+        DingTalkNotifier.WEBHOOK_BASE = dingtalk.webhook_base
+        llm_config = None
+        if llm_stub:
+            llm_config = LLMConfig(api_key="replay", base_url=f"{llm_stub.url}/v1/chat/completions",
+                                   model="replay", provider="siliconflow")
+
+        monitor = ChiphellMonitor(
+            "",
+            None,
+            MultiRobotNotifier(robots, clock=clock),
+            Database(f"{directory}/posts.db"),
+            config.wait_time_range if config else WaitTimeRange(min=30, max=60),
+            ProxyManager(proxy_api.url),
+            llm_config,
+            boards,
+            config.adaptive_polling if config else None,
+            config.catchup if config else None,
+            None,
+            config.latency if config else None,
+            clock=clock,
+        )
+        fetcher = ReplayFetcher(records, clock)
+        monitor.fetcher = fetcher
+
+        logger.warning(f"开始回放 {len(records)} 个页面，模拟时长 {end - start:.0f} 秒，加速 {speed} 倍")
+        real_start = time.monotonic()
+        threading.Thread(target=monitor.monitor, daemon=True).start()
+        while clock.time() < end:
+            time.sleep(0.2)
+
+        # 等待队列中剩余的通知发送完毕
+        deadline = time.monotonic() + settle
+        last_count = -1
+        while time.monotonic() < deadline:
+            count = len(dingtalk.messages)
+            if monitor.message_queue.empty() and count == last_count:
+                break
+            last_count = count
+            time.sleep(1)
+
+        stats = {name: dict(vars(board_stats)) for name, board_stats in monitor.board_stats.items()}
+        return {
+            "recording": path,
+            "pages": len(records),
+            "simulated_seconds": end - start,
+            "real_seconds": time.monotonic() - real_start,
+            "speed": speed,
+            "boards": stats,
+            "missing_pages": fetcher.misses,
+            "webhook_messages": len(dingtalk.messages),
+            "llm_requests": llm_stub.requests if llm_stub else 0,
+            "queue_dropped": metrics.MESSAGE_QUEUE_DROPPED.value(),
+            "stage_lag_seconds": _histogram_summary(metrics.POST_STAGE_LAG),
+            "total_lag_seconds": _histogram_summary(metrics.POST_TOTAL_LAG),
+        }
+    finally:
+        for stub in (dingtalk, proxy_api, llm_stub):
+            if stub:
+                stub.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的页面")
+    parser.add_argument("recording", help="录制归档路径（.jsonl.gz）")
+    parser.add_argument("--speed", type=float, default=60.0, help="模拟时间加速倍数，默认60")
+    parser.add_argument("--config", help="配置文件路径，使用其中的机器人和轮询配置")
+    parser.add_argument("--board", action="append", help="监控的板块URL，可重复指定")
+    parser.add_argument("--no-llm", action="store_true", help="不启用LLM替身")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="LLM替身的模拟耗时（秒）")
+    parser.add_argument("--webhook-delay", type=float, default=0.0, help="钉钉替身的模拟耗时（秒）")
+    parser.add_argument("--output", help="将结果摘要写入JSON文件")
+    parser.add_argument("--log-level", default="WARNING", help="日志级别，默认WARNING")
+    args = parser.parse_args()
+
+    quiet_logging(args.log_level)
+    summary = replay(args.recording, args.speed, args.config, args.board, not args.no_llm,
+                     args.llm_delay, args.webhook_delay)
+    text = json.dumps(summary, ensure_ascii=False, indent=2, default=str)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+本地替身服务 - 钉钉Webhook、代理API、LLM和论坛页面
+
+所有服务监听 127.0.0.1 的随机端口，在后台线程中运行，用于回放和压测时替代外部网络。
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """请求处理器，实际逻辑转交给所属的替身服务"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.stub.handle(self, None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.server.stub.handle(self, self.rfile.read(length) if length else b"")
+
+    def log_message(self, format, *args):
+        # 不输出访问日志
+        pass
+
+
+class StubServer:
+    """替身服务基类"""
+
+    def __init__(self, delay=0.0):
+        """
+        初始化替身服务
+
+        Args:
+            delay: 每个请求的模拟处理耗时（秒）
+        """
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        """服务根地址"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, handler, body):
+        """处理一个请求"""
+        with self.lock:
+            self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        status, content_type, payload = self.respond(handler.path, body)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def respond(self, path, body):
+        """
+        生成响应
+
+        Args:
+            path: 请求路径（含查询参数）
+            body: POST请求体，GET请求为None
+
+        Returns:
+            tuple: (状态码, Content-Type, 响应内容)
+        """
+        raise NotImplementedError
+
+
+class DingTalkStub(StubServer):
+    """钉钉Webhook替身，记录收到的每条消息及其到达时间"""
+
+    def __init__(self, delay=0.0, errcode=0, clock=time):
+        """
+        初始化钉钉替身
+
+        Args:
+            delay: 模拟的Webhook耗时（秒）
+            errcode: 返回的错误码，0表示成功
+            clock: 记录到达时间使用的时钟
+        """
+        super().__init__(delay)
+        self.errcode = errcode
+        self.clock = clock
+        self.messages = []  # [{"time", "robot", "payload"}, ...]
+
+    @property
+    def webhook_base(self):
+        """用于 DingTalkNotifier.WEBHOOK_BASE 的地址"""
+        return f"{self.url}/robot/send"
+
+    def respond(self, path, body):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+        message = {
+            "time": self.clock.time(),
+            "robot": query.get("access_token", [""])[0],
+            "payload": json.loads(body or b"{}"),
+        }
+        with self.lock:
+            self.messages.append(message)
+        result = {"errcode": self.errcode, "errmsg": "ok" if self.errcode == 0 else "stub error"}
+        return 200, "application/json", json.dumps(result)
+
+
+class ProxyApiStub(StubServer):
+    """代理API替身，按新版JSON格式返回固定的代理列表"""
+
+    def __init__(self, proxies=None, delay=0.0):
+        """
+        初始化代理API替身
+
+        Args:
+            proxies: 返回的代理地址列表，默认为空
+            delay: 模拟的接口耗时（秒）
+        """
+        super().__init__(delay)
+        self.proxies = list(proxies or [])
+
+    def respond(self, path, body):
+        result = {"code": 200, "data": {"proxies": self.proxies}}
+        return 200, "application/json", json.dumps(result)
+
+
+class LLMStub(StubServer):
+    """
+    LLM替身，兼容OpenAI Chat Completions格式
+
+    OpenAI客户端使用 url + "/v1"，SiliconFlow方式直接使用 url + "/v1/chat/completions"。
+    """
+
+    def __init__(self, delay=0.0, items=None):
+        """
+        初始化LLM替身
+
+        Args:
+            delay: 模拟的推理耗时（秒）
+            items: 返回的商品列表，默认为一个固定商品
+        """
+        super().__init__(delay)
+        self.items = items if items is not None else [{"item_name": "回放商品", "price": "未指定"}]
+
+    def respond(self, path, body):
+        content = json.dumps({"items": self.items}, ensure_ascii=False)
+        result = {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+        return 200, "application/json", json.dumps(result, ensure_ascii=False)
+
+
+class PageStub(StubServer):
+    """论坛页面替身，按路径返回由回调函数生成的HTML"""
+
+    def __init__(self, render, delay=0.0):
+        """
+        初始化页面替身
+
+        Args:
+            render: 回调函数，参数为请求路径，返回HTML字符串，返回None时响应404
+            delay: 模拟的页面耗时（秒）
+        """
+        super().__init__(delay)
+        self.render = render
+
+    def respond(self, path, body):
+        html = self.render(path)
+        if html is None:
+            return 404, "text/plain; charset=utf-8", "not found"
+        return 200, "text/html; charset=utf-8", html
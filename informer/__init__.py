@@ -2,4 +2,8 @@
 Chiphell二手区监控工具
 """
 
-__version__ = "1.0.0" 
\ No newline at end of file
+import time
+
+__version__ = "1.0.0"
+
+IMPORTED_AT = time.perf_counter()  # 包的导入时间，作为启动各阶段耗时的起点
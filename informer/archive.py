@@ -0,0 +1,203 @@
+"""
+帖子归档模块 - 把帖子详情、正文和LLM分析结果压缩后批量写入数据库，
+写入在后台线程中进行，不占用通知路径的时间
+"""
+
+import json
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from loguru import logger
+
+from informer import metrics
+from informer.logger import log_throttled
+from informer.search import item_names
+
+# zstandard为可选依赖，未安装时使用zlib
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+CODECS = ("zstd", "zlib")
+
+
+def resolve_codec(codec):
+    """
+    确定实际使用的压缩算法
+
+    Args:
+        codec: 配置的压缩算法，auto/zstd/zlib
+
+    Returns:
+        str: zstd 或 zlib
+    """
+    if codec == "auto":
+        return "zstd" if ZSTD_AVAILABLE else "zlib"
+    if codec == "zstd" and not ZSTD_AVAILABLE:
+        logger.warning("未安装zstandard，帖子归档改用zlib压缩。请运行 'pip install zstandard'")
+        return "zlib"
+    if codec not in CODECS:
+        raise ValueError(f"不支持的压缩算法: {codec}，可选 auto/{'/'.join(CODECS)}")
+    return codec
+
+
+def compress_text(text, codec="zlib", level=6):
+    """
+    压缩文本
+
+    Args:
+        text: 文本
+        codec: zstd 或 zlib
+        level: 压缩级别
+
+    Returns:
+        bytes: 压缩后的数据
+    """
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def decompress_text(data, codec):
+    """
+    解压文本
+
+    Args:
+        data: 压缩后的数据，为空时返回空字符串
+        codec: 压缩时使用的算法
+
+    Returns:
+        str: 文本
+
+    Raises:
+        RuntimeError: 数据使用zstd压缩但未安装zstandard
+    """
+    if not data:
+        return ""
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("归档使用zstd压缩，需要安装zstandard才能读取")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+
+class ArchiveWriter:
+    """帖子归档写入器，队列中的帖子攒成一批后在一个事务中写入"""
+
+    def __init__(self, database, config):
+        """
+        初始化并启动写入线程
+
+        Args:
+            database: 数据库实例
+            config: ArchiveConfig配置
+        """
+        self.database = database
+        self.codec = resolve_codec(config.codec)
+        self.level = config.level
+        self.batch_size = max(1, config.batch_size)
+        self.flush_interval = config.flush_interval
+        self.queue = queue.Queue(maxsize=config.queue_size)
+        self.written = 0
+        self.thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self.thread.start()
+        logger.info(f"已开启帖子归档，压缩算法: {self.codec}")
+
+    def submit(self, forum, post_id, post, details=None, analysis_result=None):
+        """
+        提交一个帖子，队列已满时丢弃，不阻塞调用方
+
+        Args:
+            forum: 板块名称
+            post_id: 帖子ID
+            post: 帖子基本信息字典（title、link、published_at）
+            details: 帖子详情字典，包含 post_content 正文
+            analysis_result: LLM分析结果
+        """
+        item = (forum, post_id, post.get("title"), post.get("link"), post.get("published_at"),
+                details, analysis_result, time.time())
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            metrics.ARCHIVE_DROPPED.inc()
+            log_throttled("WARNING", "archive-queue-full", "帖子归档队列已满，帖子 {} 未归档", post_id)
+
+    def _encode(self, item):
+        """
+        把队列中的帖子转换为数据库行，压缩在写入线程中完成
+
+        Returns:
+            tuple: (归档行字典, 全文索引用的 (标题, 商品名称, 正文))
+        """
+        forum, post_id, title, url, published_at, details, analysis_result, archived_at = item
+        details = dict(details or {})
+        body = details.pop("post_content", "") or ""
+        if body == "-":
+            body = ""
+        if details.get("published_at") is not None:
+            published_at = details["published_at"]
+        row = {
+            "forum": forum,
+            "post_id": post_id,
+            "title": title,
+            "url": url,
+            "published_at": published_at,
+            "details": json.dumps(details, ensure_ascii=False, default=str) if details else None,
+            "body": compress_text(body, self.codec, self.level) if body else None,
+            "body_codec": self.codec if body else None,
+            "body_length": len(body),
+            "analysis": json.dumps(analysis_result, ensure_ascii=False, default=str) if analysis_result else None,
+            "archived_at": datetime.fromtimestamp(archived_at),
+        }
+        return row, (title or "", item_names(analysis_result), body)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            # 第一个帖子到达后最多再等flush_interval，凑够一批就立即写入
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            rows, documents = zip(*(self._encode(item) for item in batch))
+            with metrics.ARCHIVE_WRITE_DURATION.time():
+                self.written += self.database.archive_posts(list(rows), list(documents))
+        except Exception as e:
+            logger.error(f"写入帖子归档失败，{len(batch)} 个帖子未归档: {e}")
+
+    def close(self, timeout=10):
+        """
+        写入队列中剩余的帖子后停止写入线程
+
+        Args:
+            timeout: 等待的最长时间（秒）
+        """
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("帖子归档队列已满，部分帖子未能在退出前写入")
+        self.thread.join(timeout)
+        logger.info(f"帖子归档已关闭，本次共归档 {self.written} 个帖子")
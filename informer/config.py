@@ -3,11 +3,16 @@
 """
 
 import os
+import threading
 import yaml
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
 from typing import Dict, List, Optional
 from loguru import logger
 
+# 安装了libyaml时使用C加速的加载器，解析大配置文件快一个数量级
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 @dataclass
 class LogConfig:
@@ -17,6 +22,10 @@ class LogConfig:
     max_age: int
     compress: bool
     level: str
+    queue_size: int = 10000  # 每个日志输出的队列长度上限，写出跟不上时按 drop_policy 处理
+    drop_policy: str = "drop_new"  # 队列满时：drop_new 丢弃新日志，drop_oldest 丢弃最早的日志，block 等待
+    module_levels: Dict[str, str] = field(default_factory=dict)  # 按模块覆盖日志级别，如 {"informer.fetcher": "WARNING"}
+    repeat_interval: int = 60  # 代理失败、队列已满等重复日志的限频间隔（秒）
 
 
 @dataclass
@@ -51,6 +60,82 @@ class WaitTimeRange:
     max: int
 
 
+@dataclass
+class AdaptivePollingConfig:
+    enabled: bool = False  # 是否启用自适应轮询
+    floor: int = 15  # 最短轮询间隔（秒）
+    ceiling: int = 300  # 最长轮询间隔（秒）
+    max_requests_per_hour: int = 120  # 每个板块每小时最多轮询次数
+    target_posts_per_poll: float = 0.5  # 每次轮询期望发现的新帖数，用于由发帖速率推算间隔
+    history_days: int = 14  # 学习发帖速率时使用的历史天数
+
+
+@dataclass
+class CatchupConfig:
+    enabled: bool = True  # 是否启用翻页补抓
+    gap_threshold: int = 300  # 距上次成功轮询超过多少秒时补抓（秒）
+    max_pages: int = 5  # 补抓时最多翻到第几页
+    deadline: int = 60  # 单次补抓的最长耗时（秒）
+    concurrency: int = 3  # 并发抓取的页数
+
+
+@dataclass
+class CoordinationConfig:
+    enabled: bool = False  # 是否启用多实例主备协调
+    instance_id: str = ""  # 实例标识，为空时使用 主机名-进程号
+    lease_ttl: int = 15  # 主实例租约有效期（秒），心跳超时后备用实例接管
+    heartbeat_interval: int = 5  # 心跳/抢占间隔（秒）
+
+
+@dataclass
+class RecordingConfig:
+    enabled: bool = False  # 是否录制抓取到的页面，用于离线回放
+    path: str = "data/recordings/pages.jsonl.gz"  # 录制归档路径（gzip压缩的JSON Lines，已存在时追加）
+
+
+@dataclass
+class WebConfig:
+    server: str = "auto"  # Web服务器：auto（能导入waitress时使用waitress）、waitress、development（Werkzeug多线程服务器）
+    host: str = "0.0.0.0"  # 监听地址
+    port: int = 5000  # 监听端口
+    threads: int = 8  # 处理请求的线程数
+    connection_limit: int = 100  # 最大并发连接数（仅waitress）
+    channel_timeout: int = 120  # 空闲keep-alive连接的超时时间（秒，仅waitress）
+    gzip: bool = True  # 是否对文本响应进行gzip压缩
+    gzip_min_size: int = 1024  # 小于该字节数的响应不压缩
+    static_max_age: int = 31536000  # web/static 下静态文件的浏览器缓存时间（秒）
+    metrics_token: str = ""  # /metrics 的访问令牌，为空时不检查令牌
+    metrics_allow: List[str] = field(default_factory=list)  # 不带令牌也能访问 /metrics 的地址或网段，如 127.0.0.1、10.0.0.0/8
+
+
+@dataclass
+class IpcConfig:
+    address: str = "data/informer.sock"  # 分进程运行时监控进程监听的Unix套接字路径
+    authkey: str = ""  # 连接认证密钥；为空时 --split 模式自动生成，单独运行 --monitor/--web 时必须配置
+
+
+@dataclass
+class ArchiveConfig:
+    enabled: bool = True  # 是否归档帖子详情、正文和LLM分析结果
+    codec: str = "auto"  # 正文压缩算法：auto（安装了zstandard时用zstd，否则zlib）/ zstd / zlib
+    level: int = 6  # 压缩级别
+    batch_size: int = 50  # 每批写入的最大帖子数
+    flush_interval: float = 2.0  # 第一个帖子进入队列后最多等待多久写入（秒）
+    queue_size: int = 1000  # 待写入队列长度上限，写入跟不上时丢弃新帖子的归档
+
+
+@dataclass
+class LatencyConfig:
+    slo_seconds: int = 300  # 从发帖到钉钉送达的目标延迟（秒），超过时记录结构化日志
+
+
+@dataclass
+class BoardConfig:
+    name: str  # 板块名称，同时作为数据库中的forum键
+    url: str  # 板块列表页URL（可包含typeid等筛选参数）
+    wait_time_range: Optional[WaitTimeRange] = None  # 该板块的轮询间隔，为空时使用全局配置
+
+
 @dataclass
 class LLMConfig:
     api_key: str
@@ -67,6 +152,15 @@ class Config:
     cookies: str
     wait_time_range: WaitTimeRange
     llm_config: Optional[LLMConfig] = None
+    boards: List[BoardConfig] = field(default_factory=list)  # 监控的板块列表，为空时监控默认二手区
+    adaptive_polling: Optional[AdaptivePollingConfig] = None  # 自适应轮询配置
+    catchup: CatchupConfig = field(default_factory=CatchupConfig)  # 停机或长时间退避后的翻页补抓配置
+    coordination: CoordinationConfig = field(default_factory=CoordinationConfig)  # 多实例主备协调配置
+    latency: LatencyConfig = field(default_factory=LatencyConfig)  # 检测延迟目标配置
+    recording: RecordingConfig = field(default_factory=RecordingConfig)  # 页面录制配置
+    web: WebConfig = field(default_factory=WebConfig)  # Web配置界面的服务配置
+    ipc: IpcConfig = field(default_factory=IpcConfig)  # 分进程运行时的进程间通信配置
+    archive: ArchiveConfig = field(default_factory=ArchiveConfig)  # 帖子归档配置
 
 
 def load_config(config_path="data/config.yaml") -> Config:
@@ -85,7 +179,7 @@ def load_config(config_path="data/config.yaml") -> Config:
     logger.info(f"正在加载配置文件: {config_path}")
 
     with open(config_path, 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=YAML_LOADER)
 
     log_config = LogConfig(
         file=data['log_config']['file'],
@@ -93,7 +187,11 @@ def load_config(config_path="data/config.yaml") -> Config:
         max_backups=data['log_config']['max_backups'],
         max_age=data['log_config']['max_age'],
         compress=data['log_config']['compress'],
-        level=data['log_config']['level']
+        level=data['log_config']['level'],
+        queue_size=data['log_config'].get('queue_size', 10000),
+        drop_policy=data['log_config'].get('drop_policy', "drop_new"),
+        module_levels=data['log_config'].get('module_levels') or {},
+        repeat_interval=data['log_config'].get('repeat_interval', 60)
     )
     logger.info(f"日志配置: 级别={log_config.level}, 文件={log_config.file}")
 
@@ -229,6 +327,57 @@ def load_config(config_path="data/config.yaml") -> Config:
         max=data['wait_time_range']['max']
     )
     
+    # 加载板块配置（如果存在）
+    boards = []
+    for idx, board_data in enumerate(data.get('boards') or []):
+        name = board_data.get('name', f'板块{idx+1}')
+        # 板块名称用于区分统计、调度和已处理帖子的记录，不能重复
+        if any(board.name == name for board in boards):
+            raise ValueError(f"板块名称重复: {name}，每个板块需要使用不同的名称")
+        board_wait = None
+        if 'wait_time_range' in board_data:
+            board_wait = WaitTimeRange(
+                min=board_data['wait_time_range']['min'],
+                max=board_data['wait_time_range']['max']
+            )
+        boards.append(BoardConfig(
+            name=name,
+            url=board_data['url'],
+            wait_time_range=board_wait
+        ))
+        logger.info(f"已配置监控板块 [{boards[-1].name}]: {boards[-1].url}")
+    
+    # 加载自适应轮询配置（如果存在）
+    adaptive_polling = None
+    if 'adaptive_polling' in data:
+        adaptive_polling = AdaptivePollingConfig(**(data['adaptive_polling'] or {}))
+        logger.info(f"自适应轮询: enabled={adaptive_polling.enabled}, 间隔范围={adaptive_polling.floor}-{adaptive_polling.ceiling}秒, 每小时最多{adaptive_polling.max_requests_per_hour}次")
+    
+    # 加载翻页补抓配置（如果存在）
+    catchup = CatchupConfig(**(data.get('catchup') or {}))
+    
+    # 加载多实例协调配置（如果存在）
+    coordination = CoordinationConfig(**(data.get('coordination') or {}))
+    if coordination.enabled:
+        logger.info(f"已启用多实例主备协调，租约有效期: {coordination.lease_ttl}秒")
+    
+    # 加载检测延迟目标配置（如果存在）
+    latency = LatencyConfig(**(data.get('latency') or {}))
+    
+    # 加载页面录制配置（如果存在）
+    recording = RecordingConfig(**(data.get('recording') or {}))
+    if recording.enabled:
+        logger.info(f"已启用页面录制，归档文件: {recording.path}")
+    
+    # 加载Web服务配置（如果存在）
+    web = WebConfig(**(data.get('web') or {}))
+    
+    # 加载进程间通信配置（如果存在）
+    ipc = IpcConfig(**(data.get('ipc') or {}))
+    
+    # 加载帖子归档配置（如果存在）
+    archive = ArchiveConfig(**(data.get('archive') or {}))
+    
     # 加载LLM配置（如果存在）
     llm_config = None
     if 'llm' in data:
@@ -246,5 +395,131 @@ def load_config(config_path="data/config.yaml") -> Config:
         proxy_pool_api=data['proxy_pool_api'],
         cookies=data['cookies'],
         wait_time_range=wait_time_range,
-        llm_config=llm_config
-    ) 
\ No newline at end of file
+        llm_config=llm_config,
+        boards=boards,
+        adaptive_polling=adaptive_polling,
+        catchup=catchup,
+        coordination=coordination,
+        latency=latency,
+        recording=recording,
+        web=web,
+        ipc=ipc,
+        archive=archive
+    ) 
+
+
+def diff_config(old, new):
+    """
+    比较两个配置对象的顶层字段
+
+    Args:
+        old: 旧的Config对象
+        new: 新的Config对象
+
+    Returns:
+        dict: 发生变化的字段 {字段名: (旧值, 新值)}
+    """
+    changes = {}
+    for item in fields(Config):
+        old_value = getattr(old, item.name)
+        new_value = getattr(new, item.name)
+        if old_value != new_value:
+            changes[item.name] = (old_value, new_value)
+    return changes
+
+
+def freeze(value):
+    """
+    将解析出的配置转换为只读视图
+
+    Args:
+        value: YAML解析结果
+
+    Returns:
+        字典转换为MappingProxyType，列表转换为元组，其他值原样返回
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    将只读视图转换回可修改的字典和列表（深拷贝）
+
+    Args:
+        value: freeze返回的只读视图
+
+    Returns:
+        可修改的副本
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigFileCache:
+    """按文件修改时间和大小缓存解析后的YAML配置，文件未变化时不再重复解析"""
+
+    def __init__(self, path):
+        """
+        初始化配置缓存
+
+        Args:
+            path: 配置文件路径
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self._key = None  # (mtime_ns, size)
+        self._data = None  # 只读视图
+
+    def get(self):
+        """
+        获取配置的只读视图
+
+        Returns:
+            MappingProxyType: 只读配置，需要修改时使用copy()
+
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """
+        获取配置的只读视图及其对应的文件版本
+
+        Returns:
+            tuple: (只读配置, (mtime_ns, size))，版本不变时配置内容不变
+
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if key != self._key:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = yaml.load(f, Loader=YAML_LOADER) or {}
+                self._data = freeze(data)
+                self._key = key
+            return self._data, self._key
+
+    def copy(self):
+        """
+        获取配置的可修改副本
+
+        Returns:
+            dict: 配置的深拷贝
+        """
+        return thaw(self.get())
+
+    def invalidate(self):
+        """使缓存失效，下次读取时重新解析"""
+        with self.lock:
+            self._key = None
+            self._data = None
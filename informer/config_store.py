@@ -0,0 +1,218 @@
+"""
+配置存储模块 - 串行化Web界面对配置文件的修改，合并短时间内的多次修改后原子写入
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import yaml
+from loguru import logger
+
+from informer.config import ConfigFileCache, DingTalkRobot, UserConfig, freeze
+
+
+class ConfigUpdateError(Exception):
+    """配置修改请求无效，例如机器人或用户不存在"""
+
+
+def robot_from_dict(robot_dict):
+    """
+    将配置文件中的机器人字典转换为DingTalkRobot
+
+    Args:
+        robot_dict: 机器人配置字典
+
+    Returns:
+        DingTalkRobot: 机器人配置对象
+    """
+    users = []
+    for phone, user_data in (robot_dict.get("users") or {}).items():
+        users.append(UserConfig(
+            phone=str(phone),
+            keywords=list(user_data.get("keywords", [])),
+            always_at=user_data.get("always_at", False),
+            expire_date=user_data.get("expire_date", ""),
+            is_permanent=user_data.get("is_permanent", True)
+        ))
+    return DingTalkRobot(
+        name=robot_dict.get("name", "未命名机器人"),
+        token=robot_dict.get("token", ""),
+        secret=robot_dict.get("secret", ""),
+        enabled=robot_dict.get("enabled", True),
+        receive_all=robot_dict.get("receive_all", True),
+        users=users
+    )
+
+
+class ConfigStore:
+    """配置存储"""
+
+    def __init__(self, path, debounce=0.5, max_delay=2.0, on_robots_changed=None):
+        """
+        初始化配置存储
+
+        Args:
+            path: 配置文件路径
+            debounce: 最后一次修改后等待多久写入文件（秒），期间的修改合并为一次写入
+            max_delay: 第一次未写入的修改最多等待多久（秒），避免持续修改时一直不落盘
+            on_robots_changed: 机器人配置写入后的回调，参数为DingTalkRobot列表
+        """
+        self.path = path
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_robots_changed = on_robots_changed
+        self.cache = ConfigFileCache(path)
+        self.lock = threading.RLock()
+        self._pending = None  # 尚未写入文件的配置字典
+        self._pending_view = None  # _pending的只读视图
+        self._pending_since = None  # 第一次未写入修改的时间
+        self._robots_changed = False
+        self._timer = None
+        self._generation = 0  # 修改次数，用于区分尚未写入文件的不同版本
+        self._instance = os.urandom(4).hex()  # 区分不同进程的未写入版本
+        self._robot_cache = {}  # (名称, token) -> (机器人字典, DingTalkRobot)，用于增量更新通知器
+        atexit.register(self.flush)
+
+    def get(self):
+        """
+        获取当前配置的只读视图，包括尚未写入文件的修改
+
+        Returns:
+            MappingProxyType: 只读配置
+
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """
+        获取当前配置的只读视图及版本号，版本号相同时配置内容相同，可用作HTTP缓存的ETag
+
+        Returns:
+            tuple: (只读配置, 版本号字符串)
+
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        with self.lock:
+            if self._pending is not None:
+                if self._pending_view is None:
+                    self._pending_view = freeze(self._pending)
+                return self._pending_view, f"p{self._instance}-{self._generation}"
+        data, (mtime_ns, size) = self.cache.get_versioned()
+        return data, f"f{mtime_ns}-{size}"
+
+    def update(self, mutation, robots=True):
+        """
+        在锁内修改配置
+
+        Args:
+            mutation: 修改函数，参数为可修改的配置字典，原地修改；请求无效时应在修改前抛出ConfigUpdateError
+            robots: 本次修改是否涉及机器人配置，涉及时写入后通知通知器
+
+        Returns:
+            mutation的返回值
+        """
+        with self.lock:
+            config = self._pending if self._pending is not None else self.cache.copy()
+            result = mutation(config)
+            self._pending = config
+            self._pending_view = None
+            self._generation += 1
+            self._robots_changed = self._robots_changed or robots
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            self._schedule_flush()
+            return result
+
+    def _schedule_flush(self):
+        """重新安排写入时间，持续修改时不超过max_delay"""
+        if self._timer:
+            self._timer.cancel()
+        remaining = self._pending_since + self.max_delay - time.monotonic()
+        self._timer = threading.Timer(max(0.0, min(self.debounce, remaining)), self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """
+        立即写入尚未落盘的修改
+
+        Returns:
+            bool: 是否写入成功（没有待写入的修改时也为True）
+        """
+        with self.lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending is None:
+                return True
+
+            config = self._pending
+            try:
+                self._write(config)
+            except Exception as e:
+                # 保留待写入的修改，下一次修改或退出时重试
+                logger.error(f"保存配置失败: {e}")
+                return False
+
+            robots_changed = self._robots_changed
+            self._pending = None
+            self._pending_view = None
+            self._pending_since = None
+            self._robots_changed = False
+            self.cache.invalidate()
+
+            if robots_changed and self.on_robots_changed:
+                try:
+                    self.on_robots_changed(self._build_robots(config))
+                except Exception as e:
+                    logger.error(f"更新通知器机器人配置失败: {e}")
+        return True
+
+    def _write(self, config):
+        """先写入同目录的临时文件再重命名覆盖，避免读到写了一半的配置"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_path, os.stat(self.path).st_mode & 0o777)
+        except OSError:
+            pass
+        try:
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            # 单独挂载的配置文件无法被重命名覆盖，退回到原地写入
+            logger.warning(f"无法原子替换配置文件，改为原地写入: {e}")
+            with open(self.path, 'w', encoding='utf-8') as f:
+                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            os.remove(temp_path)
+
+    def _build_robots(self, config):
+        """
+        转换机器人配置，未变化的机器人复用上次转换的对象
+
+        Args:
+            config: 配置字典
+
+        Returns:
+            list: DingTalkRobot 列表
+        """
+        robots = []
+        cache = {}
+        for robot_dict in (config.get("dingtalk") or {}).get("robots") or []:
+            key = (robot_dict.get("name"), robot_dict.get("token"))
+            cached = self._robot_cache.get(key)
+            if cached and cached[0] == robot_dict:
+                robot = cached[1]
+            else:
+                robot = robot_from_dict(robot_dict)
+            cache[key] = (robot_dict, robot)
+            robots.append(robot)
+        self._robot_cache = cache
+        return robots
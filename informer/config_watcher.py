@@ -0,0 +1,127 @@
+"""
+配置监视模块 - 配置文件变化时计算差异并应用到运行中的组件
+"""
+
+import os
+import threading
+import time
+
+from loguru import logger
+
+from informer.config import diff_config, load_config
+
+# inotify为可选依赖，未安装或非Linux系统时退回到按修改时间轮询
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+
+class ConfigWatcher:
+    """配置文件监视器"""
+
+    def __init__(self, path, config, on_change, interval=2.0, debounce=0.5):
+        """
+        初始化配置监视器
+
+        Args:
+            path: 配置文件路径
+            config: 当前生效的Config对象
+            on_change: 回调函数，参数为 {字段名: (旧值, 新值)}
+            interval: 轮询间隔（秒），使用inotify时为两次检查之间的最长等待时间
+            debounce: 检测到变化后等待写入完成的时间（秒）
+        """
+        self.path = os.path.abspath(path)
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.running = False
+        self.thread = None
+        self._key = self._stat_key()
+
+    def _stat_key(self):
+        """文件的 (修改时间, 大小)，文件不存在时为None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start(self):
+        """启动监视线程"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"配置文件监视器已启动（{'inotify' if INOTIFY_AVAILABLE else '按修改时间轮询'}）: {self.path}")
+
+    def stop(self):
+        """停止监视线程"""
+        self.running = False
+
+    def _run(self):
+        inotify = None
+        if INOTIFY_AVAILABLE:
+            try:
+                inotify = INotify()
+                # 监视所在目录，编辑器通常先写临时文件再重命名覆盖
+                inotify.add_watch(os.path.dirname(self.path),
+                                  inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE)
+            except Exception as e:
+                logger.warning(f"初始化inotify失败，改为按修改时间轮询: {e}")
+                inotify = None
+
+        name = os.path.basename(self.path)
+        while self.running:
+            try:
+                if inotify:
+                    events = inotify.read(timeout=int(self.interval * 1000))
+                    if events and not any(event.name == name for event in events):
+                        continue
+                else:
+                    time.sleep(self.interval)
+                self.check()
+            except Exception as e:
+                logger.error(f"检查配置文件变化时出错: {e}")
+                time.sleep(self.interval)
+
+        if inotify:
+            inotify.close()
+
+    def check(self):
+        """
+        检查配置文件是否变化，变化时重新加载并回调差异
+
+        Returns:
+            dict: 本次检测到的差异，没有变化时为空字典
+        """
+        key = self._stat_key()
+        if key is None or key == self._key:
+            return {}
+
+        # 等待写入完成，避免读到写了一半的文件
+        time.sleep(self.debounce)
+        key = self._stat_key()
+        self._key = key
+
+        try:
+            new_config = load_config(self.path)
+        except Exception as e:
+            logger.error(f"重新加载配置文件失败，继续使用当前配置: {e}")
+            return {}
+
+        changes = diff_config(self.config, new_config)
+        self.config = new_config
+        if not changes:
+            logger.debug("配置文件已修改，但解析后的配置没有变化")
+            return {}
+
+        logger.info(f"检测到配置变化: {', '.join(changes)}")
+        try:
+            self.on_change(changes)
+        except Exception as e:
+            logger.error(f"应用配置变化时出错: {e}")
+        return changes
@@ -0,0 +1,114 @@
+"""
+协调模块 - 基于共享SQLite数据库的多实例主备协调
+"""
+
+import os
+import socket
+import threading
+import time
+from loguru import logger
+
+
+class Coordinator:
+    """多实例协调器：租约选主 + 帖子通知认领"""
+    
+    LEASE_NAME = "monitor"
+    
+    def __init__(self, database, config):
+        """
+        初始化协调器
+        
+        Args:
+            database: 共享的数据库实例
+            config: 协调配置 (CoordinationConfig)
+        """
+        self.database = database
+        self.config = config
+        self.instance_id = config.instance_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_expires = 0  # 本实例持有的租约到期时间戳
+        self.leader_event = threading.Event()  # 成为主实例时置位
+        self.running = False
+    
+    def start(self):
+        """启动心跳线程，并立即尝试一次抢占"""
+        if self.running:
+            return
+        self.running = True
+        self._safe_heartbeat()
+        
+        def heartbeat_loop():
+            while self.running:
+                time.sleep(self.config.heartbeat_interval)
+                self._safe_heartbeat()
+        
+        thread = threading.Thread(target=heartbeat_loop, daemon=True)
+        thread.start()
+        logger.info(f"多实例协调器已启动，实例标识: {self.instance_id}")
+    
+    def stop(self):
+        """停止心跳并释放租约"""
+        self.running = False
+        if self.is_leader():
+            self.database.release_lease(self.LEASE_NAME, self.instance_id)
+            logger.info("已释放主实例租约")
+        self.lease_expires = 0
+        self.leader_event.clear()
+    
+    def _safe_heartbeat(self):
+        """执行一次心跳，出错时记录日志，心跳线程继续运行"""
+        try:
+            self._heartbeat()
+        except Exception:
+            logger.exception("主实例租约心跳失败，将在下一次心跳时重试")
+    
+    def _heartbeat(self):
+        """续约或抢占租约，并在角色变化时记录日志"""
+        was_leader = self.is_leader()
+        now = time.time()
+        acquired = self.database.acquire_lease(self.LEASE_NAME, self.instance_id, self.config.lease_ttl)
+        
+        if acquired:
+            self.lease_expires = now + self.config.lease_ttl
+            self.leader_event.set()
+            if not was_leader:
+                logger.info(f"实例 {self.instance_id} 成为主实例，开始轮询")
+        else:
+            self.lease_expires = 0
+            self.leader_event.clear()
+            if was_leader:
+                logger.warning(f"实例 {self.instance_id} 失去主实例租约，转为备用")
+    
+    def is_leader(self):
+        """
+        当前实例是否为主实例
+        
+        Returns:
+            bool: 持有未过期的租约时返回True
+        """
+        return time.time() < self.lease_expires
+    
+    def wait_for_leadership(self, timeout=None):
+        """
+        等待成为主实例
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            bool: 是否为主实例
+        """
+        self.leader_event.wait(timeout)
+        return self.is_leader()
+    
+    def claim_post(self, forum, post_id):
+        """
+        在通知前认领帖子，保证同一帖子只由一个实例发送通知
+        
+        Args:
+            forum: 论坛名称
+            post_id: 帖子ID
+            
+        Returns:
+            bool: 是否认领成功
+        """
+        return self.database.claim_post(forum, post_id, self.instance_id)
@@ -4,11 +4,19 @@
 
 import os
 import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+import json
+import threading
+import time
+from sqlalchemy import create_engine, event, func, text, update, Column, Integer, String, DateTime, Float, Text, LargeBinary, UniqueConstraint
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from loguru import logger
 
+from informer import metrics
+from informer.search import SEGMENT_VERSION, build_match_query, item_names, make_snippet, segment
+
 Base = declarative_base()
 
 
@@ -27,6 +35,60 @@ class Post(Base):
         return f"<Post(forum='{self.forum}', post_id='{self.post_id}', title='{self.title}')>"
 
 
+class LeaderLease(Base):
+    """多实例主备选举租约"""
+    __tablename__ = 'leader_leases'
+    
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(Float, nullable=False)  # 租约到期时间戳
+    heartbeat_at = Column(Float, nullable=False)  # 最近一次心跳时间戳
+
+
+class NotificationClaim(Base):
+    """帖子通知认领记录，唯一约束保证每个帖子只由一个实例通知"""
+    __tablename__ = 'notification_claims'
+    __table_args__ = (UniqueConstraint('forum', 'post_id', name='uq_claim_forum_post'),)
+    
+    id = Column(Integer, primary_key=True)
+    forum = Column(String(50), nullable=False)
+    post_id = Column(String(50), nullable=False)
+    holder = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+
+class ExpiryNotice(Base):
+    """已发送的订阅过期提醒，同一有效期的同一类提醒只发送一次"""
+    __tablename__ = 'expiry_notices'
+    __table_args__ = (UniqueConstraint('robot', 'phone', 'kind', 'expire_date', name='uq_expiry_notice'),)
+    
+    id = Column(Integer, primary_key=True)
+    robot = Column(String(100), nullable=False, index=True)
+    phone = Column(String(50), nullable=False)
+    kind = Column(String(20), nullable=False)  # 提醒类型，如 expired、warn_3、warn_7
+    expire_date = Column(String(10), nullable=False)  # 发送提醒时的有效期，续期后会重新提醒
+    sent_at = Column(DateTime, default=datetime.datetime.now)
+
+
+class PostArchive(Base):
+    """帖子归档：详情、压缩后的正文和LLM分析结果，用于重新分析、搜索和统计"""
+    __tablename__ = 'post_archive'
+    __table_args__ = (UniqueConstraint('forum', 'post_id', name='uq_archive_forum_post'),)
+    
+    id = Column(Integer, primary_key=True)
+    forum = Column(String(50), nullable=False)
+    post_id = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=True)
+    url = Column(String(255), nullable=True)
+    published_at = Column(Float, nullable=True)  # 发帖时间戳，未知时为空
+    details = Column(Text, nullable=True)  # 帖子详情JSON（QQ、电话、价格等，不含正文）
+    body = Column(LargeBinary, nullable=True)  # 压缩后的正文
+    body_codec = Column(String(10), nullable=True)  # 正文压缩算法，zstd 或 zlib
+    body_length = Column(Integer, default=0)  # 正文字符数
+    analysis = Column(Text, nullable=True)  # LLM分析结果JSON
+    archived_at = Column(DateTime, default=datetime.datetime.now, index=True)
+
+
 class Database:
     """数据库操作类"""
     
@@ -42,6 +104,7 @@ class Database:
         
         # 创建数据库引擎
         self.engine = create_engine(f"sqlite:///{db_path}")
+        self._instrument_engine()
         
         # 创建表
         Base.metadata.create_all(self.engine)
@@ -49,6 +112,61 @@ class Database:
         # 创建会话
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
+        
+        # 会话在多个板块监控线程间共享，需要加锁
+        self.lock = threading.RLock()
+        
+        self.search_enabled = self._create_search_index()
+    
+    def _create_search_index(self):
+        """
+        创建帖子归档的全文索引，首次创建或分词规则变化时为已有的归档重建索引
+        
+        Returns:
+            bool: SQLite是否支持FTS5
+        """
+        # 不保存原文的FTS5表（content=''），rowid与post_archive.id对应，显示内容从post_archive读取；
+        # 建立索引时使用的分词规则版本记录在 PRAGMA user_version 中
+        try:
+            with self.engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_search'")
+                ).first() is not None
+                version = connection.execute(text("PRAGMA user_version")).scalar()
+                if not exists:
+                    connection.execute(text(
+                        "CREATE VIRTUAL TABLE post_search USING fts5("
+                        "title, items, body, content='', tokenize='unicode61 remove_diacritics 2')"
+                    ))
+        except Exception as e:
+            logger.warning(f"SQLite不支持FTS5，帖子搜索不可用: {e}")
+            return False
+        
+        if not exists or version != SEGMENT_VERSION:
+            count = self.rebuild_search_index(enabled=True)
+            with self.engine.begin() as connection:
+                connection.execute(text(f"PRAGMA user_version = {SEGMENT_VERSION}"))
+            if count:
+                logger.info(f"已为 {count} 个已归档的帖子建立全文索引")
+        return True
+    
+    def _instrument_engine(self):
+        """记录每条SQL语句的执行耗时"""
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+        
+        @event.listens_for(self.engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            metrics.DB_QUERY_DURATION.observe(elapsed, operation=operation)
+        
+        @event.listens_for(self.engine, "handle_error")
+        def handle_error(context):
+            starts = context.connection.info.get("query_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
     
     def is_new_post(self, forum, post_id):
         """
@@ -61,10 +179,11 @@ class Database:
         Returns:
             bool: 是否为新帖子
         """
-        return self.session.query(Post).filter(
-            Post.forum == forum,
-            Post.post_id == post_id
-        ).first() is None
+        with self.lock:
+            return self.session.query(Post).filter(
+                Post.forum == forum,
+                Post.post_id == post_id
+            ).first() is None
     
     def store_post(self, forum, post_id, title=None, url=None):
         """
@@ -76,13 +195,424 @@ class Database:
             title: 帖子标题
             url: 帖子链接
         """
-        post = Post(forum=forum, post_id=post_id, title=title, url=url)
-        self.session.add(post)
-        try:
-            self.session.commit()
-        except Exception as e:
-            self.session.rollback()
-            logger.error(f"存储帖子失败: {e}")
+        with self.lock:
+            post = Post(forum=forum, post_id=post_id, title=title, url=url)
+            self.session.add(post)
+            try:
+                self.session.commit()
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"存储帖子失败: {e}")
+    
+    def get_post_forums(self, post_id):
+        """
+        查询帖子已被哪些板块记录
+        
+        Args:
+            post_id: 帖子ID
+            
+        Returns:
+            list: 板块名称列表
+        """
+        with self.lock:
+            rows = self.session.query(Post.forum).filter(Post.post_id == post_id).all()
+        return [row[0] for row in rows]
+    
+    def get_known_post_ids(self, forum, post_ids):
+        """
+        查询一组帖子ID中已存储过的ID
+        
+        Args:
+            forum: 论坛名称
+            post_ids: 帖子ID列表
+            
+        Returns:
+            set: 已存在的帖子ID集合
+        """
+        if not post_ids:
+            return set()
+        with self.lock:
+            rows = self.session.query(Post.post_id).filter(
+                Post.forum == forum,
+                Post.post_id.in_(list(post_ids))
+            ).all()
+        return {row[0] for row in rows}
+    
+    def get_latest_post_time(self, forum):
+        """
+        获取论坛最近一条帖子的记录时间
+        
+        Args:
+            forum: 论坛名称
+            
+        Returns:
+            datetime: 最近记录时间，没有记录时返回None
+        """
+        with self.lock:
+            return self.session.query(func.max(Post.created_at)).filter(
+                Post.forum == forum
+            ).scalar()
+    
+    def get_hourly_post_counts(self, forum, days=14):
+        """
+        统计最近一段时间内每个小时段的新帖数量
+        
+        Args:
+            forum: 论坛名称
+            days: 统计的天数
+            
+        Returns:
+            dict: (是否周末, 小时) -> 帖子数量
+        """
+        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
+        weekday = func.strftime('%w', Post.created_at)
+        hour = func.strftime('%H', Post.created_at)
+        with self.lock:
+            rows = self.session.query(weekday, hour, func.count(Post.id)).filter(
+                Post.forum == forum,
+                Post.created_at >= cutoff_date
+            ).group_by(weekday, hour).all()
+        
+        counts = {}
+        for weekday_value, hour_value, count in rows:
+            # SQLite的%w中0为周日，6为周六
+            key = (weekday_value in ('0', '6'), int(hour_value))
+            counts[key] = counts.get(key, 0) + count
+        return counts
+    
+    def acquire_lease(self, name, holder, ttl):
+        """
+        获取或续约租约：租约不存在、已过期或本就属于holder时成功
+        
+        Args:
+            name: 租约名称
+            holder: 实例标识
+            ttl: 租约有效期（秒）
+            
+        Returns:
+            bool: 是否持有租约
+        """
+        now = datetime.datetime.now().timestamp()
+        with self.lock:
+            try:
+                # 首次运行时创建租约记录，已存在则忽略
+                self.session.add(LeaderLease(name=name, holder=holder, expires_at=now + ttl, heartbeat_at=now))
+                self.session.commit()
+                return True
+            except IntegrityError:
+                self.session.rollback()
+            except Exception as e:
+                # 如共享卷上的 "database is locked"，本次视为未持有租约，下一次心跳重试
+                self.session.rollback()
+                logger.error(f"创建租约失败: {e}")
+                return False
+            
+            try:
+                # 单条UPDATE由SQLite写锁保证原子性，多个实例同时抢占时只有一个成功
+                result = self.session.execute(
+                    update(LeaderLease)
+                    .where(LeaderLease.name == name)
+                    .where((LeaderLease.holder == holder) | (LeaderLease.expires_at < now))
+                    .values(holder=holder, expires_at=now + ttl, heartbeat_at=now)
+                )
+                self.session.commit()
+                return result.rowcount == 1
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"续约租约失败: {e}")
+                return False
+    
+    def release_lease(self, name, holder):
+        """
+        主动释放租约，便于备用实例立即接管
+        
+        Args:
+            name: 租约名称
+            holder: 实例标识
+        """
+        with self.lock:
+            try:
+                self.session.execute(
+                    update(LeaderLease)
+                    .where(LeaderLease.name == name)
+                    .where(LeaderLease.holder == holder)
+                    .values(expires_at=0)
+                )
+                self.session.commit()
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"释放租约失败: {e}")
+    
+    def claim_post(self, forum, post_id, holder):
+        """
+        认领帖子的通知权
+        
+        Args:
+            forum: 论坛名称
+            post_id: 帖子ID
+            holder: 实例标识
+            
+        Returns:
+            bool: 是否认领成功，已被其他实例认领时返回False
+        """
+        with self.lock:
+            try:
+                self.session.add(NotificationClaim(forum=forum, post_id=post_id, holder=holder))
+                self.session.commit()
+                return True
+            except IntegrityError:
+                self.session.rollback()
+                return False
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"认领帖子失败: {e}")
+                return False
+    
+    def get_sent_expiry_notices(self, robot):
+        """
+        查询机器人已发送过的过期提醒
+        
+        Args:
+            robot: 机器人名称
+            
+        Returns:
+            set: (手机号, 提醒类型, 有效期) 集合
+        """
+        with self.lock:
+            rows = self.session.query(ExpiryNotice.phone, ExpiryNotice.kind, ExpiryNotice.expire_date).filter(
+                ExpiryNotice.robot == robot
+            ).all()
+        return {tuple(row) for row in rows}
+    
+    def record_expiry_notices(self, robot, notices):
+        """
+        记录已发送的过期提醒，已存在的记录保持不变
+        
+        Args:
+            robot: 机器人名称
+            notices: (手机号, 提醒类型, 有效期) 列表
+        """
+        if not notices:
+            return
+        with self.lock:
+            try:
+                existing = {
+                    tuple(row) for row in self.session.query(
+                        ExpiryNotice.phone, ExpiryNotice.kind, ExpiryNotice.expire_date
+                    ).filter(ExpiryNotice.robot == robot).all()
+                }
+                for phone, kind, expire_date in set(notices) - existing:
+                    self.session.add(ExpiryNotice(robot=robot, phone=phone, kind=kind, expire_date=expire_date))
+                self.session.commit()
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"记录过期提醒失败: {e}")
+    
+    def archive_posts(self, rows, documents=None):
+        """
+        在一个事务中写入一批帖子归档并更新全文索引，已归档的帖子保持不变
+        
+        Args:
+            rows: 归档行字典列表，字段与 PostArchive 一致
+            documents: 与rows一一对应的 (标题, 商品名称, 正文) 原文，用于全文索引；为空时不建立索引
+            
+        Returns:
+            int: 新写入的行数
+            
+        Raises:
+            Exception: 写入失败
+        """
+        if not rows:
+            return 0
+        # 分词在加锁前完成，不占用共享会话
+        segmented = [tuple(segment(value) for value in document) for document in documents] if documents else None
+        statement = sqlite_insert(PostArchive).on_conflict_do_nothing(
+            index_elements=['forum', 'post_id']
+        ).returning(PostArchive.id)
+        
+        with self.lock:
+            try:
+                connection = self.session.connection()
+                entries = []
+                written = 0
+                for position, row in enumerate(rows):
+                    archive_id = connection.execute(statement, row).scalar()
+                    if archive_id is None:
+                        continue
+                    written += 1
+                    if segmented and self.search_enabled:
+                        title, items, body = segmented[position]
+                        entries.append({"rowid": archive_id, "title": title, "items": items, "body": body})
+                if entries:
+                    connection.execute(
+                        text("INSERT INTO post_search(rowid, title, items, body) VALUES (:rowid, :title, :items, :body)"),
+                        entries
+                    )
+                self.session.commit()
+                return written
+            except Exception:
+                self.session.rollback()
+                raise
+    
+    def rebuild_search_index(self, batch_size=500, enabled=None):
+        """
+        根据 post_archive 重建全文索引
+        
+        Args:
+            batch_size: 每批读取的归档行数
+            enabled: 是否支持FTS5，为空时使用初始化时的检测结果
+            
+        Returns:
+            int: 建立索引的帖子数
+        """
+        from informer.archive import decompress_text
+        
+        if not (self.search_enabled if enabled is None else enabled):
+            return 0
+        count = 0
+        last_id = 0
+        with self.engine.begin() as connection:
+            connection.execute(text("INSERT INTO post_search(post_search) VALUES ('delete-all')"))
+            while True:
+                rows = connection.execute(
+                    text("SELECT id, title, body, body_codec, analysis FROM post_archive "
+                         "WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": batch_size}
+                ).all()
+                if not rows:
+                    break
+                entries = []
+                for archive_id, title, body, codec, analysis in rows:
+                    try:
+                        body_text = decompress_text(body, codec)
+                    except Exception as e:
+                        logger.warning(f"无法解压归档 {archive_id} 的正文，只为标题建立索引: {e}")
+                        body_text = ""
+                    entries.append({
+                        "rowid": archive_id,
+                        "title": segment(title),
+                        "items": segment(item_names(json.loads(analysis) if analysis else None)),
+                        "body": segment(body_text),
+                    })
+                connection.execute(
+                    text("INSERT INTO post_search(rowid, title, items, body) VALUES (:rowid, :title, :items, :body)"),
+                    entries
+                )
+                count += len(entries)
+                last_id = rows[-1][0]
+        return count
+    
+    def search_posts(self, query, forum=None, days=None, page=1, per_page=20, sort="relevance"):
+        """
+        全文搜索已归档的帖子
+        
+        Args:
+            query: 查询词，空格分隔的词都需要出现，以 - 开头的词排除
+            forum: 只搜索指定板块，为空时搜索全部
+            days: 只搜索最近若干天归档的帖子，为空时不限
+            page: 页码，从1开始
+            per_page: 每页结果数
+            sort: relevance 按相关度（标题和商品名称权重更高），time 按归档时间倒序
+            
+        Returns:
+            dict: total、page、per_page、took_ms 和 posts 列表
+            
+        Raises:
+            RuntimeError: SQLite不支持FTS5
+            ValueError: 查询中没有可搜索的词
+        """
+        from informer.archive import decompress_text
+        
+        if not self.search_enabled:
+            raise RuntimeError("SQLite不支持FTS5，帖子搜索不可用")
+        expression = build_match_query(query)
+        if expression is None:
+            raise ValueError("查询中没有可搜索的词")
+        
+        start = time.perf_counter()
+        conditions = ["post_search MATCH :expression"]
+        params = {"expression": expression, "limit": per_page, "offset": (page - 1) * per_page}
+        if forum:
+            conditions.append("a.forum = :forum")
+            params["forum"] = forum
+        if days:
+            conditions.append("a.archived_at >= :cutoff")
+            params["cutoff"] = datetime.datetime.now() - datetime.timedelta(days=days)
+        where = " AND ".join(conditions)
+        order = "a.id DESC" if sort == "time" else "bm25(post_search, 10.0, 5.0, 1.0), a.id DESC"
+        
+        # 查询使用独立的连接，不与监控线程争用共享会话的锁
+        with self.engine.connect() as connection:
+            total = connection.execute(
+                text(f"SELECT count(*) FROM post_search JOIN post_archive a ON a.id = post_search.rowid WHERE {where}"),
+                params
+            ).scalar()
+            rows = connection.execute(
+                text("SELECT a.forum, a.post_id, a.title, a.url, a.published_at, a.archived_at, a.details, "
+                     "a.body, a.body_codec, a.analysis "
+                     f"FROM post_search JOIN post_archive a ON a.id = post_search.rowid WHERE {where} "
+                     f"ORDER BY {order} LIMIT :limit OFFSET :offset"),
+                params
+            ).all()
+        
+        posts = []
+        for forum_name, post_id, title, url, published_at, archived_at, details, body, codec, analysis in rows:
+            details = json.loads(details) if details else {}
+            analysis = json.loads(analysis) if analysis else None
+            try:
+                body_text = decompress_text(body, codec)
+            except Exception:
+                body_text = ""
+            posts.append({
+                "forum": forum_name,
+                "post_id": post_id,
+                "title": title,
+                "url": url,
+                "published_at": published_at,
+                "archived_at": str(archived_at)[:19] if archived_at else None,
+                "price": details.get("price"),
+                "items": (analysis or {}).get("items") or [],
+                "snippet": make_snippet(body_text, query),
+            })
+        return {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "took_ms": (time.perf_counter() - start) * 1000,
+            "posts": posts,
+        }
+    
+    def get_archived_post(self, forum, post_id):
+        """
+        读取帖子归档
+        
+        Args:
+            forum: 板块名称
+            post_id: 帖子ID
+            
+        Returns:
+            dict: 归档内容，正文已解压、详情和分析结果已解析；不存在时返回None
+        """
+        from informer.archive import decompress_text
+        
+        with self.lock:
+            row = self.session.query(PostArchive).filter(
+                PostArchive.forum == forum,
+                PostArchive.post_id == post_id
+            ).first()
+            if row is None:
+                return None
+            return {
+                "forum": row.forum,
+                "post_id": row.post_id,
+                "title": row.title,
+                "url": row.url,
+                "published_at": row.published_at,
+                "details": json.loads(row.details) if row.details else {},
+                "body": decompress_text(row.body, row.body_codec),
+                "analysis": json.loads(row.analysis) if row.analysis else None,
+                "archived_at": row.archived_at,
+            }
     
     def clean_old_posts(self, days=30):
         """
@@ -92,14 +622,17 @@ class Database:
             days: 保留天数
         """
         cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
-        try:
-            self.session.query(Post).filter(Post.created_at < cutoff_date).delete()
-            self.session.commit()
-            logger.info(f"成功清理{days}天前的帖子记录")
-        except Exception as e:
-            self.session.rollback()
-            logger.error(f"清理旧帖子记录失败: {e}")
+        with self.lock:
+            try:
+                self.session.query(Post).filter(Post.created_at < cutoff_date).delete()
+                self.session.query(NotificationClaim).filter(NotificationClaim.created_at < cutoff_date).delete()
+                self.session.commit()
+                logger.info(f"成功清理{days}天前的帖子记录")
+            except Exception as e:
+                self.session.rollback()
+                logger.error(f"清理旧帖子记录失败: {e}")
     
     def close(self):
         """关闭数据库连接"""
-        self.session.close() 
\ No newline at end of file
+        with self.lock:
+            self.session.close() 
\ No newline at end of file
@@ -6,16 +6,39 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 
+def expiry_boundary(expire_date):
+    """
+    计算用户过期的时间点：有效期当天仍有效，次日零点（本地时间）起视为过期
+
+    Args:
+        expire_date: 过期日期 (YYYY-MM-DD)
+
+    Returns:
+        float: 过期时间点的时间戳
+
+    Raises:
+        ValueError: 日期格式不正确
+    """
+    return (datetime.strptime(expire_date, "%Y-%m-%d") + timedelta(days=1)).timestamp()
+
+
 class ExpirationManager:
     """用户过期管理器"""
     
-    def __init__(self, notifier):
+    # 提前提醒的天数，从大到小；每档对同一有效期只提醒一次
+    WARNING_DAYS = (7, 3)
+    # 钉钉单条消息的长度上限为20000字节，预留一部分给标题和@文本的换行
+    MAX_MESSAGE_BYTES = 18000
+    
+    def __init__(self, notifier, database=None):
         """初始化过期管理器
         
         Args:
             notifier: 通知管理器实例
+            database: 数据库实例，用于记录已发送的提醒；为空时每次检查都会重新提醒
         """
         self.notifier = notifier
+        self.database = database
         self.logger = logger.bind(name="ExpirationManager")
         
     def is_user_expired(self, expire_date: str, is_permanent: bool) -> bool:
@@ -32,15 +55,13 @@ class ExpirationManager:
             return False
             
         try:
-            expire_datetime = datetime.strptime(expire_date, "%Y-%m-%d")
-            current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            return current_date > expire_datetime
+            return datetime.now().timestamp() >= expiry_boundary(expire_date)
         except Exception as e:
             self.logger.error(f"检查用户过期失败: {e}")
             return False
 
     def check_and_notify_expiring_users(self):
-        """检查并通知即将过期或已过期的用户"""
+        """检查即将过期或已过期的用户，每个机器人汇总成一条提醒发送"""
         try:
             if not self.notifier or not hasattr(self.notifier, "robots") or not self.notifier.robots:
                 self.logger.warning("无法执行过期检查：通知器实例不可用或没有配置机器人")
@@ -49,9 +70,6 @@ class ExpirationManager:
             self.logger.info("开始检查用户过期状态...")
             current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # 提前7天和3天通知
-            warning_days = [7, 3]
-            
             # 遍历所有机器人
             for robot in self.notifier.robots:
                 robot_config = robot.get("config")
@@ -61,104 +79,139 @@ class ExpirationManager:
                     continue
                     
                 self.logger.debug(f"检查机器人 [{robot_config.name}] 的用户过期状态")
+                sent = self.database.get_sent_expiry_notices(robot_config.name) if self.database else set()
+                notices = []
+                for phone, expire_date in self._dated_users(robot_config.users):
+                    notice = self._classify(phone, expire_date, current_date)
+                    if notice and notice[:3] not in sent:
+                        notices.append(notice)
                 
-                # 新配置格式：通过 users 字典访问
-                if isinstance(robot_config.users, dict):
-                    for phone, user_data in robot_config.users.items():
-                        # 检查是否永久有效 - 使用字典访问方式
-                        is_permanent = user_data.get("is_permanent", True)
-                        expire_date = user_data.get("expire_date", "")
-                        
-                        if is_permanent:
-                            self.logger.debug(f"用户 {phone} 是永久有效的，跳过检查")
-                            continue
-                        
-                        if not expire_date:
-                            self.logger.debug(f"用户 {phone} 没有设置过期日期，跳过检查")
-                            continue
-                        
-                        self._check_user_expiration(robot_notifier, phone, expire_date, current_date, warning_days)
-                # 新配置格式：通过 UserConfig 对象列表访问
-                elif hasattr(robot_config, "users") and isinstance(robot_config.users, list):
-                    for user in robot_config.users:
-                        if not hasattr(user, "phone"):
-                            continue
-                            
-                        # 检查是否永久有效 - 使用对象访问方式
-                        is_permanent = False  # 默认假设不是永久有效
-                        if hasattr(user, "is_permanent"):
-                            is_permanent = user.is_permanent
-                        
-                        expire_date = ""
-                        if hasattr(user, "expire_date"):
-                            expire_date = user.expire_date
-                        
-                        if is_permanent:
-                            self.logger.debug(f"用户 {user.phone} 是永久有效的，跳过检查")
-                            continue
-                        
-                        if not expire_date:
-                            self.logger.debug(f"用户 {user.phone} 没有设置过期日期，跳过检查")
-                            continue
-                        
-                        self._check_user_expiration(robot_notifier, user.phone, expire_date, current_date, warning_days)
+                if notices:
+                    self._send_digest(robot_config.name, robot_notifier, notices)
                         
             self.logger.info("用户过期检查完成")
             
         except Exception as e:
             self.logger.error(f"执行过期检查时出错: {e}")
+    
+    def _dated_users(self, users):
+        """遍历设置了有效期的非永久用户
+        
+        Args:
+            users: 用户配置，UserConfig 列表或 手机号 -> 用户字典
             
-    def _check_user_expiration(self, robot_notifier, phone, expire_date, current_date, warning_days):
-        """检查单个用户的过期状态并发送通知
+        Yields:
+            tuple: (手机号, 过期日期)
+        """
+        if isinstance(users, dict):
+            items = ((phone, data.get("is_permanent", True), data.get("expire_date", "")) for phone, data in users.items())
+        else:
+            items = ((user.phone, getattr(user, "is_permanent", False), getattr(user, "expire_date", ""))
+                     for user in users if hasattr(user, "phone"))
+        for phone, is_permanent, expire_date in items:
+            if is_permanent or not expire_date:
+                continue
+            yield str(phone), expire_date
+            
+    def _classify(self, phone, expire_date, current_date):
+        """判断用户当前应收到的提醒
         
         Args:
-            robot_notifier: 机器人通知器
             phone: 用户手机号
             expire_date: 过期日期
             current_date: 当前日期
-            warning_days: 提前警告的天数列表
+            
+        Returns:
+            tuple: (手机号, 提醒类型, 过期日期, 剩余天数)，不需要提醒时返回None
         """
         try:
-            # 解析过期日期
             expire_datetime = datetime.strptime(expire_date, "%Y-%m-%d")
-            
-            # 检查是否已过期
-            if current_date > expire_datetime:
-                self.logger.info(f"用户 {phone} 已过期 ({expire_date})")
-                
-                # 发送已过期通知
-                message = (
-                    f"⚠️ 用户订阅已过期\n\n"
-                    f"尊敬的用户，您的订阅已于 **{expire_date}** 过期。\n\n"
-                    f"请尽快联系管理员续费以继续使用服务。"
-                )
-                
-                robot_notifier.send_markdown_notification(
-                    "账户过期通知", 
-                    message, 
-                    [phone]
-                )
-                
-                return
-            
-            # 检查是否即将过期
-            days_to_expire = (expire_datetime - current_date).days
-            
-            if days_to_expire in warning_days:
-                self.logger.info(f"用户 {phone} 将在 {days_to_expire} 天后过期 ({expire_date})")
-                
-                # 发送即将过期通知
-                message = (
-                    f"⚠️ 用户订阅即将过期\n\n"
-                    f"尊敬的用户，您的订阅将在 **{days_to_expire}** 天后 ({expire_date}) 过期。\n\n"
-                    f"请及时联系管理员续费以确保服务不中断。"
-                )
-                
-                robot_notifier.send_markdown_notification(
-                    "账户即将过期通知", 
-                    message, 
-                    [phone]
-                )
-            
-        except Exception as e:
+        except ValueError as e:
             self.logger.error(f"检查用户 {phone} 过期状态时出错: {e}")
+            return None
+        
+        if current_date > expire_datetime:
+            return (phone, "expired", expire_date, 0)
+        
+        # 剩余天数落在某一档内时按最近的一档提醒，错过了整7天/整3天的检查也能补发
+        days_to_expire = (expire_datetime - current_date).days
+        tiers = [days for days in self.WARNING_DAYS if days_to_expire <= days]
+        if tiers:
+            return (phone, f"warn_{min(tiers)}", expire_date, days_to_expire)
+        return None
+    
+    def _format_line(self, notice):
+        """提醒中的一行用户信息"""
+        phone, kind, expire_date, days_to_expire = notice
+        if kind == "expired":
+            return f"- {phone} 已于 **{expire_date}** 过期"
+        if days_to_expire == 0:
+            return f"- {phone} 今天 ({expire_date}) 到期"
+        return f"- {phone} 将在 **{days_to_expire}** 天后 ({expire_date}) 过期"
+    
+    def _build_messages(self, notices):
+        """把提醒拼成一条或多条Markdown消息，单条消息超过长度上限时才拆分
+        
+        Args:
+            notices: _classify 返回的提醒列表
+            
+        Returns:
+            list: (消息内容, 该消息包含的提醒列表)
+        """
+        expired = [notice for notice in notices if notice[1] == "expired"]
+        expiring = sorted((notice for notice in notices if notice[1] != "expired"), key=lambda notice: notice[3])
+        sections = [
+            ("⚠️ 以下用户的订阅已过期，请尽快联系管理员续费以继续使用服务：", expired),
+            ("⏰ 以下用户的订阅即将过期，请及时联系管理员续费以确保服务不中断：", expiring),
+        ]
+        
+        messages = []
+        lines, included, size = [], [], 0
+        for header, section in sections:
+            header_added = False
+            for notice in section:
+                line = self._format_line(notice)
+                # 每个用户占一行，send_markdown_notification 还会在末尾追加 "@手机号 "
+                line_size = len(line.encode("utf-8")) + len(notice[0]) + 3
+                header_size = 0 if header_added else len(header.encode("utf-8")) + 2
+                if included and size + header_size + line_size > self.MAX_MESSAGE_BYTES:
+                    messages.append(("\n".join(lines), included))
+                    lines, included, size = [], [], 0
+                    header_added = False
+                    header_size = len(header.encode("utf-8")) + 2
+                if not header_added:
+                    if lines:
+                        lines.append("")
+                    lines.append(header)
+                    header_added = True
+                    size += header_size
+                lines.append(line)
+                included.append(notice)
+                size += line_size
+        if included:
+            messages.append(("\n".join(lines), included))
+        return messages
+    
+    def _send_digest(self, robot_name, robot_notifier, notices):
+        """向一个机器人发送汇总提醒，发送成功的部分记录到数据库
+        
+        Args:
+            robot_name: 机器人名称
+            robot_notifier: 机器人通知器
+            notices: _classify 返回的提醒列表
+        """
+        messages = self._build_messages(notices)
+        expired_count = sum(1 for notice in notices if notice[1] == "expired")
+        self.logger.info(
+            f"机器人 [{robot_name}] 有 {expired_count} 个用户已过期、{len(notices) - expired_count} 个用户即将过期，"
+            f"分 {len(messages)} 条消息提醒"
+        )
+        
+        for message, included in messages:
+            at_mobiles = [notice[0] for notice in included]
+            if robot_notifier.send_markdown_notification("订阅过期提醒", message, at_mobiles):
+                if self.database:
+                    self.database.record_expiry_notices(robot_name, [notice[:3] for notice in included])
+            else:
+                # 未记录的提醒会在下一次检查时重新发送
+                self.logger.error(f"机器人 [{robot_name}] 发送过期提醒失败，涉及 {len(included)} 个用户")
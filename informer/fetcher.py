@@ -2,175 +2,376 @@
 获取器模块 - 处理网页内容获取
 """
 
+import re
+import threading
+import time
 import urllib.parse
+from collections import OrderedDict
+from datetime import datetime
 import requests
 from bs4 import BeautifulSoup
 from loguru import logger
 
+from informer import metrics
+from informer.logger import log_throttled
+
+# requests/urllib3 仅在安装了brotli解码库时才能解压br编码的响应
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+# 会话池上限：代理每几分钟轮换一次，离开代理池的代理的Session不能一直保留
+MAX_IDLE_SESSIONS = 4  # 每个代理最多保留的空闲Session数
+MAX_SESSION_POOLS = 32  # 最多为多少个代理保留会话池，超出时关闭最久未使用的
+SESSION_IDLE_TTL = 300  # 会话池多久未使用后关闭（秒）
+
+# 条件请求返回304时的内部标记
+_NOT_MODIFIED = object()
+
+# 论坛时间格式，如 "2024-5-1 12:30:05"、"2024-5-1 12:30"
+_POST_TIME_PATTERN = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{2})(?::(\d{2}))?')
+
 
 class Fetcher:
     """网页获取器"""
     
-    def __init__(self, proxy_manager=None, cookies=None):
+    def __init__(self, proxy_manager=None, cookies=None, recorder=None):
         """
         初始化获取器
         
         Args:
             proxy_manager: 代理管理器
             cookies: Cookies字符串
+            recorder: 页面录制器，为空时不录制
         """
         self.proxy_manager = proxy_manager
         self.cookies = cookies
+        self.recorder = recorder
+        self.validators = {}  # URL -> {"etag": ..., "last_modified": ...}
+        self.sessions = OrderedDict()  # 代理地址（直连为None） -> 空闲Session列表，按最近使用排序
+        self.session_used = {}  # 代理地址 -> 最近一次放回Session的时间
+        self.lock = threading.Lock()
     
-    def fetch_with_proxies(self, url, max_retries=3):
+    def set_cookies(self, cookies):
+        """
+        替换请求使用的Cookies
+        
+        Args:
+            cookies: 新的Cookies字符串
+        """
+        with self.lock:
+            self.cookies = cookies
+            # 登录状态变化后页面内容可能不同，下一次请求不再使用旧的缓存校验头
+            self.validators = {}
+        logger.info("已更新Cookies")
+    
+    def fetch_with_proxies(self, url, max_retries=3, conditional=False, kind="page"):
         """
         使用代理获取网页内容
         
         Args:
             url: 目标URL
             max_retries: 最大重试次数
+            conditional: 是否携带上次响应的ETag/Last-Modified发送条件请求
+            kind: 页面类型（list/detail），用于指标统计
             
         Returns:
-            str: 网页内容
+            str: 网页内容；条件请求返回304（页面未变化）时为None
         
         Raises:
             Exception: 获取失败
         """
+        content = self._fetch(url, max_retries, conditional, kind)
+        if content is not None and self.recorder:
+            try:
+                self.recorder.record(url, content, kind)
+            except Exception as e:
+                logger.error(f"录制页面失败: {e}")
+        return content
+    
+    def _fetch(self, url, max_retries, conditional, kind):
+        """依次尝试优选代理、普通代理或直连获取页面，参数和返回值同fetch_with_proxies"""
         if self.proxy_manager:
             # 检查代理池数量
             normal_count, preferred_count = self.proxy_manager.get_proxy_count()
             if normal_count == 0 and preferred_count == 0:
-                logger.warning("代理池为空，等待30秒后重试")
+                log_throttled("WARNING", "proxy-pool-empty", "代理池为空，等待30秒后重试")
                 raise Exception("代理池为空，请稍后重试")
             
+            # 本次请求中已失败的代理，避免重试时重复选中
+            tried = set()
+            
             # 首先尝试使用优选代理
             if preferred_count > 0:
                 proxy = self.proxy_manager.get_proxy()
                 if proxy:
-                    content = self._fetch_with_proxy(url, proxy)
+                    content = self._attempt_with_proxy(url, proxy, conditional, kind)
+                    if content is _NOT_MODIFIED:
+                        return None
                     if content:
-                        logger.debug(f"使用优选代理 {proxy} 请求成功")
+                        logger.debug("使用优选代理 {} 请求成功", proxy)
                         return content
                     else:
-                        logger.warning(f"使用优选代理 {proxy} 请求失败")
-                        self.proxy_manager.remove_proxy(proxy)
+                        log_throttled("WARNING", "proxy-failure", "使用优选代理 {} 请求失败", proxy)
+                        tried.add(proxy)
             
             # 如果优选代理都失败了，使用普通代理
             for i in range(max_retries):
-                proxy = self.proxy_manager.get_proxy()
+                proxy = self.proxy_manager.get_proxy(exclude=tried)
                 if not proxy:
-                    logger.warning("无法获取代理")
+                    log_throttled("WARNING", "proxy-unavailable", "无法获取代理")
                     break
                 
-                content = self._fetch_with_proxy(url, proxy)
+                content = self._attempt_with_proxy(url, proxy, conditional, kind)
+                if content is _NOT_MODIFIED:
+                    return None
                 if content:
                     return content
                 else:
-                    logger.warning(f"使用代理 {proxy} 请求失败")
-                    self.proxy_manager.remove_proxy(proxy)
+                    log_throttled("WARNING", "proxy-failure", "使用代理 {} 请求失败", proxy)
+                    tried.add(proxy)
             
             raise Exception("所有重试都失败")
         else:
             # 不使用代理
-            return self._fetch_without_proxy(url)
+            start = time.perf_counter()
+            try:
+                content = self._fetch_without_proxy(url, conditional)
+            except Exception:
+                metrics.FETCH_FAILURES.inc(kind=kind, proxy_class="direct")
+                raise
+            finally:
+                metrics.FETCH_DURATION.observe(time.perf_counter() - start, kind=kind, proxy_class="direct")
+            return None if content is _NOT_MODIFIED else content
     
-    def _fetch_with_proxy(self, url, proxy):
+    def _attempt_with_proxy(self, url, proxy, conditional, kind):
         """
-        使用指定代理获取网页内容
+        使用代理请求一次，并把结果反馈给代理池、记录指标
         
         Args:
             url: 目标URL
             proxy: 代理地址
+            conditional: 是否发送条件请求
+            kind: 页面类型，用于指标统计
             
         Returns:
-            str: 网页内容，如果失败则返回None
+            str: 网页内容，失败时为None，页面未变化时为_NOT_MODIFIED
         """
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Cookie": self.cookies or "",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            }
+        proxy_class = self.proxy_manager.proxy_class(proxy)
+        start = time.perf_counter()
+        content = self._fetch_with_proxy(url, proxy, conditional)
+        metrics.FETCH_DURATION.observe(time.perf_counter() - start, kind=kind, proxy_class=proxy_class)
+        if content is None:
+            metrics.FETCH_FAILURES.inc(kind=kind, proxy_class=proxy_class)
+        self.proxy_manager.report_fetch_result(content is not None, proxy)
+        return content
+    
+    def _acquire_session(self, proxy):
+        """
+        从会话池中取出一个Session，没有空闲Session时新建
+        
+        同一代理的Session复用底层连接，避免每次请求重新握手
+        
+        Args:
+            proxy: 代理地址，直连时为None
             
-            proxies = {
+        Returns:
+            requests.Session: 会话对象
+        """
+        with self.lock:
+            idle = self.sessions.get(proxy)
+            if idle:
+                return idle.pop()
+        
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.verify = False  # 禁用SSL证书验证
+        if proxy:
+            session.proxies = {
                 "http": proxy,
                 "https": proxy
             }
+        
+        # 设置重试次数
+        adapter = requests.adapters.HTTPAdapter(max_retries=2)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def _release_session(self, proxy, session, healthy=True):
+        """
+        将Session放回会话池，请求失败或空闲Session已满时直接关闭，同时关闭长时间未使用的会话池
+        
+        Args:
+            proxy: 代理地址，直连时为None
+            session: 会话对象
+            healthy: 本次请求是否成功
+        """
+        if not healthy:
+            session.close()
+            return
+        now = time.monotonic()
+        closing = []
+        with self.lock:
+            idle = self.sessions.pop(proxy, None) or []
+            if len(idle) < MAX_IDLE_SESSIONS:
+                idle.append(session)
+            else:
+                closing.append(session)
+            # 重新插入到末尾，最前面的是最久未使用的代理
+            self.sessions[proxy] = idle
+            self.session_used[proxy] = now
+            while self.sessions:
+                oldest = next(iter(self.sessions))
+                if len(self.sessions) <= MAX_SESSION_POOLS and now - self.session_used[oldest] < SESSION_IDLE_TTL:
+                    break
+                closing.extend(self.sessions.pop(oldest))
+                del self.session_used[oldest]
+        # 关闭连接可能较慢，不在锁内进行
+        for stale in closing:
+            stale.close()
+    
+    def _build_headers(self, url, conditional):
+        """
+        构建单次请求的请求头
+        
+        Args:
+            url: 目标URL
+            conditional: 是否携带缓存校验头
+            
+        Returns:
+            dict: 请求头
+        """
+        headers = {"Cookie": self.cookies or ""}
+        if conditional:
+            validator = self.validators.get(url)
+            if validator:
+                if validator.get("etag"):
+                    headers["If-None-Match"] = validator["etag"]
+                if validator.get("last_modified"):
+                    headers["If-Modified-Since"] = validator["last_modified"]
+        return headers
+    
+    def _remember_validators(self, url, response):
+        """
+        保存响应中的ETag/Last-Modified，供下次条件请求使用
+        
+        Args:
+            url: 目标URL
+            response: 响应对象
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.validators[url] = {"etag": etag, "last_modified": last_modified}
+        else:
+            self.validators.pop(url, None)
+    
+    def _request(self, url, proxy, conditional):
+        """
+        发送一次GET请求
+        
+        Args:
+            url: 目标URL
+            proxy: 代理地址，直连时为None
+            conditional: 是否发送条件请求
             
-            session = requests.Session()
-            session.headers.update(headers)
-            session.verify = False  # 禁用SSL证书验证
+        Returns:
+            requests.Response: 响应对象
+        """
+        session = self._acquire_session(proxy)
+        healthy = False
+        try:
+            response = session.get(url, headers=self._build_headers(url, conditional), timeout=15)
+            healthy = response.status_code in (200, 304)
+            return response
+        finally:
+            self._release_session(proxy, session, healthy)
+    
+    def _fetch_with_proxy(self, url, proxy, conditional=False):
+        """
+        使用指定代理获取网页内容
+        
+        Args:
+            url: 目标URL
+            proxy: 代理地址
+            conditional: 是否发送条件请求
             
-            # 设置重试次数和超时时间
-            adapter = requests.adapters.HTTPAdapter(max_retries=2)
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
+        Returns:
+            str: 网页内容，如果失败则返回None；页面未变化时返回_NOT_MODIFIED
+        """
+        try:
+            response = self._request(url, proxy, conditional)
             
-            response = session.get(url, proxies=proxies, timeout=15)
+            if conditional and response.status_code == 304:
+                return _NOT_MODIFIED
             
             if response.status_code != 200:
-                logger.warning(f"请求失败，状态码: {response.status_code}")
+                log_throttled("WARNING", f"request-status-{response.status_code}", "请求失败，状态码: {}", response.status_code)
                 # 记录响应内容以便调试
                 if response.status_code == 567:
                     logger.warning(f"567错误响应内容: {response.text[:200]}...")
                 return None
             
+            if conditional:
+                self._remember_validators(url, response)
             return response.text
         except Exception as e:
-            logger.warning(f"请求过程中出错: {e}")
+            log_throttled("WARNING", "request-error", "请求过程中出错: {}", e)
             return None
     
-    def _fetch_without_proxy(self, url):
+    def _fetch_without_proxy(self, url, conditional=False):
         """
         不使用代理获取网页内容
         
         Args:
             url: 目标URL
+            conditional: 是否发送条件请求
             
         Returns:
-            str: 网页内容
+            str: 网页内容；页面未变化时返回_NOT_MODIFIED
         
         Raises:
             Exception: 获取失败
         """
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Cookie": self.cookies or "",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            session = requests.Session()
-            session.headers.update(headers)
-            session.verify = False  # 禁用SSL证书验证
+            response = self._request(url, None, conditional)
             
-            # 设置重试次数和超时时间
-            adapter = requests.adapters.HTTPAdapter(max_retries=2)
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
-            
-            response = session.get(url, timeout=15)
+            if conditional and response.status_code == 304:
+                return _NOT_MODIFIED
             
             if response.status_code != 200:
                 raise Exception(f"无效的响应状态码: {response.status_code}")
             
+            if conditional:
+                self._remember_validators(url, response)
             return response.text
         except Exception as e:
             raise Exception(f"请求失败: {e}")
     
     @staticmethod
-    def parse_forum_content(html):
+    def parse_forum_content(html, base_url="https://www.chiphell.com/"):
         """
         解析论坛页面内容
         
         Args:
             html: HTML内容
+            base_url: 用于补全相对链接的页面地址
             
         Returns:
             list: 帖子列表，每个帖子包含标题和链接
@@ -186,11 +387,18 @@ class Fetcher:
                 if href:
                     # 确保链接是完整的URL
                     if not href.startswith('http'):
-                        href = f"https://www.chiphell.com/{href}"
+                        href = urllib.parse.urljoin(base_url, href)
+                    
+                    # 第一个td.by为作者和发帖时间，第二个为最后回复
+                    published_at = None
+                    time_elem = thread.select_one('td.by em span')
+                    if time_elem:
+                        published_at = Fetcher.parse_post_time(time_elem.get('title') or time_elem.text)
                     
                     posts.append({
                         'title': title,
-                        'link': href
+                        'link': href,
+                        'published_at': published_at
                     })
         
         return posts
@@ -245,8 +453,58 @@ class Fetcher:
                 elif '交易范围:' in key:
                     details['trade_range'] = value
         
+        # 获取主楼发帖时间，近期帖子的完整时间在span的title中，否则为"发表于 ..."文本
+        details['published_at'] = None
+        time_elem = soup.select_one('em[id^="authorposton"]')
+        if time_elem:
+            span = time_elem.select_one('span[title]')
+            details['published_at'] = Fetcher.parse_post_time(span['title'] if span else time_elem.text)
+        
         return details
     
+    @staticmethod
+    def parse_post_time(text):
+        """
+        解析论坛显示的发帖时间
+        
+        Args:
+            text: 时间文本，如 "发表于 2024-5-1 12:30:05"
+            
+        Returns:
+            float: 时间戳（按本地时区解释），只有日期或无法解析时返回None
+        """
+        match = _POST_TIME_PATTERN.search(text or '')
+        if not match:
+            return None
+        try:
+            year, month, day, hour, minute, second = (int(g or 0) for g in match.groups())
+            return datetime(year, month, day, hour, minute, second).timestamp()
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def page_url(url, page):
+        """
+        构造板块列表第N页的URL
+        
+        Args:
+            url: 板块第一页URL，支持 forum-26-1.html 和 forum.php?mod=forumdisplay 两种格式
+            page: 页码
+            
+        Returns:
+            str: 第N页的URL
+        """
+        # 静态化链接：forum-{fid}-{page}.html
+        match = re.search(r'forum-(\d+)-\d+\.html', url)
+        if match:
+            return url[:match.start()] + f"forum-{match.group(1)}-{page}.html" + url[match.end():]
+        
+        # 动态链接：替换或追加page参数
+        parts = urllib.parse.urlsplit(url)
+        query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k != 'page']
+        query.append(('page', str(page)))
+        return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+    
     @staticmethod
     def extract_post_id(url):
         """
@@ -0,0 +1,210 @@
+"""
+进程间通信模块 - 分进程运行时，Web进程通过本地Unix套接字向监控进程推送配置变化、读取运行状态
+
+连接上传输的是pickle数据，因此必须使用认证密钥，套接字文件也只允许当前用户访问。
+"""
+
+import os
+import threading
+
+from multiprocessing.connection import Client, Listener
+
+from loguru import logger
+
+
+# --split 模式下看护进程生成的密钥通过该环境变量传给子进程
+AUTHKEY_ENV = "INFORMER_IPC_AUTHKEY"
+
+
+class MonitorUnavailable(Exception):
+    """监控进程未运行或连接已断开"""
+
+
+def resolve_authkey(configured):
+    """
+    确定IPC使用的认证密钥：优先使用配置的 ipc.authkey，其次使用看护进程传入的密钥
+
+    Args:
+        configured: 配置中的 ipc.authkey
+
+    Returns:
+        str: 认证密钥
+
+    Raises:
+        ValueError: 两者都为空
+    """
+    authkey = configured or os.environ.get(AUTHKEY_ENV, "")
+    if not authkey:
+        raise ValueError("分进程运行需要认证密钥：请配置 ipc.authkey，或使用 --split 模式自动生成")
+    return authkey
+
+
+def _encode_authkey(authkey):
+    if not authkey:
+        raise ValueError("IPC连接必须使用认证密钥")
+    return authkey.encode("utf-8")
+
+
+class IpcServer:
+    """监控进程一侧的IPC服务，每个连接在独立线程中处理请求"""
+
+    def __init__(self, address, handlers, authkey=None):
+        """
+        初始化IPC服务
+
+        Args:
+            address: Unix套接字路径
+            handlers: 命令名 -> 处理函数，处理函数的参数为客户端传入的参数，返回值发送回客户端
+            authkey: 连接认证密钥，不能为空
+
+        Raises:
+            ValueError: 未提供认证密钥
+        """
+        self.address = address
+        self.handlers = handlers
+        self.authkey = _encode_authkey(authkey)
+        self.listener = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """创建套接字并启动接受连接的线程"""
+        if self.running:
+            return
+        directory = os.path.dirname(self.address)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 上次异常退出时残留的套接字文件会导致绑定失败
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        # 在绑定前收紧umask，套接字文件创建时就只有当前用户可以连接，不存在先绑定后chmod的间隙
+        previous = os.umask(0o077)
+        try:
+            self.listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        finally:
+            os.umask(previous)
+        os.chmod(self.address, 0o600)
+        self.running = True
+        self.thread = threading.Thread(target=self._accept_loop, name="ipc-server", daemon=True)
+        self.thread.start()
+        logger.info(f"IPC服务已启动: {self.address}")
+
+    def stop(self):
+        """停止接受连接并删除套接字文件"""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.listener.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.address)
+        except OSError:
+            pass
+        logger.info("IPC服务已停止")
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                connection = self.listener.accept()
+            except Exception as e:
+                if self.running:
+                    # 认证失败等单个连接的错误不影响后续连接
+                    logger.warning(f"接受IPC连接失败: {e}")
+                    continue
+                break
+            threading.Thread(target=self._serve, args=(connection,), name="ipc-connection", daemon=True).start()
+
+    def _serve(self, connection):
+        """处理一个连接上的请求，直到客户端断开"""
+        with connection:
+            while self.running:
+                try:
+                    command, args = connection.recv()
+                except (EOFError, OSError):
+                    break
+                except Exception as e:
+                    logger.warning(f"无法解析IPC请求: {e}")
+                    break
+
+                handler = self.handlers.get(command)
+                try:
+                    if handler is None:
+                        raise ValueError(f"未知的IPC命令: {command}")
+                    response = ("ok", handler(*args))
+                except Exception as e:
+                    logger.error(f"处理IPC命令 {command} 时出错: {e}")
+                    response = ("error", str(e))
+
+                try:
+                    connection.send(response)
+                except (EOFError, OSError):
+                    break
+
+
+class IpcClient:
+    """Web进程一侧的IPC客户端，连接断开后在下一次调用时自动重连"""
+
+    def __init__(self, address, authkey=None, timeout=5.0):
+        """
+        初始化IPC客户端
+
+        Args:
+            address: Unix套接字路径
+            authkey: 连接认证密钥，需与监控进程一致，不能为空
+            timeout: 等待响应的最长时间（秒）
+
+        Raises:
+            ValueError: 未提供认证密钥
+        """
+        self.address = address
+        self.authkey = _encode_authkey(authkey)
+        self.timeout = timeout
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def call(self, command, *args):
+        """
+        调用监控进程的命令
+
+        Args:
+            command: 命令名
+            *args: 命令参数，需要可以被pickle
+
+        Returns:
+            命令的返回值
+
+        Raises:
+            MonitorUnavailable: 监控进程未运行、连接断开或响应超时
+            RuntimeError: 监控进程处理命令时出错
+        """
+        with self.lock:
+            try:
+                if self.connection is None:
+                    self.connection = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+                self.connection.send((command, args))
+                if not self.connection.poll(self.timeout):
+                    raise TimeoutError(f"等待响应超过 {self.timeout} 秒")
+                status, result = self.connection.recv()
+            except Exception as e:
+                # 连接状态未知，关闭后下次重新连接，避免读到上一次请求的响应
+                self._close()
+                raise MonitorUnavailable(f"无法连接监控进程: {e}") from e
+
+        if status != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def close(self):
+        """关闭连接"""
+        with self.lock:
+            self._close()
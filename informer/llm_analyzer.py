@@ -5,9 +5,10 @@ LLM分析器模块 - 使用大语言模型分析帖子内容
 import json
 import time
 import requests
-from openai import OpenAI
 from loguru import logger
 
+from informer import metrics
+
 class LLMAnalyzer:
     """LLM分析器类，负责调用大语言模型API进行内容分析"""
     
@@ -39,8 +40,9 @@ class LLMAnalyzer:
             # SiliconFlow无需初始化客户端，直接使用requests
             logger.info(f"已初始化SiliconFlow LLM客户端，使用模型: {self.model}")
         else:
-            # 默认使用OpenAI客户端
+            # 默认使用OpenAI客户端；openai导入较慢，只在使用该提供者时导入
             try:
+                from openai import OpenAI
                 self.client = OpenAI(
                     base_url=self.base_url,
                     api_key=self.api_key,
@@ -183,6 +185,7 @@ class LLMAnalyzer:
                         response_content = completion.choices[0].message.content
                 
                 elapsed_time = time.time() - start_time
+                metrics.LLM_DURATION.observe(elapsed_time, provider=self.provider)
                 logger.debug(f"LLM分析完成，耗时: {elapsed_time:.2f}秒")
                 
                 # 处理响应内容
@@ -217,17 +220,23 @@ class LLMAnalyzer:
                             logger.warning("LLM响应中未找到预期的'items'列表")
                             return {"items": []}
                     except json.JSONDecodeError as e:
+                        metrics.LLM_FAILURES.inc(provider=self.provider)
                         logger.error(f"无法解析LLM响应为有效的JSON: {e}")
                         return {"items": []}
                 else:
+                    metrics.LLM_FAILURES.inc(provider=self.provider)
                     logger.warning("未收到有效的LLM响应")
                     return {"items": []}
                     
             except TimeoutError:
+                metrics.LLM_DURATION.observe(time.time() - start_time, provider=self.provider)
+                metrics.LLM_FAILURES.inc(provider=self.provider)
                 logger.error(f"LLM分析请求超时，已经过{timeout}秒")
                 return {"items": []}
             except Exception as e:
                 elapsed_time = time.time() - start_time
+                metrics.LLM_DURATION.observe(elapsed_time, provider=self.provider)
+                metrics.LLM_FAILURES.inc(provider=self.provider)
                 logger.error(f"LLM分析请求失败，用时{elapsed_time:.2f}秒，错误: {e}")
                 return {"items": []}
                 
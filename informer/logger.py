@@ -1,16 +1,237 @@
 """
 日志模块 - 处理日志输出
+
+控制台和文件输出都经过有界队列，由后台线程写出，业务线程不会因为磁盘或终端变慢而阻塞；
+队列满时按配置丢弃日志并计数。另外提供按模块判断级别的开关和重复消息限频。
 """
 
+import atexit
+import copy
 import os
+import queue
 import sys
+import threading
+import time
+
 from loguru import logger
 
+from informer import metrics
+
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+DROP_POLICIES = ("drop_new", "drop_oldest", "block")
+DROP_REPORT_INTERVAL = 10  # 丢弃提示的最短间隔（秒）
+
+_sinks = []  # 当前使用的 AsyncSink
+_file_logger = None  # 只挂载文件输出的独立logger，由文件输出线程调用
+_levels = None  # 模块名 -> 最低级别序号，"" 为默认级别；未调用setup_logger时为None
+_enabled_cache = {}  # (级别, 模块名) -> 是否输出
+_repeat_interval = 60
+_throttle = {}  # 限频键 -> [上次输出时间, 期间被省略的次数]
+_throttle_lock = threading.Lock()
+
+
+class AsyncSink:
+    """带有界队列的日志输出，由后台线程写出；作为loguru的可调用sink使用"""
+
+    def __init__(self, name, write, flush=None, queue_size=10000, drop_policy="drop_new"):
+        """
+        初始化并启动输出线程
+
+        Args:
+            name: 输出名称，用于指标和丢弃提示
+            write: 写出一条已格式化日志的函数
+            flush: 队列清空时调用的刷新函数
+            queue_size: 队列长度上限
+            drop_policy: 队列满时的处理方式，drop_new 丢弃新日志，drop_oldest 丢弃最早的日志，block 等待
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"不支持的日志丢弃策略: {drop_policy}，可选 {'/'.join(DROP_POLICIES)}")
+        self.name = name
+        self._write = write
+        self._flush = flush
+        self.drop_policy = drop_policy
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._reported = 0
+        self._last_report = 0.0
+        self._drop_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"log-{name}", daemon=True)
+        self.thread.start()
+
+    def __call__(self, message):
+        if self.drop_policy == "block":
+            self.queue.put(message)
+            return
+        try:
+            self.queue.put_nowait(message)
+            return
+        except queue.Full:
+            pass
+
+        if self.drop_policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                pass
+        with self._drop_lock:
+            self.dropped += 1
+        metrics.LOG_DROPPED.inc(sink=self.name)
+
+    def _run(self):
+        while True:
+            try:
+                message = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    break
+                continue
+            if message is None:
+                break
+            self._emit(message)
+            # 队列清空时再刷新和报告丢弃数，避免每条日志都刷新
+            if self.queue.empty():
+                self._report_dropped()
+                if self._flush:
+                    self._safe(self._flush)
+
+    def _emit(self, message):
+        try:
+            self._write(message)
+        except Exception as e:
+            # 日志输出失败时不能再通过logger报告，否则可能递归
+            sys.stderr.write(f"日志输出 [{self.name}] 失败: {e}\n")
+
+    def _safe(self, func):
+        try:
+            func()
+        except Exception:
+            pass
+
+    def _report_dropped(self, force=False):
+        if not force and time.monotonic() - self._last_report < DROP_REPORT_INTERVAL:
+            return
+        self._last_report = time.monotonic()
+        with self._drop_lock:
+            dropped = self.dropped - self._reported
+            self._reported = self.dropped
+        if dropped:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._emit(f"{stamp} | WARNING  | informer.logger - 日志队列已满，丢弃了 {dropped} 条日志\n")
+
+    def stop(self, timeout=5):
+        """
+        写出队列中剩余的日志后停止线程
 
-def setup_logger(file, max_size, max_backups, max_age, compress, level):
+        Args:
+            timeout: 等待的最长时间（秒）
+        """
+        self._stopped.set()
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        self._report_dropped(force=True)
+        if self._flush:
+            self._safe(self._flush)
+
+
+def _level_no(level):
+    return level if isinstance(level, int) else logger.level(str(level).upper()).no
+
+
+def set_levels(level, module_levels=None):
+    """
+    设置 log_enabled 使用的默认级别和按模块覆盖的级别
+
+    Args:
+        level: 默认日志级别
+        module_levels: 模块名 -> 日志级别，子模块继承父模块的设置
+    """
+    global _levels
+    levels = {"": _level_no(level)}
+    for module, module_level in (module_levels or {}).items():
+        levels[module] = _level_no(module_level)
+    _levels = levels
+    _enabled_cache.clear()
+
+
+def log_enabled(level, name):
+    """
+    判断某个模块的某一级别日志是否会输出，用于在热路径上跳过构造日志内容
+
+    Args:
+        level: 日志级别名称
+        name: 模块名，通常为 __name__
+
+    Returns:
+        bool: 是否会输出
+    """
+    key = (level, name)
+    enabled = _enabled_cache.get(key)
+    if enabled is None:
+        if _levels is None:
+            return True
+        module = name
+        while module not in _levels:
+            module = module.rpartition(".")[0] if "." in module else ""
+        enabled = _enabled_cache[key] = _level_no(level) >= _levels[module]
+    return enabled
+
+
+def log_throttled(level, key, message, *args, interval=None):
+    """
+    限频输出重复出现的日志：同一key在interval秒内只输出一次，下次输出时附带期间省略的条数
+
+    Args:
+        level: 日志级别名称
+        key: 限频键，同类消息使用同一个键
+        message: 日志内容，可以包含 {} 占位符
+        *args: 占位符参数，只在实际输出时格式化
+        interval: 限频间隔（秒），默认使用日志配置中的 repeat_interval
+    """
+    interval = _repeat_interval if interval is None else interval
+    now = time.monotonic()
+    with _throttle_lock:
+        state = _throttle.get(key)
+        if state is not None and now - state[0] < interval:
+            state[1] += 1
+            return
+        suppressed = state[1] if state else 0
+        elapsed = now - state[0] if state else 0
+        _throttle[key] = [now, 0]
+
+    if suppressed:
+        suffix = f"（过去 {elapsed:.0f} 秒内另有 {suppressed} 条同类日志被省略）"
+        if args:
+            # 后缀不能参与格式化
+            message = message + suffix.replace("{", "{{").replace("}", "}}")
+        else:
+            message = message + suffix
+    logger.opt(depth=1).log(level, message, *args)
+
+
+def _stop_sinks():
+    """停止所有输出线程并关闭日志文件"""
+    global _file_logger
+    while _sinks:
+        _sinks.pop().stop()
+    if _file_logger is not None:
+        _file_logger.remove()
+        _file_logger = None
+
+
+def setup_logger(file, max_size, max_backups, max_age, compress, level,
+                 queue_size=10000, drop_policy="drop_new", module_levels=None, repeat_interval=60):
     """
     配置日志记录器
-    
+
     Args:
         file: 日志文件路径
         max_size: 单个日志文件最大大小 (MB)
@@ -18,34 +239,67 @@ def setup_logger(file, max_size, max_backups, max_age, compress, level):
         max_age: 日志保留天数
         compress: 是否压缩旧日志
         level: 日志级别
-    
+        queue_size: 每个输出的队列长度上限
+        drop_policy: 队列满时的处理方式，drop_new/drop_oldest/block
+        module_levels: 按模块覆盖的日志级别，如 {"informer.proxy_manager": "WARNING"}
+        repeat_interval: log_throttled 的默认限频间隔（秒）
+
     Returns:
         配置好的logger对象
     """
+    global _file_logger, _repeat_interval
+
     # 确保日志目录存在
     log_dir = os.path.dirname(file)
-    if not os.path.exists(log_dir):
+    if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
     # 移除默认处理器
     logger.remove()
+    _stop_sinks()
+    set_levels(level, module_levels)
+    _repeat_interval = repeat_interval
+
+    # 按模块过滤：处理器的级别取所有设置中最低的，再由过滤字典决定各模块的级别
+    level_filter = {"": level.upper()}
+    level_filter.update({module: module_level.upper() for module, module_level in (module_levels or {}).items()})
+    min_level = min(_levels.values())
+
+    # 文件输出使用loguru自带的轮转和压缩，挂在独立的logger上，由输出线程写入已格式化的日志
+    _file_logger = copy.deepcopy(logger)
+    _file_logger.add(
+        file,
+        rotation=f"{max_size} MB",
+        retention=max_backups,
+        compression="zip" if compress else None,
+        level=0,
+        format="{message}",
+    )
+    file_logger = _file_logger.opt(raw=True)
+
+    console = AsyncSink("console", sys.stdout.write, sys.stdout.flush, queue_size, drop_policy)
+    file_sink = AsyncSink("file", file_logger.info, None, queue_size, drop_policy)
+    _sinks.extend([console, file_sink])
 
     # 添加控制台输出
     logger.add(
-        sys.stdout,
-        level=level.upper(),
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+        console,
+        level=min_level,
+        filter=level_filter,
+        colorize=sys.stdout.isatty(),
+        format=CONSOLE_FORMAT,
     )
 
     # 添加文件输出
     logger.add(
-        file,
-        rotation=f"{max_size} MB",
-        retention=max_backups,
-        enqueue=True,
-        compression="zip" if compress else None,
-        level=level.upper(),
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+        file_sink,
+        level=min_level,
+        filter=level_filter,
+        colorize=False,
+        format=FILE_FORMAT,
     )
 
-    return logger 
\ No newline at end of file
+    return logger
+
+
+atexit.register(_stop_sinks)
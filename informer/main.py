@@ -2,49 +2,58 @@
 Chiphell二手区监控工具入口文件，集成了Web配置界面
 """
 
+import hashlib
+import hmac
+import ipaddress
 import os
+import signal
 import time
 import threading
-import urllib3
 import warnings
-import yaml
 import schedule
 from loguru import logger
 import sys
 from functools import wraps
-import requests  # 用于验证 Turnstile 令牌
+
+from informer import startup
+from informer.config import thaw
+from informer.config_store import ConfigStore, ConfigUpdateError
+from informer.ipc import AUTHKEY_ENV, IpcClient, IpcServer, MonitorUnavailable, resolve_authkey
+from informer.subscriptions import (SubscriptionImportError, apply_rows, export_csv, export_json, parse_rows,
+                                   query_users, robot_summaries)
 
 # 尝试导入Flask相关模块
 try:
-    from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session
+    from flask import (Flask, Response, render_template, request, jsonify, flash, redirect, url_for, session,
+                       stream_with_context)
     FLASK_AVAILABLE = True
 except ImportError:
     FLASK_AVAILABLE = False
     # 在主函数中会再次警告
 
-# 禁用SSL警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# 禁用SSL警告（按消息过滤，无需在启动时导入urllib3）
 warnings.filterwarnings("ignore", message="Unverified HTTPS request")
 
 # 全局变量
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'config.yaml')
 notifier_instance = None
-config_lock = threading.Lock()
+coordinator_instance = None
+monitor_instance = None
+database_instance = None
+monitor_client = None  # 以--web模式运行时连接独立监控进程的IPC客户端
 login_attempts = {}
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION = 30 * 60  # 30分钟
+DEFAULT_PAGE_SIZE = 50  # 用户列表接口每页默认数量
+MAX_PAGE_SIZE = 200
+SEARCH_PAGE_SIZE = 20  # 帖子搜索接口每页默认数量
+_search_database = None  # --web 模式下搜索使用的数据库实例，首次搜索时创建
+_search_database_lock = threading.Lock()
 
 # 全局变量，存储Flask应用实例
 app = None
 if FLASK_AVAILABLE:
-    # 动态导入，因为这些模块依赖于可能未安装的库
-    from informer.config import load_config
-    from informer.logger import setup_logger
-    from informer.database import Database
-    from informer.notifier import MultiRobotNotifier, DingTalkNotifier
-    from informer.expiration_manager import ExpirationManager
-    from informer.proxy_manager import ProxyManager
-    from informer.monitor import ChiphellMonitor
+    # 数据库、监控、通知器等较重的模块在用到时才导入，--web 模式和启动阶段不加载 SQLAlchemy、openai 等依赖
     from datetime import datetime
 
     app = Flask(__name__, 
@@ -62,56 +71,61 @@ if FLASK_AVAILABLE:
             # 如果转换失败，返回当前时间
             return datetime.now()
 
-def load_web_config():
-    """加载配置文件 (为Web界面提供)"""
+def load_web_config(copy=False):
+    """
+    加载配置文件 (为Web界面提供)
+    
+    Args:
+        copy: 是否返回可修改的副本；默认返回缓存的只读视图
+    """
     try:
         if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            config = config_store.get()
+            return thaw(config) if copy else config
         else:
             return {"error": "配置文件不存在"}
     except Exception as e:
         return {"error": str(e)}
 
-def save_config(config):
-    """保存配置到文件"""
-    try:
-        with config_lock:
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-            
-            if notifier_instance and "dingtalk" in config and "robots" in config["dingtalk"]:
-                from informer.config import DingTalkRobot, UserConfig
-                
-                robot_objects = []
-                for robot_dict in config["dingtalk"]["robots"]:
-                    users = []
-                    if "users" in robot_dict:
-                        for phone, user_data in robot_dict["users"].items():
-                            users.append(UserConfig(
-                                phone=str(phone),
-                                keywords=user_data.get("keywords", []),
-                                always_at=user_data.get("always_at", False),
-                                expire_date=user_data.get("expire_date", ""),
-                                is_permanent=user_data.get("is_permanent", True)
-                            ))
-                    
-                    robot_objects.append(DingTalkRobot(
-                        name=robot_dict.get("name", "未命名机器人"),
-                        token=robot_dict.get("token", ""),
-                        secret=robot_dict.get("secret", ""),
-                        enabled=robot_dict.get("enabled", True),
-                        receive_all=robot_dict.get("receive_all", True),
-                        users=users
-                    ))
-                
-                notifier_instance.update_robots(robot_objects)
-                logger.info(f"已实时更新钉钉机器人配置，共 {len(robot_objects)} 个机器人")
-        
-        return True
-    except Exception as e:
-        logger.error(f"保存配置失败: {e}")
-        return str(e)
+def _push_robots_to_notifier(robots):
+    """配置写入后把机器人配置同步到运行中的通知器，分进程运行时通过IPC发送给监控进程"""
+    if notifier_instance:
+        notifier_instance.update_robots(robots)
+        logger.info(f"已实时更新钉钉机器人配置，共 {len(robots)} 个机器人")
+    elif monitor_client:
+        try:
+            monitor_client.call("update_robots", robots)
+            logger.info(f"已通知监控进程更新钉钉机器人配置，共 {len(robots)} 个机器人")
+        except MonitorUnavailable as e:
+            # 监控进程启动时会读取配置文件，运行中也会通过配置监视器加载文件变化
+            logger.warning(f"{e}，机器人配置将在监控进程读取配置文件后生效")
+
+def _get_robot(config, robot_index, message="机器人配置不存在"):
+    """
+    获取配置中的机器人字典
+    
+    Raises:
+        ConfigUpdateError: 机器人不存在
+    """
+    robots = (config.get("dingtalk") or {}).get("robots") or []
+    if robot_index < 0 or robot_index >= len(robots):
+        raise ConfigUpdateError(message)
+    return robots[robot_index]
+
+def _get_user(config, robot_index, phone):
+    """
+    获取配置中的用户字典
+    
+    Raises:
+        ConfigUpdateError: 机器人或用户不存在
+    """
+    users = _get_robot(config, robot_index).get("users") or {}
+    if phone not in users:
+        raise ConfigUpdateError("用户不存在")
+    return users[phone]
+
+# Web界面的配置修改都通过配置存储串行执行，短时间内的多次修改合并为一次写入
+config_store = ConfigStore(CONFIG_PATH, on_robots_changed=_push_robots_to_notifier)
 
 def get_password():
     """从配置文件中获取密码"""
@@ -151,6 +165,7 @@ def verify_turnstile(token, secret_key, remoteip=None):
         data["remoteip"] = remoteip
     
     try:
+        import requests  # 只在启用Turnstile时用到
         response = requests.post(
             "https://challenges.cloudflare.com/turnstile/v0/siteverify",
             data=data,
@@ -172,6 +187,40 @@ def get_turnstile_config():
         "enabled": turnstile_config.get("enabled", False)
     }
 
+def metrics_allowed():
+    """
+    检查当前请求能否读取 /metrics：未配置 web.metrics_token 和 web.metrics_allow 时允许所有请求，
+    否则需要带有正确的令牌（Authorization: Bearer 或 ?token=），或来自允许的地址
+    
+    Returns:
+        bool: 是否允许
+    """
+    web_config = load_web_config().get("web") or {}
+    token = web_config.get("metrics_token") or ""
+    allow = web_config.get("metrics_allow") or []
+    if not token and not allow:
+        return True
+    
+    if token:
+        header = request.headers.get("Authorization", "")
+        provided = header[7:] if header.startswith("Bearer ") else request.args.get("token", "")
+        if provided and hmac.compare_digest(provided.encode("utf-8"), token.encode("utf-8")):
+            return True
+    
+    # 按直接连接的地址判断，X-Forwarded-For 可以被客户端伪造
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    for network in allow:
+        try:
+            if address in ipaddress.ip_network(str(network), strict=False):
+                return True
+        except ValueError:
+            from informer.logger import log_throttled
+            log_throttled("WARNING", "metrics-allow-invalid", "web.metrics_allow 中的地址格式不正确: {}", network)
+    return False
+
 def get_client_ip():
     """
     获取客户端真实 IP 地址，支持反向代理
@@ -252,6 +301,32 @@ if FLASK_AVAILABLE:
         
         return render_template('login.html', error=error, site_key=site_key)
 
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Prometheus指标（供抓取器使用，不需要登录，可用令牌或地址白名单限制）；分进程运行时返回监控进程的指标"""
+        from informer import metrics
+        if not metrics_allowed():
+            return "# 需要有效的令牌或来自允许的地址\n", 403, {"Content-Type": metrics.CONTENT_TYPE}
+        if monitor_client:
+            try:
+                return monitor_client.call("metrics"), 200, {"Content-Type": metrics.CONTENT_TYPE}
+            except MonitorUnavailable as e:
+                return f"# {e}\n", 503, {"Content-Type": metrics.CONTENT_TYPE}
+        return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+    @app.route('/api/status')
+    @login_required
+    def api_status():
+        """监控运行状态"""
+        if monitor_client:
+            try:
+                status = monitor_client.call("status")
+            except MonitorUnavailable as e:
+                return jsonify({"status": "error", "message": str(e)}), 503
+        else:
+            status = get_monitor_status()
+        return jsonify({"status": "success", "monitor": status})
+
     @app.route('/logout')
     def logout():
         session.pop('logged_in', None)
@@ -272,12 +347,6 @@ if FLASK_AVAILABLE:
     @login_required
     def add_robot():
         try:
-            config = load_web_config()
-            if "dingtalk" not in config:
-                config["dingtalk"] = {}
-            if "robots" not in config["dingtalk"]:
-                config["dingtalk"]["robots"] = []
-            
             new_robot = {
                 "name": request.json.get("name", "新机器人"),
                 "token": request.json.get("token", ""),
@@ -287,13 +356,11 @@ if FLASK_AVAILABLE:
                 "users": {}
             }
             
-            config["dingtalk"]["robots"].append(new_robot)
-            result = save_config(config)
+            def mutation(config):
+                config.setdefault("dingtalk", {}).setdefault("robots", []).append(new_robot)
             
-            if result is True:
-                return jsonify({"status": "success", "message": "机器人添加成功"})
-            else:
-                return jsonify({"status": "error", "message": f"添加失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "机器人添加成功"})
         except Exception as e:
             return jsonify({"status": "error", "message": f"添加失败: {str(e)}"})
 
@@ -305,30 +372,22 @@ if FLASK_AVAILABLE:
             phone = request.json.get("phone", "")
             always_at = request.json.get("always_at", False)
             
-            config = load_web_config()
-            
             if not phone or not phone.isdigit() or len(phone) != 11:
                 return jsonify({"status": "error", "message": "手机号格式不正确"})
             
-            if "dingtalk" not in config or "robots" not in config["dingtalk"] or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "机器人配置不存在"})
+            def mutation(config):
+                robot = _get_robot(config, robot_index)
+                robot.setdefault("users", {})[phone] = {
+                    "always_at": always_at,
+                    "keywords": [],
+                    "expire_date": request.json.get("expire_date", ""),
+                    "is_permanent": request.json.get("is_permanent", True)
+                }
             
-            robot = config["dingtalk"]["robots"][robot_index]
-            if "users" not in robot:
-                robot["users"] = {}
-            
-            robot["users"][phone] = {
-                "always_at": always_at,
-                "keywords": [],
-                "expire_date": request.json.get("expire_date", ""),
-                "is_permanent": request.json.get("is_permanent", True)
-            }
-            
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "用户添加成功"})
-            else:
-                return jsonify({"status": "error", "message": f"添加失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "用户添加成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"添加失败: {str(e)}"})
 
@@ -337,31 +396,20 @@ if FLASK_AVAILABLE:
     def add_keyword():
         try:
             robot_index = int(request.json.get("robot_index", 0))
-            phone = request.json.get("phone", "")
+            phone = str(request.json.get("phone", ""))
             keyword = request.json.get("keyword", "").strip()
             
             if not keyword:
                 return jsonify({"status": "error", "message": "关键词不能为空"})
             
-            config = load_web_config()
-            
-            if "dingtalk" not in config or "robots" not in config["dingtalk"] or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "机器人配置不存在"})
-            
-            robot = config["dingtalk"]["robots"][robot_index]
-            if "users" not in robot or str(phone) not in robot["users"]:
-                return jsonify({"status": "error", "message": "用户不存在"})
+            def mutation(config):
+                user = _get_user(config, robot_index, phone)
+                user.setdefault("keywords", []).append(keyword)
             
-            if "keywords" not in robot["users"][str(phone)]:
-                robot["users"][str(phone)]["keywords"] = []
-            
-            robot["users"][str(phone)]["keywords"].append(keyword)
-            
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "关键词添加成功"})
-            else:
-                return jsonify({"status": "error", "message": f"添加失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "关键词添加成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"添加失败: {str(e)}"})
 
@@ -376,25 +424,16 @@ if FLASK_AVAILABLE:
             if not keyword:
                 return jsonify({"status": "error", "message": "关键词不能为空"})
 
-            config = load_web_config()
-
-            if "dingtalk" not in config or "robots" not in config["dingtalk"] or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "机器人配置不存在"})
-
-            robot = config["dingtalk"]["robots"][robot_index]
-            if "users" not in robot or phone not in robot["users"]:
-                return jsonify({"status": "error", "message": "用户不存在"})
+            def mutation(config):
+                user = _get_user(config, robot_index, phone)
+                if keyword not in user.get("keywords", []):
+                    raise ConfigUpdateError("要删除的关键词不存在")
+                user["keywords"].remove(keyword)
 
-            if "keywords" in robot["users"][phone] and keyword in robot["users"][phone]["keywords"]:
-                robot["users"][phone]["keywords"].remove(keyword)
-            else:
-                return jsonify({"status": "error", "message": "要删除的关键词不存在"})
-
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "关键词删除成功"})
-            else:
-                return jsonify({"status": "error", "message": f"删除失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "关键词删除成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"删除失败: {str(e)}"})
 
@@ -403,31 +442,29 @@ if FLASK_AVAILABLE:
     def update_robot():
         try:
             robot_index = int(request.json.get("robot_index", -1))
-            config = load_web_config()
-            
-            if robot_index < 0 or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "无效的机器人索引"})
             
             # 正确处理前端发送的嵌套数据结构
             robot_data = request.json.get("robot_data", {})
-            if robot_data:
-                config["dingtalk"]["robots"][robot_index]["name"] = robot_data.get("name", "未命名机器人")
-                config["dingtalk"]["robots"][robot_index]["token"] = robot_data.get("token", "")
-                config["dingtalk"]["robots"][robot_index]["secret"] = robot_data.get("secret", "")
-                config["dingtalk"]["robots"][robot_index]["receive_all"] = robot_data.get("receive_all", True)
-                config["dingtalk"]["robots"][robot_index]["enabled"] = robot_data.get("enabled", True)
-            else:
-                # 兼容不使用嵌套结构的请求
-                config["dingtalk"]["robots"][robot_index]["name"] = request.json.get("name", "未命名机器人")
-                config["dingtalk"]["robots"][robot_index]["token"] = request.json.get("token", "")
-                config["dingtalk"]["robots"][robot_index]["secret"] = request.json.get("secret", "")
-                config["dingtalk"]["robots"][robot_index]["receive_all"] = request.json.get("receive_all", True)
             
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "机器人配置更新成功"})
-            else:
-                return jsonify({"status": "error", "message": f"更新失败: {result}"})
+            def mutation(config):
+                robot = _get_robot(config, robot_index, "无效的机器人索引")
+                if robot_data:
+                    robot["name"] = robot_data.get("name", "未命名机器人")
+                    robot["token"] = robot_data.get("token", "")
+                    robot["secret"] = robot_data.get("secret", "")
+                    robot["receive_all"] = robot_data.get("receive_all", True)
+                    robot["enabled"] = robot_data.get("enabled", True)
+                else:
+                    # 兼容不使用嵌套结构的请求
+                    robot["name"] = request.json.get("name", "未命名机器人")
+                    robot["token"] = request.json.get("token", "")
+                    robot["secret"] = request.json.get("secret", "")
+                    robot["receive_all"] = request.json.get("receive_all", True)
+            
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "机器人配置更新成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             import traceback
             trace = traceback.format_exc()
@@ -439,20 +476,16 @@ if FLASK_AVAILABLE:
         try:
             robot_index = int(request.json.get("robot_index", -1))
             phone = str(request.json.get("phone", ""))
-            config = load_web_config()
 
-            if robot_index < 0 or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "无效的机器人索引"})
+            def mutation(config):
+                robot = _get_robot(config, robot_index, "无效的机器人索引")
+                _get_user(config, robot_index, phone)
+                del robot["users"][phone]
 
-            if "users" in config["dingtalk"]["robots"][robot_index] and phone in config["dingtalk"]["robots"][robot_index]["users"]:
-                del config["dingtalk"]["robots"][robot_index]["users"][phone]
-                result = save_config(config)
-                if result is True:
-                    return jsonify({"status": "success", "message": "用户删除成功"})
-                else:
-                    return jsonify({"status": "error", "message": f"删除失败: {result}"})
-            else:
-                return jsonify({"status": "error", "message": "用户不存在"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "用户删除成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"删除失败: {str(e)}"})
 
@@ -461,17 +494,12 @@ if FLASK_AVAILABLE:
     def save_llm_config():
         try:
             request_data = request.json
-            config = load_web_config()
-            if "error" in config:
-                return jsonify({"status": "error", "message": f"加载配置失败: {config['error']}"})
             
-            config["llm_config"] = request_data
+            def mutation(config):
+                config["llm_config"] = request_data
             
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "LLM配置保存成功"})
-            else:
-                return jsonify({"status": "error", "message": f"保存失败: {result}"})
+            config_store.update(mutation, robots=False)
+            return jsonify({"status": "success", "message": "LLM配置保存成功"})
         except Exception as e:
             import traceback
             trace = traceback.format_exc()
@@ -482,18 +510,15 @@ if FLASK_AVAILABLE:
     def delete_robot():
         try:
             robot_index = int(request.json.get("robot_index", -1))
-            config = load_web_config()
             
-            if robot_index < 0 or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": f"无效的机器人索引: {robot_index}"})
+            def mutation(config):
+                _get_robot(config, robot_index, f"无效的机器人索引: {robot_index}")
+                del config["dingtalk"]["robots"][robot_index]
             
-            del config["dingtalk"]["robots"][robot_index]
-            result = save_config(config)
-            
-            if result is True:
-                return jsonify({"status": "success", "message": "机器人删除成功"})
-            else:
-                return jsonify({"status": "error", "message": f"删除失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "机器人删除成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"删除失败: {str(e)}"})
 
@@ -503,22 +528,16 @@ if FLASK_AVAILABLE:
         try:
             robot_index = int(request.json.get("robot_index"))
             phone = str(request.json.get("phone"))
-            config = load_web_config()
 
-            if robot_index < 0 or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "无效的机器人索引"})
-            
-            user_data = config["dingtalk"]["robots"][robot_index]["users"].get(phone)
-            if not user_data:
-                return jsonify({"status": "error", "message": "用户不存在"})
+            def mutation(config):
+                _get_robot(config, robot_index, "无效的机器人索引")
+                user = _get_user(config, robot_index, phone)
+                user["always_at"] = not user.get("always_at", False)
 
-            user_data["always_at"] = not user_data.get("always_at", False)
-            
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "切换成功"})
-            else:
-                return jsonify({"status": "error", "message": f"切换失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "切换成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"切换失败: {str(e)}"})
             
@@ -530,44 +549,214 @@ if FLASK_AVAILABLE:
             phone = str(request.json.get("phone"))
             expire_date = request.json.get("expire_date", "")
             is_permanent = bool(request.json.get("is_permanent", True))
-            config = load_web_config()
 
-            if robot_index < 0 or robot_index >= len(config["dingtalk"]["robots"]):
-                return jsonify({"status": "error", "message": "无效的机器人索引"})
-            
-            user_data = config["dingtalk"]["robots"][robot_index]["users"].get(phone)
-            if not user_data:
-                return jsonify({"status": "error", "message": "用户不存在"})
+            def mutation(config):
+                _get_robot(config, robot_index, "无效的机器人索引")
+                user = _get_user(config, robot_index, phone)
+                # 更新有效期信息
+                user["expire_date"] = expire_date
+                user["is_permanent"] = is_permanent
 
-            # 更新有效期信息
-            user_data["expire_date"] = expire_date
-            user_data["is_permanent"] = is_permanent
-            
-            result = save_config(config)
-            if result is True:
-                return jsonify({"status": "success", "message": "有效期更新成功"})
-            else:
-                return jsonify({"status": "error", "message": f"更新失败: {result}"})
+            config_store.update(mutation)
+            return jsonify({"status": "success", "message": "有效期更新成功"})
+        except ConfigUpdateError as e:
+            return jsonify({"status": "error", "message": str(e)})
         except Exception as e:
             return jsonify({"status": "error", "message": f"更新失败: {str(e)}"})
 
-def run_web_app():
-    """运行Web配置界面"""
+    def _cached_json(build):
+        """
+        返回带ETag的JSON响应，配置和查询参数都未变化时直接返回304
+
+        Args:
+            build: 参数为只读配置、返回可序列化数据的函数
+        """
+        try:
+            config, version = config_store.snapshot()
+        except Exception as e:
+            return jsonify({"status": "error", "message": f"加载配置失败: {str(e)}"}), 500
+        # 过期状态按天计算，日期也作为ETag的一部分
+        key = f"{version}|{datetime.now().strftime('%Y-%m-%d')}|{request.full_path}"
+        etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        # 响应压缩后ETag会变为弱ETag，按弱比较
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify(build(config))
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    @app.route('/api/robots')
+    @login_required
+    def api_robots():
+        return _cached_json(lambda config: {"status": "success", "robots": robot_summaries(config)})
+
+    @app.route('/api/users')
+    @login_required
+    def api_users():
+        robot = request.args.get("robot", "")
+        try:
+            robot_index = int(robot) if robot != "" else None
+            page = max(1, int(request.args.get("page", 1)))
+            per_page = min(MAX_PAGE_SIZE, max(1, int(request.args.get("per_page", DEFAULT_PAGE_SIZE))))
+        except ValueError:
+            return jsonify({"status": "error", "message": "分页参数必须为整数"}), 400
+        phone = request.args.get("phone", "").strip()
+        keyword = request.args.get("keyword", "").strip()
+
+        def build(config):
+            users = query_users(config, robot_index, phone, keyword)
+            start = (page - 1) * per_page
+            return {
+                "status": "success",
+                "total": len(users),
+                "page": page,
+                "per_page": per_page,
+                "users": users[start:start + per_page],
+            }
+
+        return _cached_json(build)
+
+    def _get_search_database():
+        """获取用于搜索的数据库，监控在本进程中运行时复用其实例"""
+        global _search_database
+        if database_instance is not None:
+            return database_instance
+        with _search_database_lock:
+            if _search_database is None:
+                from informer.database import Database
+                _search_database = Database()
+            return _search_database
+
+    @app.route('/search')
+    @login_required
+    def search_posts():
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"status": "error", "message": "搜索词不能为空"}), 400
+        sort = request.args.get("sort", "relevance")
+        if sort not in ("relevance", "time"):
+            return jsonify({"status": "error", "message": f"不支持的排序方式: {sort}"}), 400
+        try:
+            page = max(1, int(request.args.get("page", 1)))
+            per_page = min(MAX_PAGE_SIZE, max(1, int(request.args.get("per_page", SEARCH_PAGE_SIZE))))
+            days = request.args.get("days", "")
+            days = max(1, int(days)) if days else None
+        except ValueError:
+            return jsonify({"status": "error", "message": "分页和天数参数必须为整数"}), 400
+
+        try:
+            result = _get_search_database().search_posts(
+                query, forum=request.args.get("forum") or None, days=days,
+                page=page, per_page=per_page, sort=sort
+            )
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({"status": "error", "message": str(e)}), 503
+        except Exception as e:
+            logger.error(f"搜索帖子失败: {e}")
+            return jsonify({"status": "error", "message": f"搜索失败: {str(e)}"}), 500
+        return jsonify({"status": "success", **result})
+
+    @app.route('/import_subscriptions', methods=['POST'])
+    @login_required
+    def import_subscriptions():
+        try:
+            # 支持上传CSV/JSON文件，或直接提交JSON（行列表或包含rows字段的对象）
+            upload = request.files.get("file")
+            if upload:
+                fmt = request.form.get("format") or ("csv" if upload.filename.lower().endswith(".csv") else "json")
+                rows = parse_rows(upload.read(), fmt)
+                mode = request.form.get("mode", "merge")
+            else:
+                data = request.get_json(silent=True)
+                if data is None:
+                    return jsonify({"status": "error", "message": "请上传CSV/JSON文件或提交JSON数据"})
+                rows = parse_rows(data, "json")
+                mode = data.get("mode", "merge") if isinstance(data, dict) else "merge"
+
+            # 整批数据在一次配置修改中校验并应用，只写入一次文件、只重建一次通知器
+            stats = config_store.update(lambda config: apply_rows(config, rows, mode))
+            logger.info(f"批量导入订阅完成: {stats}")
+            return jsonify({"status": "success", "message": "批量导入成功", "stats": stats})
+        except SubscriptionImportError as e:
+            return jsonify({"status": "error", "message": str(e),
+                            "errors": [{"line": line, "message": message} for line, message in e.errors]})
+        except Exception as e:
+            return jsonify({"status": "error", "message": f"导入失败: {str(e)}"})
+
+    @app.route('/export_subscriptions')
+    @login_required
+    def export_subscriptions():
+        fmt = request.args.get("format", "csv")
+        if fmt not in ("csv", "json"):
+            return jsonify({"status": "error", "message": f"不支持的格式: {fmt}"}), 400
+        # 取当前配置的只读快照，导出过程中的修改不影响本次导出
+        config = load_web_config()
+        if "error" in config:
+            return jsonify({"status": "error", "message": config["error"]}), 500
+
+        filename = f"subscriptions-{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+        if fmt == "csv":
+            body, mimetype = export_csv(config), "text/csv"
+        else:
+            body, mimetype = export_json(config), "application/json"
+        return Response(stream_with_context(body), mimetype=f"{mimetype}; charset=utf-8",
+                        headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+def run_web_app(web_config=None):
+    """
+    运行Web配置界面，收到 SIGINT/SIGTERM 后返回
+    
+    Args:
+        web_config: Web服务配置，为空时使用默认配置
+    """
     if FLASK_AVAILABLE:
-        host = "0.0.0.0"  # 默认绑定到所有接口
-        port = 5000
-        debug = False
+        from informer.config import WebConfig
+        from informer.web_server import create_server
         
         # 检查是否在 Docker 环境中运行
         in_docker = os.environ.get('DOCKER_ENV', '').lower() == 'true'
         if in_docker:
             logger.info("检测到 Docker 环境，使用 Docker 特定设置")
         
-        logger.info(f"正在启动Web配置界面，请访问 http://{host}:{port}")
-        app.run(host=host, port=port, debug=debug)
+        server = create_server(app, web_config or WebConfig())
+        startup.mark("启动Web服务")
+        startup.log_phases()
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            logger.info("收到停止信号，正在关闭Web配置界面...")
+        finally:
+            server.close()
     else:
         pass
 
+def _handle_sigterm(signum, frame):
+    """把 SIGTERM 转换为 SystemExit，使 Web 服务器和监控按 Ctrl+C 相同的流程退出"""
+    raise SystemExit(0)
+
+def shutdown(monitor_thread=None, timeout=15):
+    """
+    停止监控并写入尚未落盘的配置修改
+    
+    Args:
+        monitor_thread: 运行 start_monitor 的线程
+        timeout: 等待监控线程退出的最长时间（秒）
+    """
+    if monitor_instance:
+        monitor_instance.stop(timeout)
+    if monitor_thread:
+        monitor_thread.join(timeout)
+        if monitor_thread.is_alive():
+            logger.warning(f"监控线程未在 {timeout} 秒内退出")
+    if _search_database is not None:
+        _search_database.close()
+    config_store.flush()
+    logger.info("程序已退出")
+
 def check_expiring_users():
     """定时检查并通知即将过期的用户"""
     try:
@@ -576,12 +765,17 @@ def check_expiring_users():
         if not notifier_instance:
             logger.warning("无法执行过期检查：通知器实例不可用")
             return
+        
+        # 多实例运行时只由主实例发送过期通知，避免重复
+        if coordinator_instance and not coordinator_instance.is_leader():
+            logger.info("当前为备用实例，跳过用户过期检查")
+            return
             
         logger.info("开始执行用户过期检查...")
         
         # 导入过期管理器
         from informer.expiration_manager import ExpirationManager
-        expiration_manager = ExpirationManager(notifier_instance)
+        expiration_manager = ExpirationManager(notifier_instance, database_instance)
         expiration_manager.check_and_notify_expiring_users()
         
         logger.info("用户过期检查完成")
@@ -599,6 +793,7 @@ def main():
     from informer.config import load_config
     from informer.logger import setup_logger
 
+    startup.mark("导入")
     config = load_config()
     setup_logger(
         config.log_config.file,
@@ -606,9 +801,36 @@ def main():
         config.log_config.max_backups,
         config.log_config.max_age,
         config.log_config.compress,
-        config.log_config.level
+        config.log_config.level,
+        config.log_config.queue_size,
+        config.log_config.drop_policy,
+        config.log_config.module_levels,
+        config.log_config.repeat_interval
     )
+    startup.mark("加载配置")
     
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    mode = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if mode == '--split':
+        logger.info("以--split模式启动，监控和Web配置界面分别在独立的子进程中运行。")
+        run_split(config)
+        return
+
+    if mode == '--web':
+        # 监控在独立进程中运行（--monitor），配置变化和运行状态通过IPC传递；监控进程未运行时Web界面照常可用
+        global monitor_client
+        logger.info("以--web模式启动，只运行Web配置界面。")
+        try:
+            monitor_client = IpcClient(config.ipc.address, resolve_authkey(config.ipc.authkey))
+        except ValueError as e:
+            logger.error(str(e))
+            return
+        run_web_app(config.web)
+        monitor_client.close()
+        shutdown()
+        return
+
     # 设置每天上午12点检查用户过期情况（改为12点）
     schedule.every().day.at("12:00").do(check_expiring_users)
     
@@ -622,10 +844,15 @@ def main():
     schedule_thread.start()
     logger.info("已启动用户过期检查定时任务")
 
-    if len(sys.argv) > 1 and sys.argv[1] == '--web':
-        logger.info("以--web模式启动，只运行Web配置界面。")
-        run_web_app()
-        return
+    ipc_server = None
+    if mode == '--monitor':
+        logger.info("以--monitor模式启动，只运行监控，Web配置界面通过IPC连接。")
+        try:
+            ipc_server = IpcServer(config.ipc.address, _ipc_handlers(), resolve_authkey(config.ipc.authkey))
+        except ValueError as e:
+            logger.error(str(e))
+            return
+        ipc_server.start()
 
     # 先启动监控线程，初始化notifier_instance
     monitor_thread = threading.Thread(target=start_monitor, args=(config,), daemon=True)
@@ -637,6 +864,8 @@ def main():
         time.sleep(0.5)
         wait_count += 1
     
+    startup.mark("初始化监控")
+    
     # 在notifier_instance初始化完成后，执行一次用户过期检查
     if notifier_instance:
         threading.Thread(target=check_expiring_users, daemon=True).start()
@@ -644,18 +873,126 @@ def main():
     else:
         logger.warning("等待通知器初始化超时，首次过期检查将在下次定时任务触发时执行")
     
-    run_web_app()
+    try:
+        if mode == '--monitor':
+            startup.log_phases()
+            while monitor_thread.is_alive():
+                monitor_thread.join(1)
+        else:
+            run_web_app(config.web)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("收到停止信号，正在停止监控...")
+    finally:
+        if ipc_server:
+            ipc_server.stop()
+        shutdown(monitor_thread)
+
+def _ipc_handlers():
+    """监控进程提供给Web进程的IPC命令"""
+    def update_robots(robots):
+        if not notifier_instance:
+            raise RuntimeError("通知器尚未初始化")
+        notifier_instance.update_robots(robots)
+        logger.info(f"已通过IPC更新钉钉机器人配置，共 {len(robots)} 个机器人")
+        return len(robots)
+
+    def render_metrics():
+        from informer import metrics
+        return metrics.render()
+
+    return {
+        "ping": lambda: {"pid": os.getpid()},
+        "status": get_monitor_status,
+        "metrics": render_metrics,
+        "update_robots": update_robots,
+    }
+
+def get_monitor_status():
+    """
+    获取本进程中监控器的运行状态
+    
+    Returns:
+        dict: 各板块统计、消息队列长度等；监控器未初始化时running为False
+    """
+    if not monitor_instance:
+        return {"running": False, "pid": os.getpid()}
+    return {
+        "running": not monitor_instance.stop_event.is_set(),
+        "pid": os.getpid(),
+        "boards": monitor_instance.get_board_stats(),
+        "queue_depth": monitor_instance.message_queue.qsize(),
+        "leader": coordinator_instance.is_leader() if coordinator_instance else True,
+    }
+
+def run_split(config):
+    """分进程运行：监控进程和Web进程由本进程启动和看护，任一子进程退出后单独重启，不影响另一个"""
+    import secrets
+    import subprocess
+    
+    # 未配置认证密钥时生成一个，通过环境变量（而非命令行参数，避免被其他用户从进程列表看到）传给两个子进程
+    env = dict(os.environ)
+    if not config.ipc.authkey and not env.get(AUTHKEY_ENV):
+        env[AUTHKEY_ENV] = secrets.token_hex(32)
+    
+    children = {}
+    for name in ("monitor", "web"):
+        children[name] = {"process": None, "started": 0.0, "delay": 1.0, "next_start": 0.0}
+    
+    def spawn(name, state):
+        state["process"] = subprocess.Popen([sys.executable, "-m", "informer.main", f"--{name}"], env=env)
+        state["started"] = time.monotonic()
+        logger.info(f"已启动{name}子进程，PID: {state['process'].pid}")
+    
+    try:
+        while True:
+            now = time.monotonic()
+            for name, state in children.items():
+                process = state["process"]
+                if process is not None and process.poll() is None:
+                    continue
+                if process is not None:
+                    logger.warning(f"{name}子进程已退出，返回码: {process.returncode}")
+                    state["process"] = None
+                    # 启动后很快退出时逐步延长重启间隔，避免反复崩溃时占满CPU
+                    if now - state["started"] < 30:
+                        state["delay"] = min(state["delay"] * 2, 60.0)
+                    else:
+                        state["delay"] = 1.0
+                    state["next_start"] = now + state["delay"]
+                    logger.info(f"{state['delay']:.0f} 秒后重启{name}子进程")
+                if now >= state["next_start"]:
+                    spawn(name, state)
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("收到停止信号，正在停止子进程...")
+    finally:
+        processes = [state["process"] for state in children.values() if state["process"] is not None]
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"子进程 {process.pid} 未在20秒内退出，强制结束")
+                process.kill()
+        logger.info("所有子进程已退出")
 
 def start_monitor(config):
     """启动监控逻辑"""
-    global notifier_instance
+    global notifier_instance, coordinator_instance, monitor_instance, database_instance
     try:
         from informer.database import Database
         from informer.notifier import MultiRobotNotifier
         from informer.proxy_manager import ProxyManager
         from informer.monitor import ChiphellMonitor
 
-        database = Database()
+        database = database_instance = Database()
+        
+        if config.coordination.enabled:
+            from informer.coordinator import Coordinator
+            coordinator_instance = Coordinator(database, config.coordination)
+            coordinator_instance.start()
         
         proxy_manager = None
         if config.proxy_pool_api:
@@ -663,6 +1000,16 @@ def start_monitor(config):
         
         notifier_instance = MultiRobotNotifier(config.dingtalk.robots)
         
+        recorder = None
+        if config.recording.enabled:
+            from informer.recorder import PageRecorder
+            recorder = PageRecorder(config.recording.path)
+        
+        archive = None
+        if config.archive.enabled:
+            from informer.archive import ArchiveWriter
+            archive = ArchiveWriter(database, config.archive)
+        
         if config.llm_config:
             logger.info(f"LLM配置已加载，使用模型: {config.llm_config.model}")
         else:
@@ -675,10 +1022,23 @@ def start_monitor(config):
             database,
             config.wait_time_range,
             proxy_manager,
-            config.llm_config
+            config.llm_config,
+            config.boards,
+            config.adaptive_polling,
+            config.catchup,
+            coordinator_instance,
+            config.latency,
+            recorder,
+            archive=archive
         )
+        monitor_instance = monitor
         logger.info("监控器初始化完成，开始在后台监控...")
         
+        # 监视配置文件，只把变化的部分应用到运行中的组件
+        from informer.config_watcher import ConfigWatcher
+        config_watcher = ConfigWatcher(CONFIG_PATH, config, monitor.apply_config)
+        config_watcher.start()
+        
         monitor.monitor()
     
     except KeyboardInterrupt:
@@ -694,6 +1054,30 @@ def start_monitor(config):
         
         time.sleep(5)
     finally:
+        try:
+            if coordinator_instance:
+                coordinator_instance.stop()
+        except:
+            pass
+        
+        try:
+            if 'recorder' in locals() and recorder:
+                recorder.close()
+        except:
+            pass
+        
+        try:
+            if 'archive' in locals() and archive:
+                archive.close()
+        except:
+            pass
+        
+        try:
+            if 'config_watcher' in locals():
+                config_watcher.stop()
+        except:
+            pass
+        
         try:
             if 'database' in locals() and hasattr(database, 'close'):
                 database.close()
@@ -0,0 +1,361 @@
+"""
+指标模块 - Prometheus文本格式的运行指标
+
+计数器和直方图按线程分片写入，热路径上不需要加锁；
+只有首次在某个线程中写入、线程结束以及导出时才会访问共享结构。
+"""
+
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _ShardOwner:
+    """线程本地的分片持有者，线程结束后被回收，触发把分片并入已结束线程的汇总"""
+
+    __slots__ = ("shard", "__weakref__")
+
+
+def _escape(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    """指标基类"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        初始化指标
+
+        Args:
+            name: 指标名称
+            documentation: 指标说明
+            labelnames: 标签名称列表
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._retired = {}  # 已结束线程的分片之和
+        self._shards = {}  # id(分片) -> 存活线程的分片
+        self._shards_lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        """将标签字典转换为分片中的键"""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _shard(self):
+        """获取当前线程的分片，首次使用时注册"""
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            owner = _ShardOwner()
+            owner.shard = {}
+            self._local.owner = owner
+            # 线程结束时线程本地数据被释放，分片并入汇总，每请求一个线程的Web服务器不会使分片无限增长
+            weakref.finalize(owner, self._retire, owner.shard)
+            with self._shards_lock:
+                self._shards[id(owner.shard)] = owner.shard
+        return owner.shard
+
+    def _retire(self, shard):
+        """把已结束线程的分片并入汇总"""
+        with self._shards_lock:
+            del self._shards[id(shard)]
+            for key, value in shard.items():
+                self._merge(self._retired, key, value)
+
+    def _merge(self, target, key, value):
+        raise NotImplementedError
+
+    def _snapshot(self):
+        """返回所有分片的副本，用于导出"""
+        # 在锁内复制，分片并入汇总的过程中不会被重复或遗漏统计
+        with self._shards_lock:
+            return [dict(self._retired)] + [dict(shard) for shard in self._shards.values()]
+
+    def _format_labels(self, key, extra=None):
+        """格式化标签字符串"""
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.extend(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        """
+        导出为Prometheus文本格式
+
+        Returns:
+            list: 文本行列表
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        增加计数
+
+        Args:
+            amount: 增加量
+            **labels: 标签值
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, target, key, value):
+        target[key] = target.get(key, 0) + value
+
+    def value(self, **labels):
+        """
+        获取当前计数（所有线程之和）
+
+        Returns:
+            float: 计数值
+        """
+        key = self._key(labels)
+        return sum(shard.get(key, 0) for shard in self._snapshot())
+
+    def _render_samples(self):
+        totals = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in sorted(totals.items())]
+
+
+class Histogram(_Metric):
+    """直方图"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            name: 指标名称
+            documentation: 指标说明
+            labelnames: 标签名称列表
+            buckets: 桶上界列表
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值
+            **labels: 标签值
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # [各桶计数..., +Inf桶计数, 总和]
+            state = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[key] = state
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _merge(self, target, key, value):
+        # 汇总中总是放入新列表，导出时复制出的字典不会看到修改到一半的值
+        existing = target.get(key)
+        target[key] = [a + b for a, b in zip(existing, value)] if existing else list(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        统计代码块耗时（秒）
+
+        Args:
+            **labels: 标签值
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def merged(self):
+        """
+        合并所有线程的分片
+
+        Returns:
+            dict: 标签键 -> [各桶计数..., +Inf桶计数, 总和]
+        """
+        merged = {}
+        for shard in self._snapshot():
+            for key, state in shard.items():
+                state = list(state)
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], state)]
+                else:
+                    merged[key] = state
+        return merged
+
+    def _render_samples(self):
+        lines = []
+        for key, state in sorted(self.merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {state[-1]}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """瞬时值，可直接设置，也可以在导出时通过回调函数计算"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = None
+
+    def set(self, value, **labels):
+        """
+        设置当前值
+
+        Args:
+            value: 数值
+            **labels: 标签值
+        """
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """
+        设置导出时调用的回调函数
+
+        Args:
+            function: 无参函数；无标签时返回数值，有标签时返回 {标签值元组: 数值}
+        """
+        self._function = function
+
+    def _render_samples(self):
+        values = dict(self._values)
+        if self._function:
+            try:
+                result = self._function()
+            except Exception:
+                result = None
+            if isinstance(result, dict):
+                values.update({tuple(str(v) for v in key): value for key, value in result.items()})
+            elif result is not None:
+                values[()] = result
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in sorted(values.items())]
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        """注册指标"""
+        with self.lock:
+            self.metrics.append(metric)
+
+    def render(self):
+        """
+        导出所有指标
+
+        Returns:
+            str: Prometheus文本格式内容
+        """
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 监控循环
+POLL_DURATION = Histogram(
+    "informer_poll_duration_seconds", "单次板块轮询（抓取、解析、处理）耗时", ["board"])
+FETCH_DURATION = Histogram(
+    "informer_fetch_duration_seconds", "页面请求耗时", ["kind", "proxy_class"])
+FETCH_FAILURES = Counter(
+    "informer_fetch_failures_total", "页面请求失败次数", ["kind", "proxy_class"])
+PARSE_DURATION = Histogram(
+    "informer_parse_duration_seconds", "页面解析耗时", ["kind"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+# 检测延迟：从卖家发帖到钉钉确认收到通知
+LAG_BUCKETS = (1, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+POST_STAGE_LAG = Histogram(
+    "informer_post_stage_lag_seconds", "帖子在各处理阶段的耗时（detect为发帖到被发现）", ["stage"],
+    buckets=LAG_BUCKETS)
+POST_TOTAL_LAG = Histogram(
+    "informer_post_total_lag_seconds", "帖子从发布（未知时从被发现）到通知送达的总耗时", ["origin"],
+    buckets=LAG_BUCKETS)
+
+# 消息队列
+MESSAGE_QUEUE_DEPTH = Gauge("informer_message_queue_depth", "通知消息队列当前长度")
+MESSAGE_QUEUE_DROPPED = Counter("informer_message_queue_dropped_total", "队列已满被丢弃的通知消息数")
+
+# 代理池
+PROXY_POOL_SIZE = Gauge("informer_proxy_pool_size", "代理池中可用代理数量", ["pool"])
+
+# LLM
+LLM_DURATION = Histogram("informer_llm_request_duration_seconds", "LLM分析请求耗时", ["provider"])
+LLM_FAILURES = Counter("informer_llm_failures_total", "LLM分析失败次数", ["provider"])
+
+# 钉钉
+WEBHOOK_DURATION = Histogram("informer_webhook_duration_seconds", "钉钉Webhook请求耗时", ["robot"])
+WEBHOOK_RESPONSES = Counter("informer_webhook_responses_total", "钉钉Webhook响应次数（按错误码）", ["robot", "code"])
+
+# 帖子归档
+ARCHIVE_WRITE_DURATION = Histogram(
+    "informer_archive_write_duration_seconds", "每批帖子归档的写入耗时",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+ARCHIVE_DROPPED = Counter("informer_archive_dropped_total", "归档队列已满未能归档的帖子数")
+
+# 日志
+LOG_DROPPED = Counter("informer_log_dropped_total", "日志队列已满被丢弃的日志条数", ["sink"])
+
+# 数据库
+DB_QUERY_DURATION = Histogram(
+    "informer_db_query_duration_seconds", "数据库语句执行耗时", ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+
+
+def render():
+    """
+    导出所有指标
+
+    Returns:
+        str: Prometheus文本格式内容
+    """
+    return REGISTRY.render()
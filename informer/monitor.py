@@ -2,14 +2,29 @@
 监控器模块 - 处理论坛监控
 """
 
+import json
 import queue
 import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from loguru import logger
 
+from informer import metrics
+from informer.logger import log_throttled
+from informer.config import BoardConfig, CatchupConfig, LatencyConfig
 from informer.fetcher import Fetcher
 from informer.llm_analyzer import LLMAnalyzer
+from informer.scheduler import AdaptivePollScheduler
+
+# 未配置boards时默认监控的板块
+DEFAULT_BOARD = BoardConfig(
+    name="Chiphell-二手交易区",
+    url="https://www.chiphell.com/forum-26-1.html"
+)
+
+# 帖子在处理流程中依次记录的时间点，相邻时间点之差即为该阶段耗时
+LAG_STAGES = ("published", "detected", "detail_fetched", "analyzed", "enqueued", "acked")
 
 
 class NotificationMessage:
@@ -27,11 +42,32 @@ class NotificationMessage:
         self.at_phones = at_phones or []
 
 
+class BoardStats:
+    """单个板块的监控统计"""
+    
+    def __init__(self):
+        self.polls = 0  # 轮询次数
+        self.not_modified = 0  # 页面未变化（304）次数
+        self.failures = 0  # 失败次数
+        self.posts_seen = 0  # 解析到的帖子总数
+        self.new_posts = 0  # 新帖子数量
+        self.catchup_posts = 0  # 翻页补抓获取的帖子数量
+        self.last_poll_time = None  # 最近一次轮询时间戳
+        self.last_success_time = None  # 最近一次成功轮询时间戳
+        self.last_error = None  # 最近一次错误信息
+    
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
 class ChiphellMonitor:
     """Chiphell论坛监控器"""
     
     def __init__(self, cookies, user_keywords, notifier, database, 
-                 wait_time_range, proxy_manager=None, llm_config=None):
+                 wait_time_range, proxy_manager=None, llm_config=None, boards=None,
+                 adaptive_polling=None, catchup=None, coordinator=None, latency=None,
+                 recorder=None, clock=None, archive=None):
         """
         初始化Chiphell监视器
         
@@ -43,14 +79,36 @@ class ChiphellMonitor:
             wait_time_range: 等待时间范围
             proxy_manager: 代理管理器实例
             llm_config: LLM配置
+            boards: 监控的板块配置列表，为空时只监控默认二手区
+            adaptive_polling: 自适应轮询配置，为空或未启用时使用固定的随机等待时间
+            catchup: 翻页补抓配置，为空时使用默认配置
+            coordinator: 多实例协调器，为空时单实例运行
+            latency: 检测延迟目标配置，为空时使用默认配置
+            recorder: 页面录制器，为空时不录制
+            clock: 提供time()和sleep()的时钟，为空时使用time模块；回放时可传入加速的模拟时钟
+            archive: 帖子归档写入器，为空时不归档
         """
-        self.forum_name = "Chiphell-二手交易区"  # 监控的论坛名称
+        self.boards = boards or [DEFAULT_BOARD]  # 监控的板块列表
+        self.board_stats = {board.name: BoardStats() for board in self.boards}  # 各板块的统计
         self.database = database  # 数据库实例
         self.notifier = notifier  # 通知器实例
         self.wait_time_range = wait_time_range  # 等待时间范围
+        self.catchup = catchup or CatchupConfig()  # 翻页补抓配置
+        self.coordinator = coordinator  # 多实例协调器
+        self.latency = latency or LatencyConfig()  # 检测延迟目标配置
+        self.clock = clock or time  # 时钟，用于轮询等待和延迟统计
+        self.archive = archive  # 帖子归档写入器
+        self.dedup_lock = threading.Lock()  # 串行化跨板块的去重检查，相互重叠的板块同时发现同一帖子时只处理一次
+        
+        # 各板块的自适应轮询调度器
+        self.schedulers = {}
+        if adaptive_polling and adaptive_polling.enabled:
+            for board in self.boards:
+                self.schedulers[board.name] = AdaptivePollScheduler(database, board.name, adaptive_polling)
+            logger.info(f"已启用自适应轮询，间隔范围: {adaptive_polling.floor}-{adaptive_polling.ceiling}秒")
         
         # 创建抓取器
-        self.fetcher = Fetcher(proxy_manager, cookies)
+        self.fetcher = Fetcher(proxy_manager, cookies, recorder)
         
         # 创建LLM分析器（如果提供了配置）
         self.llm_analyzer = None
@@ -58,8 +116,13 @@ class ChiphellMonitor:
             self.llm_analyzer = LLMAnalyzer(llm_config)
             logger.info(f"已初始化LLM分析器: {llm_config.model}")
             
+        # 停止信号，设置后各板块线程在当前轮询结束后退出，消息处理线程发送完剩余消息后退出
+        self.stop_event = threading.Event()
+        self.board_threads = []
+        
         # 消息队列和处理线程
         self.message_queue = queue.Queue(maxsize=100)
+        metrics.MESSAGE_QUEUE_DEPTH.set_function(self.message_queue.qsize)
         self._start_message_processor()
         
         # 显示机器人配置信息，用于调试
@@ -102,7 +165,7 @@ class ChiphellMonitor:
     def _start_message_processor(self):
         """启动消息处理线程"""
         def processor():
-            while True:
+            while not self.stop_event.is_set() or not self.message_queue.empty():
                 try:
                     # 收集消息，每3秒一批
                     messages = []
@@ -134,8 +197,8 @@ class ChiphellMonitor:
                     logger.error(f"处理消息队列时出错: {e}")
         
         # 启动处理线程
-        thread = threading.Thread(target=processor, daemon=True)
-        thread.start()
+        self.processor_thread = threading.Thread(target=processor, name="message-processor", daemon=True)
+        self.processor_thread.start()
         logger.info("消息处理器已启动")
     
     def _batch_process_messages(self, messages):
@@ -210,9 +273,97 @@ class ChiphellMonitor:
         
         if success:
             logger.debug(f"成功发送{len(messages)}条合并消息到匹配的机器人")
+            acked = self.clock.time()
+            for msg in messages:
+                timestamps = msg.post_data.get('timestamps')
+                if timestamps is not None:
+                    timestamps['acked'] = acked
+                    self._record_lag(msg.post_data)
         else:
             logger.warning(f"没有机器人匹配到帖子标题 '{post_title}' 或发送失败")
     
+    def _record_lag(self, post_data):
+        """
+        记录帖子各阶段及总的检测延迟，超过SLO时输出结构化日志
+        
+        Args:
+            post_data: 包含timestamps的帖子数据字典
+        """
+        timestamps = post_data['timestamps']
+        stages = {}
+        previous = None
+        for stage in LAG_STAGES:
+            current = timestamps.get(stage)
+            if current is None:
+                continue
+            if previous is not None:
+                # 列表页的发帖时间只精确到分钟，可能略晚于发现时间
+                stages[stage] = max(0.0, current - previous)
+                metrics.POST_STAGE_LAG.observe(stages[stage], stage=stage)
+            previous = current
+        
+        origin = "published" if timestamps.get('published') is not None else "detected"
+        total = max(0.0, timestamps['acked'] - timestamps[origin])
+        metrics.POST_TOTAL_LAG.observe(total, origin=origin)
+        
+        if total > self.latency.slo_seconds:
+            record = {
+                "event": "detection_lag_slo_exceeded",
+                "title": post_data.get('title', ''),
+                "link": post_data.get('link', ''),
+                "origin": origin,
+                "total_seconds": round(total, 3),
+                "slo_seconds": self.latency.slo_seconds,
+                "stages": {stage: round(value, 3) for stage, value in stages.items()},
+            }
+            logger.bind(lag=record).warning(f"帖子通知延迟超过SLO: {json.dumps(record, ensure_ascii=False)}")
+    
+    def apply_config(self, changes):
+        """
+        将配置变化应用到运行中的组件，只替换发生变化的部分
+        
+        Args:
+            changes: 配置差异 {字段名: (旧值, 新值)}
+            
+        Returns:
+            list: 已应用的字段名
+        """
+        applied = []
+        for name, (old, new) in changes.items():
+            try:
+                if name == "cookies":
+                    self.fetcher.set_cookies(new)
+                elif name == "proxy_pool_api":
+                    if not self.fetcher.proxy_manager or not new:
+                        logger.warning("启用或停用代理池需要重启才能生效")
+                        continue
+                    self.fetcher.proxy_manager.update_api_url(new)
+                elif name == "wait_time_range":
+                    self.wait_time_range = new
+                    logger.info(f"已更新等待时间范围: {new.min}-{new.max}秒")
+                elif name == "llm_config":
+                    self.llm_analyzer = LLMAnalyzer(new) if new else None
+                    logger.info(f"已重新创建LLM分析器: {new.model if new else '已禁用'}")
+                elif name == "dingtalk":
+                    if not self.notifier.update_robots(new.robots):
+                        # Web界面保存时已推送给通知器
+                        continue
+                elif name == "catchup":
+                    self.catchup = new
+                elif name == "latency":
+                    self.latency = new
+                else:
+                    logger.warning(f"配置项 {name} 修改后需要重启才能生效")
+                    continue
+                applied.append(name)
+            except Exception as e:
+                # 单个配置项应用失败不影响其他配置项
+                logger.error(f"应用配置项 {name} 失败: {e}")
+        
+        if applied:
+            logger.info(f"已热更新配置: {', '.join(applied)}")
+        return applied
+    
     def _enqueue_notification(self, post_data, at_phones=None):
         """
         将通知消息放入队列
@@ -222,10 +373,13 @@ class ChiphellMonitor:
             at_phones: 需要@的手机号列表
         """
         try:
+            if post_data.get('timestamps') is not None:
+                post_data['timestamps']['enqueued'] = self.clock.time()
             notification = NotificationMessage(post_data, at_phones)
             self.message_queue.put(notification, block=False)
         except queue.Full:
-            logger.warning("消息队列已满，消息被丢弃")
+            metrics.MESSAGE_QUEUE_DROPPED.inc()
+            log_throttled("WARNING", "message-queue-full", "消息队列已满，消息被丢弃")
     
     def _process_notification(self, post, details, analysis_result=None):
         """
@@ -244,25 +398,28 @@ class ChiphellMonitor:
             "link": post.get('link', ''),
             "details": details,  # 包含 qq, phone, price, address, trade_range, post_type, post_content
             "analysis_result": analysis_result,  # LLM结果
+            "timestamps": post.get('timestamps'),  # 各处理阶段的时间点，用于统计检测延迟
         }
         
         # 不再在这里执行关键词匹配，发送通知时会进行匹配
         # 发送空的at_phones列表，实际的@列表将在发送时生成
         self._enqueue_notification(post_data, [])
     
-    def _fetch_page_content(self):
+    def _fetch_page_content(self, board):
         """
-        获取论坛页面内容
+        获取板块列表页内容
         
+        Args:
+            board: 板块配置
+            
         Returns:
-            str: 页面内容
+            str: 页面内容，页面自上次获取后未变化时为None
             
         Raises:
             Exception: 获取失败
         """
         try:
-            url = "https://www.chiphell.com/forum-26-1.html"
-            content = self.fetcher.fetch_with_proxies(url)
+            content = self.fetcher.fetch_with_proxies(board.url, conditional=True, kind="list")
             return content
         except Exception as e:
             raise Exception(f"获取页面内容失败: {e}")
@@ -281,24 +438,32 @@ class ChiphellMonitor:
             Exception: 获取失败
         """
         try:
-            content = self.fetcher.fetch_with_proxies(post_url)
-            details = self.fetcher.parse_post_content(content)
+            content = self.fetcher.fetch_with_proxies(post_url, kind="detail")
             
-            # 提取帖子正文内容
-            post_content = self.fetcher.extract_post_content(content)
+            with metrics.PARSE_DURATION.time(kind="detail"):
+                details = self.fetcher.parse_post_content(content)
+                
+                # 提取帖子正文内容
+                post_content = self.fetcher.extract_post_content(content)
             details['post_content'] = post_content
             
             return details
         except Exception as e:
             raise Exception(f"获取帖子内容失败: {e}")
     
-    def process_posts(self, posts):
+    def process_posts(self, posts, board):
         """
         处理帖子列表
         
         Args:
             posts: 帖子列表
+            board: 帖子所属的板块配置
+            
+        Returns:
+            int: 新帖子数量
         """
+        stats = self.board_stats[board.name]
+        new_count = 0
         for post in posts:
             # 从帖子链接中提取ID
             post_id = self.fetcher.extract_post_id(post['link'])
@@ -307,10 +472,26 @@ class ChiphellMonitor:
                 continue
             
             # 检查是否为新帖子
-            if self.database.is_new_post(self.forum_name, post_id):
-                # 存储帖子ID
-                self.database.store_post(self.forum_name, post_id, post['title'], post['link'])
-                logger.info(f"检测到新帖子: 标题: {post['title']} 链接: {post['link']}")
+            if self.database.is_new_post(board.name, post_id):
+                # 多实例运行时先认领帖子，认领失败说明其他实例已处理
+                if self.coordinator and not self.coordinator.claim_post(board.name, post_id):
+                    logger.info(f"[{board.name}] 帖子 {post_id} 已由其他实例处理，跳过")
+                    continue
+                
+                # 记录发帖时间和发现时间
+                timestamps = {'published': post.get('published_at'), 'detected': self.clock.time()}
+                post['timestamps'] = timestamps
+                
+                # 存储帖子ID；帖子ID在全站唯一，相互重叠的板块（如整个板块和其中的分类）只通知一次
+                with self.dedup_lock:
+                    handled_by = self.database.get_post_forums(post_id)
+                    self.database.store_post(board.name, post_id, post['title'], post['link'])
+                stats.new_posts += 1
+                new_count += 1
+                if handled_by:
+                    logger.info(f"[{board.name}] 帖子 {post_id} 已在板块 [{handled_by[0]}] 中处理，跳过通知")
+                    continue
+                logger.info(f"[{board.name}] 检测到新帖子: 标题: {post['title']} 链接: {post['link']}")
                 
                 # 构建基本消息
                 basic_message = f"标题: {post['title']}\n链接: {post['link']}\n帖子类型: 未知"
@@ -319,11 +500,15 @@ class ChiphellMonitor:
                 try:
                     # 获取帖子详情和正文内容
                     details = self._fetch_post_content(post['link'])
+                    timestamps['detail_fetched'] = self.clock.time()
+                    # 详情页的发帖时间精确到秒，优先使用
+                    if details.get('published_at') is not None:
+                        timestamps['published'] = details['published_at']
                     post_content = details.get('post_content', '-')
                     
                     # 记录主楼内容到日志
                     if post_content != '-':
-                        logger.info(f"帖子正文内容:\n{post_content}")
+                        logger.debug("帖子正文内容:\n{}", post_content)
                     
                     # 构建详细消息
                     detail_message = (
@@ -339,14 +524,16 @@ class ChiphellMonitor:
                     
                     # 使用LLM分析器提取商品信息（如果启用）
                     analysis_result = None
-                    if self.llm_analyzer and self.llm_analyzer.enabled and post_content != '-':
+                    llm_analyzer = self.llm_analyzer  # 配置热更新可能同时替换分析器
+                    if llm_analyzer and llm_analyzer.enabled and post_content != '-':
                         try:
                             logger.debug(f"开始对帖子 '{post['title']}' 进行LLM分析...")
-                            analysis_result = self.llm_analyzer.analyze_post(
+                            analysis_result = llm_analyzer.analyze_post(
                                 post['title'], 
                                 details.get('price', '-'), # 从详情获取价格字段
                                 post_content
                             )
+                            timestamps['analyzed'] = self.clock.time()
                             logger.info(f"LLM分析完成，帖子: '{post['title']}'")
                             logger.trace(f"LLM分析结果: {analysis_result}")
                         except Exception as e:
@@ -354,51 +541,242 @@ class ChiphellMonitor:
                     
                     # 将所有信息（基础、详情、LLM）传递给通知处理函数
                     self._process_notification(post, details, analysis_result)
+                    if self.archive:
+                        self.archive.submit(board.name, post_id, post, details, analysis_result)
                 except Exception as e:
                     logger.error(f"获取帖子详情或进行分析时失败: {e}")
                     # 即使获取详情失败，也发送基本信息（details 为 None）
                     self._process_notification(post, None, None)
+                    if self.archive:
+                        self.archive.submit(board.name, post_id, post)
+        
+        return new_count
+    
+    def _fetch_list_page(self, board, page):
+        """
+        获取并解析板块列表的指定页
+        
+        Args:
+            board: 板块配置
+            page: 页码
+            
+        Returns:
+            list: 帖子列表
+        """
+        url = self.fetcher.page_url(board.url, page)
+        content = self.fetcher.fetch_with_proxies(url, kind="list")
+        with metrics.PARSE_DURATION.time(kind="list"):
+            return self.fetcher.parse_forum_content(content, url)
+    
+    def _catch_up(self, board, first_page_posts):
+        """
+        翻页补抓：从第2页开始并发抓取，直到遇到数据库中已有的帖子、
+        达到页数上限或超过截止时间
+        
+        Args:
+            board: 板块配置
+            first_page_posts: 第一页解析到的帖子列表
+            
+        Returns:
+            list: 第2页及之后抓取到的帖子列表
+        """
+        def known_ids(posts):
+            post_ids = [self.fetcher.extract_post_id(post['link']) for post in posts]
+            return self.database.get_known_post_ids(board.name, [pid for pid in post_ids if pid])
+        
+        # 第一页已包含已知帖子，说明没有帖子被挤出第一页
+        if known_ids(first_page_posts):
+            return []
+        
+        config = self.catchup
+        deadline = self.clock.time() + config.deadline
+        collected = []
+        page = 2
+        stop = False
+        logger.info(f"[{board.name}] 第一页没有已知帖子，开始翻页补抓（最多 {config.max_pages} 页）")
+        
+        executor = ThreadPoolExecutor(max_workers=max(config.concurrency, 1))
+        try:
+            while page <= config.max_pages and not stop:
+                remaining = deadline - self.clock.time()
+                if remaining <= 0:
+                    logger.warning(f"[{board.name}] 翻页补抓超过截止时间，停止于第 {page} 页之前")
+                    break
+                
+                pages = range(page, min(page + config.concurrency, config.max_pages + 1))
+                futures = {p: executor.submit(self._fetch_list_page, board, p) for p in pages}
+                wait(futures.values(), timeout=remaining)
+                
+                # 按页码顺序合并结果，遇到失败或超时的页即停止，避免跳页
+                for p in pages:
+                    future = futures[p]
+                    if not future.done() or future.exception():
+                        logger.warning(f"[{board.name}] 补抓第 {p} 页失败: {future.exception() if future.done() else '超时'}")
+                        stop = True
+                        break
+                    posts = future.result()
+                    collected.extend(posts)
+                    if not posts or known_ids(posts):
+                        stop = True
+                        break
+                page += len(pages)
+        finally:
+            # 不等待超时的请求，按截止时间及时回到正常轮询
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        logger.info(f"[{board.name}] 翻页补抓完成，额外获取 {len(collected)} 个帖子")
+        return collected
+    
+    def get_board_stats(self):
+        """
+        获取各板块的监控统计
+        
+        Returns:
+            dict: 板块名称 -> 统计字典
+        """
+        return {name: stats.to_dict() for name, stats in self.board_stats.items()}
+    
+    def _wait(self, seconds):
+        """
+        等待下一次轮询，收到停止信号时提前返回
+        
+        Args:
+            seconds: 等待时间（秒）
+        """
+        if self.clock is time:
+            self.stop_event.wait(seconds)
+            return
+        # 模拟时钟无法被事件打断，分段等待
+        deadline = self.clock.time() + seconds
+        while not self.stop_event.is_set():
+            remaining = deadline - self.clock.time()
+            if remaining <= 0:
+                break
+            self.clock.sleep(min(remaining, 5))
+    
+    def stop(self, timeout=10):
+        """
+        停止监控：各板块线程在当前轮询结束后退出，消息处理线程发送完队列中剩余的消息
+        
+        Args:
+            timeout: 等待板块线程和消息处理线程退出的最长时间（秒）
+        """
+        if self.stop_event.is_set():
+            return
+        logger.info("正在停止监控...")
+        self.stop_event.set()
+        # 先等板块线程结束当前轮询，它们可能还会向队列中添加消息
+        deadline = time.monotonic() + timeout
+        for thread in self.board_threads + [self.processor_thread]:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self.processor_thread.is_alive():
+            logger.warning(f"消息处理线程未在 {timeout} 秒内退出，队列中剩余 {self.message_queue.qsize()} 条消息")
     
     def monitor(self):
-        """开始监控"""
+        """开始监控，每个板块在独立线程中并发轮询，调用stop()后返回"""
+        threads = self.board_threads = []
+        for board in self.boards:
+            thread = threading.Thread(
+                target=self._monitor_board,
+                args=(board,),
+                name=f"monitor-{board.name}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+            logger.info(f"板块 [{board.name}] 监控已启动: {board.url}")
+        
+        for thread in threads:
+            thread.join()
+    
+    def _monitor_board(self, board):
+        """
+        监控单个板块
+        
+        Args:
+            board: 板块配置
+        """
+        stats = self.board_stats[board.name]
+        scheduler = self.schedulers.get(board.name)
+        
+        # 以数据库中最近的帖子时间作为上次成功轮询的参考，用于判断停机后是否需要补抓
+        latest = self.database.get_latest_post_time(board.name)
+        last_success = latest.timestamp() if latest else None
         failed_attempts = 0
         max_failed_attempts = 5
         
-        while True:
+        while not self.stop_event.is_set():
+            # 备用实例不轮询，等待主实例租约过期后接管
+            if self.coordinator and not self.coordinator.is_leader():
+                self.coordinator.wait_for_leadership(self.coordinator.config.heartbeat_interval)
+                continue
+            
             try:
-                # 获取页面内容
-                content = self._fetch_page_content()
+                stats.polls += 1
+                poll_start = time.perf_counter()
+                stats.last_poll_time = self.clock.time()
                 
-                # 解析帖子列表
-                posts = self.fetcher.parse_forum_content(content)
-                logger.info(f"成功获取论坛内容，解析到 {len(posts)} 个帖子")
+                # 获取页面内容
+                content = self._fetch_page_content(board)
+                new_count = 0
                 
-                # 处理帖子
-                self.process_posts(posts)
+                if content is None:
+                    # 服务器返回304，页面没有变化，无需解析
+                    stats.not_modified += 1
+                    logger.info(f"[{board.name}] 页面未变化，没有新帖子")
+                else:
+                    # 解析帖子列表
+                    with metrics.PARSE_DURATION.time(kind="list"):
+                        posts = self.fetcher.parse_forum_content(content, board.url)
+                    stats.posts_seen += len(posts)
+                    logger.info(f"[{board.name}] 成功获取论坛内容，解析到 {len(posts)} 个帖子")
+                    
+                    # 距上次成功轮询间隔过长时，翻页补抓可能被挤出第一页的帖子
+                    if (self.catchup.enabled and last_success is not None
+                            and self.clock.time() - last_success > self.catchup.gap_threshold):
+                        try:
+                            older_posts = self._catch_up(board, posts)
+                            stats.catchup_posts += len(older_posts)
+                            # 先处理被挤出第一页的较早帖子
+                            posts = list(reversed(older_posts)) + posts
+                        except Exception as e:
+                            logger.error(f"[{board.name}] 翻页补抓失败: {e}")
+                    
+                    # 处理帖子
+                    new_count = self.process_posts(posts, board)
                 
                 # 重置失败计数
                 failed_attempts = 0
+                stats.last_success_time = last_success = self.clock.time()
+                metrics.POLL_DURATION.observe(time.perf_counter() - poll_start, board=board.name)
                 
                 # 等待一段时间后再进行下一次监控
-                min_wait = self.wait_time_range.min
-                max_wait = self.wait_time_range.max
-                
-                # 确保最小等待时间不少于10秒
-                min_wait = max(min_wait, 10)
-                max_wait = max(max_wait, min_wait + 5)
-                
-                wait_time = random.randint(min_wait, max_wait)
-                logger.debug(f"等待 {wait_time} 秒后继续监控")
-                time.sleep(wait_time)
+                if scheduler:
+                    wait_time = scheduler.next_interval(new_count, self.clock.time())
+                else:
+                    # 每次重新读取，配置热更新后立即生效
+                    wait_time_range = board.wait_time_range or self.wait_time_range
+                    min_wait = wait_time_range.min
+                    max_wait = wait_time_range.max
+                    
+                    # 确保最小等待时间不少于10秒
+                    min_wait = max(min_wait, 10)
+                    max_wait = max(max_wait, min_wait + 5)
+                    
+                    wait_time = random.randint(min_wait, max_wait)
+                logger.debug(f"[{board.name}] 等待 {wait_time} 秒后继续监控")
+                self._wait(wait_time)
             
             except Exception as e:
                 failed_attempts += 1
-                logger.error(f"监控过程中出错: {e}")
+                stats.failures += 1
+                stats.last_error = str(e)
+                logger.error(f"[{board.name}] 监控过程中出错: {e}")
                 
                 # 如果是代理池为空的错误，增加等待时间
                 if "代理池为空" in str(e):
                     logger.warning("代理池为空，等待3分钟后重试")
-                    time.sleep(180)
+                    self._wait(180)
                     continue
                 
                 # 如果连续失败次数过多，增加等待时间
@@ -406,12 +784,12 @@ class ChiphellMonitor:
                     wait_time = failed_attempts * 30
                     # 限制最大等待时间为10分钟
                     wait_time = min(wait_time, 600)
-                    logger.warning(f"连续失败{failed_attempts}次，等待{wait_time}秒后重试")
-                    time.sleep(wait_time)
+                    logger.warning(f"[{board.name}] 连续失败{failed_attempts}次，等待{wait_time}秒后重试")
+                    self._wait(wait_time)
                     
                     # 尝试报告错误
                     try:
-                        self.notifier.report_error("监控失败", str(e))
+                        self.notifier.report_error(f"监控失败 [{board.name}]", str(e))
                     except Exception as notify_err:
                         logger.error(f"发送错误通知失败: {notify_err}")
                     
@@ -422,5 +800,5 @@ class ChiphellMonitor:
                 else:
                     # 简单等待时间随失败次数增加
                     wait_time = 5 * (2 ** (failed_attempts - 1))
-                    logger.info(f"等待 {wait_time} 秒后重试")
-                    time.sleep(wait_time) 
\ No newline at end of file
+                    logger.info(f"[{board.name}] 等待 {wait_time} 秒后重试")
+                    self._wait(wait_time)
@@ -12,10 +12,17 @@ import json
 from datetime import datetime, timedelta
 from loguru import logger
 
+from informer import metrics
+from informer.logger import log_enabled
+from informer.subscriber_index import ActiveSubscriberIndex
+
 
 class DingTalkNotifier:
     """钉钉通知类"""
     
+    # Webhook地址前缀，回放和压测时可替换为本地替身服务
+    WEBHOOK_BASE = "https://oapi.dingtalk.com/robot/send"
+    
     def __init__(self, token, secret, name="未命名机器人"):
         """
         初始化钉钉通知器
@@ -28,7 +35,7 @@ class DingTalkNotifier:
         self.name = name
         self.token = token
         self.secret = secret
-        self.webhook_url = f"https://oapi.dingtalk.com/robot/send?access_token={token}"
+        self.webhook_url = f"{self.WEBHOOK_BASE}?access_token={token}"
         logger.debug(f"初始化钉钉机器人: [{name}] token长度: {len(token)}, secret长度: {len(secret)}")
     
     def _generate_signature(self):
@@ -46,6 +53,29 @@ class DingTalkNotifier:
         sign = urllib.parse.quote_plus(base64.b64encode(hmac_code).decode())
         return timestamp, sign
     
+    def _post_webhook(self, webhook_url, data):
+        """
+        调用钉钉Webhook，并记录耗时和返回的错误码
+        
+        Args:
+            webhook_url: 带签名的Webhook地址
+            data: 消息体
+            
+        Returns:
+            dict: 钉钉返回的JSON
+        """
+        start = time.perf_counter()
+        code = "exception"
+        try:
+            response = requests.post(webhook_url, json=data)
+            code = f"http_{response.status_code}"
+            result = response.json()
+            code = str(result.get('errcode'))
+            return result
+        finally:
+            metrics.WEBHOOK_DURATION.observe(time.perf_counter() - start, robot=self.name)
+            metrics.WEBHOOK_RESPONSES.inc(robot=self.name, code=code)
+    
     def send_text_notification(self, title, message, at_mobiles=None):
         """
         发送文本通知
@@ -64,7 +94,7 @@ class DingTalkNotifier:
                 logger.error(f"机器人 [{self.name}] 无效的token或secret")
                 return False
                 
-            logger.debug(f"机器人 [{self.name}] 正在准备发送通知, @手机号: {at_mobiles}")
+            logger.debug("机器人 [{}] 正在准备发送通知, @手机号: {}", self.name, at_mobiles)
             timestamp, sign = self._generate_signature()
             webhook_url = f"{self.webhook_url}&timestamp={timestamp}&sign={sign}"
             
@@ -84,9 +114,8 @@ class DingTalkNotifier:
                 }
             }
             
-            logger.debug(f"机器人 [{self.name}] 正在发送请求到: {self.webhook_url[:50]}...，消息长度: {len(content)}字符")
-            response = requests.post(webhook_url, json=data)
-            result = response.json()
+            logger.debug("机器人 [{}] 正在发送请求到: {}...，消息长度: {}字符", self.name, self.webhook_url[:50], len(content))
+            result = self._post_webhook(webhook_url, data)
             
             if result.get('errcode') == 0:
                 logger.info(f"钉钉通知 [{self.name}] 发送成功: {title if title else '无标题'}")
@@ -143,8 +172,7 @@ class DingTalkNotifier:
                 }
             }
             
-            response = requests.post(webhook_url, json=data)
-            result = response.json()
+            result = self._post_webhook(webhook_url, data)
             
             if result.get('errcode') == 0:
                 logger.info(f"钉钉通知 [{self.name}] 发送成功: {title if title else '无标题'}")
@@ -184,17 +212,52 @@ class DingTalkNotifier:
         return self.send_text_notification("", message, at_mobiles) 
 
 
+def robots_signature(robots_config):
+    """
+    机器人配置中影响通知的内容，用于判断两份配置是否等价
+
+    Web界面保存时由 robot_from_dict 转换，配置监视器通过 load_config 转换，
+    两者的手机号类型和旧版 user_key_words 字段可能不同，因此不直接比较配置对象
+
+    Args:
+        robots_config: 机器人配置列表
+
+    Returns:
+        tuple: 可比较的签名
+    """
+    signature = []
+    for config in robots_config:
+        users = getattr(config, "users", None) or []
+        if users:
+            subscribers = tuple(
+                (str(user.phone), tuple(user.keywords or []), bool(user.always_at),
+                 user.expire_date or "", bool(user.is_permanent))
+                for user in users
+            )
+        else:
+            subscribers = tuple(
+                (str(phone), tuple(keywords or []))
+                for phone, keywords in (getattr(config, "user_key_words", None) or {}).items()
+            )
+        signature.append((config.name, config.token, config.secret, bool(config.enabled),
+                          bool(config.receive_all), subscribers))
+    return tuple(signature)
+
+
 class MultiRobotNotifier:
     """多机器人通知管理器"""
     
-    def __init__(self, robots_config):
+    def __init__(self, robots_config, clock=None):
         
         """初始化多机器人通知管理器
         
         Args:
             robots_config: 机器人配置列表
+            clock: 提供time()的时钟，用于判断用户是否到期；为空时使用time模块，回放时可传入模拟时钟
         """
         self.robots = []
+        self.robots_signature = robots_signature(robots_config)  # 最近一次应用的配置，包括已禁用的机器人
+        self.clock = clock
         self.logger = logger.bind(name="MultiRobotNotifier")
         self.logger.debug(f"正在初始化多机器人通知管理器，配置了 {len(robots_config)} 个机器人")
         
@@ -230,13 +293,25 @@ class MultiRobotNotifier:
                 })
             except Exception as e:
                 self.logger.error(f"初始化机器人 {robot_config.name} 失败: {e}")
+        
+        self.subscribers = ActiveSubscriberIndex(
+            [r["config"] for r in self.robots], self.clock, [r["notifier"] for r in self.robots])
     
     def update_robots(self, robots_config):
         """更新机器人配置
         
         Args:
             robots_config: 新的机器人配置列表
+            
+        Returns:
+            bool: 配置是否有变化；与当前配置相同时不做任何修改
         """
+        # Web界面保存配置后会立即推送，配置监视器随后检测到同一次写入时不再重复重建
+        signature = robots_signature(robots_config)
+        if signature == self.robots_signature:
+            self.logger.debug("机器人配置未变化，跳过更新")
+            return False
+        
         self.logger.info(f"正在更新机器人配置，新配置包含 {len(robots_config)} 个机器人")
         
         # 创建新的机器人列表
@@ -288,76 +363,62 @@ class MultiRobotNotifier:
             except Exception as e:
                 self.logger.error(f"更新机器人 {robot_config.name} 失败: {e}")
         
-        # 更新机器人列表
+        # 更新机器人列表，有效用户索引随之重建，网页上修改的有效期在这里生效
+        self.subscribers = ActiveSubscriberIndex(
+            [r["config"] for r in new_robots], self.clock, [r["notifier"] for r in new_robots])
         self.robots = new_robots
+        self.robots_signature = signature
         self.logger.info(f"机器人配置更新完成，当前共有 {len(self.robots)} 个有效机器人")
+        return True
     
-    def match_keyword_to_robot(self, title):
+    def match_keyword_to_robot(self, title, index=None):
         """
-        将帖子标题匹配到对应的机器人和要@的手机号
+        将帖子标题匹配到对应的机器人和要@的手机号，只考虑未过期的用户
         
         Args:
             title: 帖子标题
+            index: 使用的有效订阅索引，为空时使用当前索引；返回的机器人索引对应其中的 configs/notifiers
             
         Returns:
             list: 元组列表 [(机器人索引, [匹配到的关键词手机号列表], [总是@的手机号列表]), ...]
         """
         matches = []
-        logger.debug(f"正在匹配标题: '{title}' 到 {len(self.robots)} 个机器人")
+        # 配置和有效用户取自同一个索引，匹配过程中更新配置也不会错位
+        index = index or self.subscribers
+        active_users = index.current()
+        lower_title = title.lower()
+        # 循环内的调试日志只在需要输出时才构造，日志开销不随关键词数量增长
+        debug = log_enabled("DEBUG", __name__)
+        if debug:
+            logger.debug("正在匹配标题: '{}' 到 {} 个机器人", title, len(index.configs))
         
-        for robot_idx, robot_info in enumerate(self.robots):
-            robot = robot_info["notifier"]
-            config = robot_info["config"]
-            
+        for robot_idx, config in enumerate(index.configs):
             # 收集两类需要@的手机号
             matched_phones = []  # 关键词匹配到的手机号
             always_at_phones = []  # 配置了always_at=True的手机号
             
-            logger.debug(f"检查机器人 [{config.name}] 的关键词匹配")
-            
-            # 优先使用新的用户配置
-            if hasattr(config, 'users') and config.users:
-                logger.debug(f"机器人 [{config.name}] 使用新版用户配置，有 {len(config.users)} 个用户")
-                for user in config.users:
-                    # 检查是否需要总是@
-                    if user.always_at:
-                        always_at_phones.append(user.phone)
-                        logger.debug(f"机器人 [{config.name}] 用户 {user.phone} 配置了总是@")
-                        continue  # 如果总是@，不需要再检查关键词匹配
-                    
-                    # 检查关键词匹配
-                    if user.keywords:  # 如果用户有关键词配置
-                        logger.debug(f"机器人 [{config.name}] 用户 {user.phone} 配置了 {len(user.keywords)} 个关键词")
-                        for keyword in user.keywords:
-                            lower_keyword = keyword.lower()
-                            lower_title = title.lower()
-                            if lower_keyword in lower_title:
-                                matched_phones.append(user.phone)
-                                logger.debug(f"机器人 [{config.name}] 标题 '{title}' 匹配到关键词 '{keyword}'，将@手机号 {user.phone}")
-                                break  # 找到一个匹配即可
-            
-            # 兼容旧版配置（如果没有使用新版user配置）
-            elif hasattr(config, 'user_key_words') and config.user_key_words:
-                logger.debug(f"机器人 [{config.name}] 使用旧版关键词配置，有 {len(config.user_key_words)} 个用户")
-                # 遍历机器人配置的用户关键词
-                for phone, keywords in config.user_key_words.items():
-                    logger.debug(f"机器人 [{config.name}] 用户 {phone} 配置了 {len(keywords)} 个关键词")
-                    for keyword in keywords:
-                        lower_keyword = keyword.lower()
-                        lower_title = title.lower()
-                        if lower_keyword in lower_title:
-                            # 该手机号的关键词匹配到了标题
-                            matched_phones.append(phone)
-                            logger.debug(f"机器人 [{config.name}] 标题 '{title}' 匹配到关键词 '{keyword}'，将@手机号 {phone}")
-                            break  # 找到一个匹配关键词即可，不需要继续检查该手机号的其他关键词
+            for user in active_users[robot_idx]:
+                # 总是@的用户不需要再检查关键词匹配
+                if user.always_at:
+                    always_at_phones.append(user.phone)
+                    continue
+                
+                for keyword, lower_keyword in zip(user.keywords, user.lower_keywords):
+                    if lower_keyword in lower_title:
+                        matched_phones.append(user.phone)
+                        if debug:
+                            logger.debug("机器人 [{}] 标题 '{}' 匹配到关键词 '{}'，将@手机号 {}", config.name, title, keyword, user.phone)
+                        break  # 找到一个匹配即可
             
             # 如果该机器人有需要@的手机号，添加到结果中
             if matched_phones or always_at_phones:
                 matches.append((robot_idx, matched_phones, always_at_phones))
-                logger.debug(f"机器人 [{config.name}] 匹配到 {len(matched_phones)} 个关键词匹配手机号, {len(always_at_phones)} 个总是@的手机号")
+                if debug:
+                    logger.debug("机器人 [{}] 匹配到 {} 个关键词匹配手机号, {} 个总是@的手机号", config.name, len(matched_phones), len(always_at_phones))
             # 如果没有任何匹配，但机器人配置了receive_all=True，也将其添加到结果中（只@总是@的用户）
             elif config.receive_all:
-                logger.debug(f"机器人 [{config.name}] 没有匹配关键词，但配置了receive_all=True，将添加到结果中")
+                if debug:
+                    logger.debug("机器人 [{}] 没有匹配关键词，但配置了receive_all=True，将添加到结果中", config.name)
                 matches.append((robot_idx, [], always_at_phones))
         
         return matches
@@ -374,15 +435,17 @@ class MultiRobotNotifier:
         Returns:
             bool: 是否至少有一个机器人成功发送
         """
-        if not self.robots:
+        # 匹配和发送使用同一个索引快照，期间更新机器人配置不会发错机器人
+        index = self.subscribers
+        if not index.configs:
             logger.warning("没有可用的钉钉机器人，跳过通知发送")
             return False
         
-        logger.debug(f"开始为标题 '{post_title}' 匹配机器人，当前有 {len(self.robots)} 个机器人可用")
+        logger.debug("开始为标题 '{}' 匹配机器人，当前有 {} 个机器人可用", post_title, len(index.configs))
         
         # 匹配标题与机器人关键词，获取匹配的机器人和需要@的手机号
         # 现在match_keyword_to_robot会返回所有匹配关键词的机器人，以及配置了receive_all=True的机器人
-        robot_matches = self.match_keyword_to_robot(post_title)
+        robot_matches = self.match_keyword_to_robot(post_title, index)
         logger.info(f"标题 '{post_title}' 匹配到 {len(robot_matches)} 个机器人")
         
         # 如果没有任何匹配，直接返回
@@ -396,10 +459,9 @@ class MultiRobotNotifier:
             # 合并两种需要@的手机号（去重）
             at_phones = list(set(matched_phones + always_at_phones))
             
-            robot_info = self.robots[robot_idx]
-            robot = robot_info["notifier"]
-            config = robot_info["config"]
-            logger.debug(f"正在通过机器人 [{config.name}] 发送通知, @手机号: {at_phones}")
+            robot = index.notifiers[robot_idx]
+            config = index.configs[robot_idx]
+            logger.debug("正在通过机器人 [{}] 发送通知, @手机号: {}", config.name, at_phones)
             if robot.send_text_notification(title, message, at_phones):
                 success_count += 1
                 logger.info(f"机器人 [{config.name}] 成功发送通知")
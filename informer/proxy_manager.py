@@ -5,9 +5,26 @@
 import random
 import time
 import threading
+from collections import deque
 import requests
 from loguru import logger
 
+from informer import metrics
+
+
+class ProxyCircuit:
+    """单个代理的熔断器状态"""
+    
+    CLOSED = "closed"  # 正常可用
+    OPEN = "open"  # 熔断隔离中
+    HALF_OPEN = "half_open"  # 隔离期结束，等待探测
+    
+    def __init__(self):
+        self.state = self.CLOSED
+        self.failures = 0  # 当前连续失败次数
+        self.trips = 0  # 累计熔断次数
+        self.open_until = 0  # 隔离结束时间戳
+
 
 class ProxyManager:
     """代理池管理器"""
@@ -29,11 +46,37 @@ class ProxyManager:
         self.lock = threading.RLock()
         self.logger = logger.bind(name="ProxyManager")
         
+        # 请求结果统计，用于自适应调整检测频率
+        self.target_preferred = 10  # 期望的优选代理数量
+        self.failure_trigger = 3  # 连续失败多少次立即触发检测
+        self.recent_results = deque(maxlen=50)  # 最近的请求结果
+        self.consecutive_failures = 0
+        self.check_event = threading.Event()  # 用于立即唤醒检测线程
+        
+        # 代理熔断配置
+        self.circuits = {}  # 代理 -> ProxyCircuit
+        self.banned_proxies = {}  # 熔断次数过多被永久禁用的代理 -> 禁用时间，按禁用先后排列
+        self.max_banned = 10000  # 最多记录的禁用代理数，超出时遗忘最早禁用的
+        self.failure_threshold = 2  # 连续失败多少次触发熔断
+        self.base_quarantine = 60  # 首次熔断隔离时间（秒），之后每次翻倍
+        self.max_quarantine = 1800  # 最长隔离时间（秒）
+        self.max_trips = 5  # 熔断多少次后永久禁用
+        self.probe_interval = 15  # 半开探测间隔（秒）
+        
+        # 导出代理池大小指标
+        metrics.PROXY_POOL_SIZE.set_function(self._pool_size_metric)
+        
         # 初始化时更新一次代理池
         self.update_proxy_pool()
         
         # 启动定时更新任务
         self._start_pool_updater()
+        
+        # 启动自适应代理检测器
+        self.start_proxy_checker()
+        
+        # 启动熔断代理的半开探测
+        self._start_circuit_prober()
     
     def _start_pool_updater(self, interval=180):
         """
@@ -104,7 +147,9 @@ class ProxyManager:
                     cleaned_proxies.append(proxy)
             
             with self.lock:
-                self.proxies = cleaned_proxies
+                # 被永久禁用的代理即使API再次返回也不再使用
+                self.proxies = [p for p in cleaned_proxies if p not in self.banned_proxies]
+                self._prune_proxy_state(set(cleaned_proxies))
                 logger.info(f"代理池更新完成，当前代理数量: {len(self.proxies)}")
             
             return True
@@ -153,78 +198,306 @@ class ProxyManager:
             logger.debug(f"代理 {proxy} 检查失败: {e}")
             return False, 0
     
-    def start_proxy_checker(self, interval=120, max_check=20):
+    def report_fetch_result(self, success, proxy=None):
         """
-        启动代理检查器
+        记录一次请求结果，由Fetcher在每次使用代理请求后调用
         
         Args:
-            interval: 检查间隔（秒）
-            max_check: 每次最多检查的代理数量
+            success: 请求是否成功
+            proxy: 本次使用的代理，用于更新其熔断状态
         """
+        if proxy:
+            if success:
+                self._record_proxy_success(proxy)
+            else:
+                self._record_proxy_failure(proxy)
+        
+        with self.lock:
+            self.recent_results.append(bool(success))
+            if success:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            trigger = self.consecutive_failures == self.failure_trigger
+        
+        if trigger:
+            logger.warning(f"代理请求连续失败 {self.consecutive_failures} 次，立即触发代理检测")
+            self.check_event.set()
+    
+    def get_success_rate(self):
+        """
+        获取最近请求的成功率
+        
+        Returns:
+            float: 成功率，没有记录时返回1.0
+        """
+        with self.lock:
+            if not self.recent_results:
+                return 1.0
+            return sum(self.recent_results) / len(self.recent_results)
+    
+    def _next_check_interval(self, interval, min_interval, max_interval):
+        """
+        根据代理池健康状况计算下一次检测间隔
+        
+        Args:
+            interval: 当前检测间隔（秒）
+            min_interval: 最小检测间隔（秒）
+            max_interval: 最大检测间隔（秒）
+            
+        Returns:
+            tuple: (下一次检测间隔, 代理池是否健康)
+        """
+        with self.lock:
+            preferred_count = len(self.preferred_proxies)
+            consecutive_failures = self.consecutive_failures
+        success_rate = self.get_success_rate()
+        
+        if (preferred_count < self.target_preferred // 2 or success_rate < 0.5
+                or consecutive_failures >= self.failure_trigger):
+            # 代理池不健康，加快检测
+            return max(min_interval, interval / 2), False
+        if preferred_count >= self.target_preferred and success_rate >= 0.9:
+            # 代理池健康，逐步退避
+            return min(max_interval, interval * 2), True
+        return interval, False
+    
+    def start_proxy_checker(self, min_interval=30, max_interval=600, max_check=20):
+        """
+        启动自适应代理检查器
+        
+        检测间隔会根据优选代理数量和最近请求成功率在 [min_interval, max_interval]
+        之间自动调整；Fetcher连续失败时通过 report_fetch_result 立即唤醒检测。
+        
+        Args:
+            min_interval: 最小检测间隔（秒）
+            max_interval: 最大检测间隔（秒）
+            max_check: 每次最多添加的优选代理数量
+        """
+        with self.lock:
+            if self.checker_running:
+                logger.debug("代理检查器已在运行，跳过启动")
+                return
+            self.checker_running = True
+        
         def checker():
+            interval = min_interval
+            triggered = False
             while True:
                 try:
-                    with self.lock:
-                        preferred_count = len(self.preferred_proxies)
+                    interval, healthy = self._next_check_interval(interval, min_interval, max_interval)
                     
-                    if preferred_count > 10:
-                        logger.info(f"当前优选代理数量充足: {preferred_count}，跳过检测")
+                    if healthy and not triggered:
+                        logger.info(f"代理池状态良好，跳过检测，下次检测间隔: {interval:.0f}秒")
                     else:
-                        logger.info("开始检测代理池中的IP")
-                        
-                        with self.lock:
-                            # 随机选择一些代理进行检测，而不是按顺序检测
-                            proxies_to_check = self.proxies.copy()
-                            if len(proxies_to_check) > max_check * 2:
-                                proxies_to_check = random.sample(proxies_to_check, max_check * 2)
-                        
-                        checked_count = 0
-                        for proxy in proxies_to_check:
-                            valid, response_time = self.check_proxy(proxy)
-                            if valid:
-                                with self.lock:
-                                    self.preferred_proxies[proxy] = response_time
-                                logger.debug(f"添加新的优选代理: {proxy}, 响应时间: {response_time:.2f}ms")
-                                checked_count += 1
-                            
-                            if checked_count >= max_check:
-                                logger.info("已找到足够的优选代理，停止检测")
-                                break
-                            
-                            # 避免检测过快
-                            time.sleep(0.5)
-                        
-                        with self.lock:
-                            logger.info(f"IP检测完成，当前优选代理数量: {len(self.preferred_proxies)}")
+                        self._check_proxies(max_check)
+                        logger.info(f"下次代理检测间隔: {interval:.0f}秒，最近请求成功率: {self.get_success_rate():.0%}")
                 
                 except Exception as e:
                     logger.error(f"代理检测过程中出错: {e}")
                 
-                # 休眠指定间隔
-                time.sleep(interval)
+                if triggered:
+                    # 已针对连续失败做过一次检测，重新开始计数
+                    with self.lock:
+                        self.consecutive_failures = 0
+                
+                # 休眠到下一次检测，或被连续失败提前唤醒
+                triggered = self.check_event.wait(interval)
+                self.check_event.clear()
         
         # 启动检查线程
         thread = threading.Thread(target=checker, daemon=True)
         thread.start()
-        logger.info("代理检查器已启动")
+        logger.info(f"代理检查器已启动，检测间隔范围: {min_interval}-{max_interval}秒")
+    
+    def _check_proxies(self, max_check):
+        """
+        从普通代理池中随机检测代理，并将可用代理加入优选代理池
+        
+        Args:
+            max_check: 最多添加的优选代理数量
+        """
+        logger.info("开始检测代理池中的IP")
+        
+        with self.lock:
+            # 随机选择一些代理进行检测，而不是按顺序检测
+            proxies_to_check = [
+                p for p in self.proxies
+                if p not in self.preferred_proxies and self._is_available(p)
+            ]
+            if len(proxies_to_check) > max_check * 2:
+                proxies_to_check = random.sample(proxies_to_check, max_check * 2)
+        
+        checked_count = 0
+        for proxy in proxies_to_check:
+            valid, response_time = self.check_proxy(proxy)
+            if valid:
+                with self.lock:
+                    self.preferred_proxies[proxy] = response_time
+                logger.debug(f"添加新的优选代理: {proxy}, 响应时间: {response_time:.2f}ms")
+                checked_count += 1
+            
+            if checked_count >= max_check:
+                logger.info("已找到足够的优选代理，停止检测")
+                break
+            
+            # 避免检测过快
+            time.sleep(0.5)
+        
+        with self.lock:
+            logger.info(f"IP检测完成，当前优选代理数量: {len(self.preferred_proxies)}")
     
-    def get_proxy(self):
+    def _prune_proxy_state(self, returned):
         """
-        获取一个代理
+        丢弃已不在代理池中的代理的熔断记录，轮换的代理不会使这些记录无限增长（调用方需持有锁）
+        
+        永久禁用的记录不随代理池变化丢弃，时有时无的代理再次出现时仍被禁用；禁用记录的数量由 max_banned 限制
+        
+        Args:
+            returned: 本次API返回的全部代理
+        """
+        active = returned | set(self.preferred_proxies)
+        stale = [proxy for proxy in self.circuits if proxy not in active]
+        for proxy in stale:
+            del self.circuits[proxy]
+        if stale:
+            logger.debug(f"清理了 {len(stale)} 个已离开代理池的代理的熔断记录")
+    
+    def _is_available(self, proxy):
+        """
+        检查代理的熔断器是否允许使用（调用方需持有锁）
+        
+        Args:
+            proxy: 代理地址
+            
+        Returns:
+            bool: 熔断器处于关闭状态时返回True
+        """
+        if proxy in self.banned_proxies:
+            return False
+        circuit = self.circuits.get(proxy)
+        return circuit is None or circuit.state == ProxyCircuit.CLOSED
+    
+    def _record_proxy_success(self, proxy):
+        """
+        记录代理请求成功，关闭其熔断器
+        
+        Args:
+            proxy: 代理地址
+        """
+        with self.lock:
+            circuit = self.circuits.get(proxy)
+            if circuit is None:
+                return
+            if circuit.state != ProxyCircuit.CLOSED:
+                logger.info(f"代理 {proxy} 探测成功，恢复使用")
+            circuit.state = ProxyCircuit.CLOSED
+            circuit.failures = 0
+    
+    def _record_proxy_failure(self, proxy):
+        """
+        记录代理请求失败，连续失败达到阈值或半开探测失败时触发熔断
+        
+        Args:
+            proxy: 代理地址
+        """
+        with self.lock:
+            if proxy in self.banned_proxies:
+                return
+            circuit = self.circuits.setdefault(proxy, ProxyCircuit())
+            if circuit.state == ProxyCircuit.OPEN:
+                # 隔离中的代理可能仍有进行中的请求，其失败不重复计入
+                return
+            circuit.failures += 1
+            if circuit.state == ProxyCircuit.HALF_OPEN or circuit.failures >= self.failure_threshold:
+                self._trip(proxy, circuit)
+    
+    def _trip(self, proxy, circuit):
+        """
+        熔断代理：按熔断次数指数延长隔离时间，超过上限则永久禁用（调用方需持有锁）
+        
+        Args:
+            proxy: 代理地址
+            circuit: 代理的熔断器
+        """
+        circuit.trips += 1
+        circuit.failures = 0
+        self.preferred_proxies.pop(proxy, None)
+        
+        if circuit.trips >= self.max_trips:
+            self.banned_proxies[proxy] = time.time()
+            while len(self.banned_proxies) > self.max_banned:
+                del self.banned_proxies[next(iter(self.banned_proxies))]
+            self.circuits.pop(proxy, None)
+            if proxy in self.proxies:
+                self.proxies.remove(proxy)
+            logger.warning(f"代理 {proxy} 已熔断 {circuit.trips} 次，永久禁用")
+            return
+        
+        quarantine = min(self.base_quarantine * (2 ** (circuit.trips - 1)), self.max_quarantine)
+        circuit.state = ProxyCircuit.OPEN
+        circuit.open_until = time.time() + quarantine
+        logger.debug(f"代理 {proxy} 熔断（第{circuit.trips}次），隔离 {quarantine} 秒")
+    
+    def _start_circuit_prober(self):
+        """启动半开探测线程，隔离期结束的代理先通过轻量探测再重新启用"""
+        def prober():
+            while True:
+                time.sleep(self.probe_interval)
+                try:
+                    now = time.time()
+                    with self.lock:
+                        # 已离开代理池的代理不再探测，熔断记录直接丢弃
+                        active = set(self.proxies) | set(self.preferred_proxies)
+                        due = []
+                        for proxy, circuit in list(self.circuits.items()):
+                            if circuit.state != ProxyCircuit.OPEN or circuit.open_until > now:
+                                continue
+                            if proxy not in active:
+                                del self.circuits[proxy]
+                                continue
+                            circuit.state = ProxyCircuit.HALF_OPEN
+                            due.append(proxy)
+                    
+                    for proxy in due:
+                        valid, _ = self.check_proxy(proxy, timeout=3)
+                        if valid:
+                            self._record_proxy_success(proxy)
+                        else:
+                            self._record_proxy_failure(proxy)
+                except Exception as e:
+                    logger.error(f"熔断代理探测过程中出错: {e}")
+        
+        thread = threading.Thread(target=prober, daemon=True)
+        thread.start()
+        logger.info(f"代理熔断探测器已启动，探测间隔: {self.probe_interval}秒")
+    
+    def get_proxy(self, exclude=None):
+        """
+        获取一个代理，熔断中的代理不会被选中
+        
+        Args:
+            exclude: 需要排除的代理集合（如本次请求已失败过的代理）
         
         Returns:
             str: 代理地址，如果没有可用代理则返回None
         """
+        exclude = exclude or ()
         with self.lock:
             # 首先尝试从优选代理池中获取
-            if self.preferred_proxies:
+            candidates = [
+                item for item in self.preferred_proxies.items()
+                if item[0] not in exclude and self._is_available(item[0])
+            ]
+            if candidates:
                 # 选择响应时间最短的代理
-                best_proxy = min(self.preferred_proxies.items(), key=lambda x: x[1])[0]
+                best_proxy = min(candidates, key=lambda x: x[1])[0]
                 return best_proxy
             
             # 如果没有优选代理，从普通代理池中随机获取一个
-            if self.proxies:
-                return random.choice(self.proxies)
+            candidates = [p for p in self.proxies if p not in exclude and self._is_available(p)]
+            if candidates:
+                return random.choice(candidates)
         
         return None
     
@@ -244,15 +517,34 @@ class ProxyManager:
                 self.proxies.remove(proxy)
                 logger.debug(f"从普通代理池中移除: {proxy}")
     
+    def proxy_class(self, proxy):
+        """
+        获取代理所属的池，用于指标统计
+        
+        Args:
+            proxy: 代理地址
+            
+        Returns:
+            str: preferred 或 normal
+        """
+        with self.lock:
+            return "preferred" if proxy in self.preferred_proxies else "normal"
+    
+    def _pool_size_metric(self):
+        """导出代理池大小指标"""
+        normal_count, preferred_count = self.get_proxy_count()
+        return {("normal",): normal_count, ("preferred",): preferred_count}
+    
     def get_proxy_count(self):
         """
         获取代理池中的代理数量
         
         Returns:
-            tuple: (普通代理数量, 优选代理数量)
+            tuple: (普通代理数量, 优选代理数量)，不包括熔断中的代理
         """
         with self.lock:
-            return len(self.proxies), len(self.preferred_proxies)
+            normal_count = sum(1 for p in self.proxies if self._is_available(p))
+            return normal_count, len(self.preferred_proxies)
     
     def update_api_url(self, new_api_url):
         """更新代理API URL
@@ -270,5 +562,7 @@ class ProxyManager:
             # 清空现有代理池
             self.proxies = []
             self.preferred_proxies = {}
+            self.circuits = {}
+            self.banned_proxies = {}
             # 重新获取代理
             self.update_proxy_pool() 
\ No newline at end of file
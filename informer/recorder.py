@@ -0,0 +1,91 @@
+"""
+录制模块 - 将抓取到的页面保存为压缩归档，用于离线回放
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+from loguru import logger
+
+
+class PageRecorder:
+    """页面录制器，每个页面写为gzip压缩的JSON Lines中的一行"""
+
+    def __init__(self, path):
+        """
+        初始化录制器
+
+        Args:
+            path: 归档文件路径（.jsonl.gz），已存在时追加
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.count = 0  # 本次录制的页面数
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        logger.info(f"已开启页面录制，归档文件: {path}")
+
+    def record(self, url, body, kind="page", timestamp=None):
+        """
+        记录一个页面
+
+        Args:
+            url: 页面URL
+            body: 页面内容
+            kind: 页面类型（list/detail）
+            timestamp: 抓取时间戳，为空时使用当前时间
+        """
+        line = json.dumps({
+            "url": url,
+            "time": timestamp if timestamp is not None else time.time(),
+            "kind": kind,
+            "body": body,
+        }, ensure_ascii=False)
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line + "\n")
+            # 每个页面都刷新，进程被强制结束时归档依然可读
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        """关闭归档文件"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                logger.info(f"页面录制结束，共录制 {self.count} 个页面")
+
+
+def load_recording(path):
+    """
+    读取录制的归档
+
+    Args:
+        path: 归档文件路径
+
+    Returns:
+        list: 按抓取时间排序的页面记录字典列表
+    """
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # 录制进程被中断时最后一行可能不完整
+                    logger.warning(f"跳过无法解析的录制记录: {line[:80]}")
+        except EOFError:
+            logger.warning(f"录制归档 {path} 未正常关闭，已读取 {len(records)} 条完整记录")
+    records.sort(key=lambda record: record["time"])
+    return records
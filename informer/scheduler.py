@@ -0,0 +1,131 @@
+"""
+调度模块 - 根据历史发帖速率自适应调整轮询间隔
+"""
+
+import datetime
+import random
+import time
+from collections import deque
+from loguru import logger
+
+
+class AdaptivePollScheduler:
+    """自适应轮询调度器"""
+    
+    def __init__(self, database, forum, config, refresh_interval=3600):
+        """
+        初始化自适应轮询调度器
+        
+        Args:
+            database: 数据库实例，用于读取历史帖子时间
+            forum: 论坛名称（posts表中的forum键）
+            config: 自适应轮询配置 (AdaptivePollingConfig)
+            refresh_interval: 重新学习发帖速率的间隔（秒）
+        """
+        self.database = database
+        self.forum = forum
+        self.config = config
+        self.refresh_interval = refresh_interval
+        
+        # 每小时请求预算换算出的最短间隔
+        budget_floor = 3600 / max(config.max_requests_per_hour, 1)
+        self.floor = max(config.floor, budget_floor)
+        self.ceiling = max(config.ceiling, self.floor)
+        
+        self.rates = {}  # (是否周末, 小时) -> 每秒新帖数
+        self.last_refresh = 0
+        self.factor = 1.0  # 根据最近轮询结果对基础间隔的修正系数
+        self.request_times = deque()  # 最近一小时内的轮询时间
+    
+    def _refresh_rates(self, now):
+        """
+        从数据库历史中重新学习各时段的发帖速率
+        
+        Args:
+            now: 当前时间戳
+        """
+        days = self.config.history_days
+        try:
+            counts = self.database.get_hourly_post_counts(self.forum, days)
+        except Exception as e:
+            logger.warning(f"[{self.forum}] 读取发帖历史失败，沿用现有速率: {e}")
+            self.last_refresh = now
+            return
+        
+        # 统计窗口内工作日和周末各有多少天
+        today = datetime.date.fromtimestamp(now)
+        weekend_days = sum(1 for i in range(days) if (today - datetime.timedelta(days=i)).weekday() >= 5)
+        day_counts = {True: max(weekend_days, 1), False: max(days - weekend_days, 1)}
+        
+        self.rates = {
+            key: count / day_counts[key[0]] / 3600
+            for key, count in counts.items()
+        }
+        self.last_refresh = now
+        logger.debug(f"[{self.forum}] 已更新发帖速率，共 {sum(counts.values())} 条历史记录")
+    
+    def expected_rate(self, now=None):
+        """
+        获取当前时段的预期发帖速率
+        
+        Args:
+            now: 当前时间戳
+            
+        Returns:
+            float: 每秒新帖数，没有历史时返回0
+        """
+        now = now or time.time()
+        if now - self.last_refresh >= self.refresh_interval:
+            self._refresh_rates(now)
+        moment = datetime.datetime.fromtimestamp(now)
+        return self.rates.get((moment.weekday() >= 5, moment.hour), 0.0)
+    
+    def _base_interval(self, now):
+        """
+        由当前时段的发帖速率推算基础间隔：使每次轮询预期发现 target_posts_per_poll 个新帖
+        
+        Args:
+            now: 当前时间戳
+            
+        Returns:
+            float: 基础间隔（秒）
+        """
+        rate = self.expected_rate(now)
+        if rate <= 0:
+            return self.ceiling
+        return self.config.target_posts_per_poll / rate
+    
+    def next_interval(self, new_posts, now=None):
+        """
+        计算下一次轮询前的等待时间
+        
+        Args:
+            new_posts: 本次轮询发现的新帖数量
+            now: 当前时间戳
+            
+        Returns:
+            int: 等待时间（秒）
+        """
+        now = now or time.time()
+        self.request_times.append(now)
+        while self.request_times and self.request_times[0] <= now - 3600:
+            self.request_times.popleft()
+        
+        # 发现新帖说明板块正活跃，缩短间隔；空轮询则逐步放宽
+        if new_posts > 0:
+            self.factor = max(self.factor * 0.5, 0.25)
+        else:
+            self.factor = min(self.factor * 1.25, 4.0)
+        
+        base = min(max(self._base_interval(now), self.floor), self.ceiling)
+        interval = base * self.factor
+        # 加入少量随机抖动，避免请求过于规律
+        interval *= random.uniform(0.85, 1.15)
+        interval = min(max(interval, self.floor), self.ceiling)
+        
+        # 最近一小时请求数已达预算时，等到最早的请求移出窗口
+        if len(self.request_times) >= self.config.max_requests_per_hour:
+            interval = max(interval, self.request_times[0] + 3600 - now)
+        
+        logger.debug(f"[{self.forum}] 本次新帖 {new_posts} 个，预期速率 {self.expected_rate(now) * 3600:.2f} 帖/小时，下次轮询间隔 {interval:.0f} 秒")
+        return int(round(interval))
@@ -0,0 +1,168 @@
+"""
+全文搜索模块 - 为帖子归档建立 SQLite FTS5 索引所需的分词和查询构造
+
+FTS5 的 unicode61 分词器把连续的汉字当作一个词，trigram 分词器又无法匹配两个字的查询（如“显卡”），
+因此写入索引和查询前先把连续的汉字切成重叠的二元组（另附单字，供单字查询），字母和数字按边界分开，
+再交给 unicode61 分词。
+
+用法:
+    python -m informer.search "4090 FE" --days 30     # 在命令行中搜索归档
+    python -m informer.search --rebuild               # 根据 post_archive 重建索引
+"""
+
+import argparse
+import re
+
+# 中日韩文字（假名、汉字、韩文），按二元组切分
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_WORD = re.compile(r"\w+")
+_RUN = re.compile(f"[{_CJK}]+|[^{_CJK}]+")
+_CJK_RUN = re.compile(f"[{_CJK}]+")
+# 字母和数字分开，型号 "RTX4090D" 切为 rtx 4090 d，查询 "4090" 或 "RTX4090" 都能命中
+_ALNUM = re.compile(r"[^\W\d_]+|\d+")
+
+MAX_QUERY_TERMS = 16
+# 分词规则的版本，修改 _tokens/segment 后加一，已有的索引会在启动时重建
+SEGMENT_VERSION = 2
+
+
+def _tokens(text, unigrams=None):
+    """
+    把文本切分为索引用的词：连续汉字切为重叠的二元组，字母和数字按边界分开
+
+    Args:
+        text: 原始文本
+        unigrams: 不为空时，把多字汉字串中的单字追加到该列表
+    """
+    for word in _WORD.findall(text or ""):
+        for run in _RUN.findall(word):
+            if _CJK_RUN.fullmatch(run):
+                if len(run) == 1:
+                    yield run
+                else:
+                    for i in range(len(run) - 1):
+                        yield run[i:i + 2]
+                    if unigrams is not None:
+                        unigrams.extend(run)
+            else:
+                for token in _ALNUM.findall(run):
+                    yield token.lower()
+
+
+def segment(text):
+    """
+    把文本转换为写入FTS5索引的形式
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 空格分隔的词
+    """
+    # 单字放在末尾，供单字查询匹配，不打断二元组之间的相邻关系
+    unigrams = []
+    tokens = list(_tokens(text, unigrams))
+    return " ".join(tokens + unigrams)
+
+
+def item_names(analysis_result):
+    """
+    提取LLM分析结果中的商品名称
+
+    Args:
+        analysis_result: LLM分析结果字典
+
+    Returns:
+        str: 空格分隔的商品名称
+    """
+    items = (analysis_result or {}).get("items") or []
+    return " ".join(str(item.get("item_name", "")) for item in items if isinstance(item, dict))
+
+
+def _phrase(term):
+    """把一个查询词转换为FTS5短语，无法产生任何词时返回None"""
+    tokens = list(_tokens(term))
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '"'
+
+
+def build_match_query(query):
+    """
+    把用户输入的查询转换为FTS5 MATCH表达式：空格分隔的词都需要出现，以 - 开头的词排除
+
+    Args:
+        query: 用户输入，如 "4090 FE -求购"
+
+    Returns:
+        str: MATCH表达式，没有可搜索的词时返回None
+    """
+    include, exclude = [], []
+    for term in query.split()[:MAX_QUERY_TERMS]:
+        target = exclude if term.startswith("-") and len(term) > 1 else include
+        phrase = _phrase(term[1:] if target is exclude else term)
+        if phrase:
+            target.append(phrase)
+    if not include:
+        return None
+    expression = " AND ".join(include)
+    if exclude:
+        expression = f"({expression}) NOT ({' OR '.join(exclude)})"
+    return expression
+
+
+def make_snippet(text, query, width=60):
+    """
+    截取正文中第一个查询词附近的片段
+
+    Args:
+        text: 正文
+        query: 用户输入
+        width: 片段长度（字符）
+
+    Returns:
+        str: 片段，正文为空时返回空字符串
+    """
+    if not text:
+        return ""
+    flat = " ".join(text.split())
+    lower = flat.lower()
+    position = -1
+    for term in query.split():
+        if term.startswith("-"):
+            continue
+        position = lower.find(term.lower())
+        if position >= 0:
+            break
+    start = max(0, position - width // 3) if position >= 0 else 0
+    snippet = flat[start:start + width]
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(flat) else "")
+
+
+def main():
+    from informer.database import Database
+
+    parser = argparse.ArgumentParser(description="搜索帖子归档")
+    parser.add_argument("query", nargs="?", help="查询词，空格分隔的词都需要出现，以 - 开头的词排除")
+    parser.add_argument("--days", type=int, help="只搜索最近若干天归档的帖子")
+    parser.add_argument("--forum", help="只搜索指定板块")
+    parser.add_argument("--limit", type=int, default=20, help="显示的结果数，默认20")
+    parser.add_argument("--db", default="data/posts.db", help="数据库路径，默认data/posts.db")
+    parser.add_argument("--rebuild", action="store_true", help="根据 post_archive 重建全文索引")
+    args = parser.parse_args()
+
+    database = Database(args.db)
+    try:
+        if args.rebuild:
+            print(f"已重建全文索引，共 {database.rebuild_search_index()} 个帖子")
+        if args.query:
+            result = database.search_posts(args.query, forum=args.forum, days=args.days, per_page=args.limit)
+            print(f"共 {result['total']} 个结果，耗时 {result['took_ms']:.1f} ms")
+            for post in result["posts"]:
+                print(f"[{post['forum']}] {post['archived_at']} {post['title']}\n    {post['url']}\n    {post['snippet']}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+启动耗时模块 - 记录启动各阶段的时间点，并以 python -X importtime 的方式统计模块导入耗时
+
+用法:
+    python -m informer.startup                       # 统计 import informer.main 的导入耗时
+    python -m informer.startup --module informer.monitor --top 30
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+import informer
+
+# -X importtime 的输出格式: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+_phases = []  # (阶段名称, 距导入informer包的秒数)
+
+
+def mark(name):
+    """
+    记录一个启动阶段完成的时间点
+
+    Args:
+        name: 阶段名称
+    """
+    _phases.append((name, time.perf_counter() - informer.IMPORTED_AT))
+
+
+def log_phases():
+    """输出已记录的启动阶段耗时"""
+    if _phases:
+        logger.info("启动耗时: " + "，".join(f"{name} {seconds:.2f}s" for name, seconds in _phases))
+
+
+def parse_importtime(text):
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        text: 标准错误输出
+
+    Returns:
+        list: (模块名, 自身耗时秒数, 累计耗时秒数, 嵌套深度) 列表，按导入完成顺序排列
+    """
+    entries = []
+    for line in text.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us) / 1e6, int(cumulative_us) / 1e6, len(indent) // 2))
+    return entries
+
+
+def measure_imports(module="informer.main", python=None):
+    """
+    在新的解释器中导入模块并统计耗时
+
+    Args:
+        module: 要导入的模块
+        python: 解释器路径，默认为当前解释器
+
+    Returns:
+        tuple: (包括解释器启动在内的总耗时秒数, parse_importtime 的结果)
+
+    Raises:
+        RuntimeError: 导入失败
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr)
+
+
+def format_report(module, wall, entries, top=20):
+    """
+    生成导入耗时报告
+
+    Args:
+        module: 导入的模块
+        wall: 总耗时秒数
+        entries: parse_importtime 的结果
+        top: 显示累计耗时最长的模块数
+
+    Returns:
+        str: 报告文本
+    """
+    total = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), None)
+    lines = [f"import {module}: 导入 {total * 1000:.0f} ms，含解释器启动共 {wall * 1000:.0f} ms"
+             if total is not None else f"import {module}: 含解释器启动共 {wall * 1000:.0f} ms"]
+
+    # 只列出顶层包，避免同一依赖的子模块刷屏
+    packages = {}
+    for name, _, cumulative, _ in entries:
+        if "." not in name:
+            packages[name] = max(packages.get(name, 0.0), cumulative)
+    lines.append(f"{'累计(ms)':>10}  顶层包")
+    for package, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{cumulative * 1000:>10.1f}  {package}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计模块导入耗时")
+    parser.add_argument("--module", default="informer.main", help="要导入的模块，默认informer.main")
+    parser.add_argument("--top", type=int, default=20, help="显示累计耗时最长的顶层包数量，默认20")
+    args = parser.parse_args()
+
+    wall, entries = measure_imports(args.module)
+    print(format_report(args.module, wall, entries, args.top))
+
+
+if __name__ == "__main__":
+    main()
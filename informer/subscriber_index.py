@@ -0,0 +1,121 @@
+"""
+有效订阅索引 - 按机器人预先整理未过期的用户，并用最小堆记录各用户的过期时间点，
+关键词匹配时只需比较一次时间即可确定是否有用户刚好到期
+"""
+
+import heapq
+import threading
+import time
+
+from loguru import logger
+
+from informer.expiration_manager import expiry_boundary
+
+
+class Subscriber:
+    """匹配用的用户条目，关键词预先转为小写"""
+
+    __slots__ = ("phone", "always_at", "keywords", "lower_keywords")
+
+    def __init__(self, phone, always_at, keywords):
+        self.phone = phone
+        self.always_at = always_at
+        self.keywords = tuple(keywords)
+        self.lower_keywords = tuple(keyword.lower() for keyword in self.keywords)
+
+
+def _robot_users(config):
+    """
+    读取机器人配置中的用户，兼容旧版 user_key_words
+
+    Returns:
+        list: (Subscriber, 过期日期或空字符串, 是否永久有效) 列表
+    """
+    users = []
+    if getattr(config, "users", None):
+        for user in config.users:
+            users.append((
+                Subscriber(user.phone, user.always_at, user.keywords or []),
+                getattr(user, "expire_date", "") or "",
+                getattr(user, "is_permanent", False),
+            ))
+    elif getattr(config, "user_key_words", None):
+        # 旧版配置没有有效期
+        for phone, keywords in config.user_key_words.items():
+            users.append((Subscriber(phone, False, keywords or []), "", True))
+    return users
+
+
+class ActiveSubscriberIndex:
+    """
+    各机器人的有效用户索引
+
+    构建时解析一次有效期；之后只在最早的过期时间点到达时才弹出堆顶、把对应用户移出有效列表。
+    配置变化（update_robots）时整体重建；configs、notifiers 与有效用户列表来自同一次构建，
+    匹配和发送都使用同一个索引时不会与新配置错位。
+    """
+
+    def __init__(self, robots_config, clock=None, notifiers=None):
+        """
+        构建索引
+
+        Args:
+            robots_config: 机器人配置列表，顺序与通知器中的机器人一致
+            clock: 提供time()的时钟，为空时使用time模块
+            notifiers: 与robots_config一一对应的发送通知的对象
+        """
+        self.clock = clock or time
+        self.configs = tuple(robots_config)
+        self.notifiers = tuple(notifiers) if notifiers is not None else (None,) * len(self.configs)
+        self._lock = threading.Lock()
+        self._heap = []  # (过期时间戳, 机器人索引, 用户序号)
+        self._users = []  # 每个机器人的 {用户序号: Subscriber}，保持配置中的顺序
+        self._active = []  # 每个机器人当前有效的用户元组
+        now = self.clock.time()
+
+        for robot_idx, config in enumerate(self.configs):
+            active = {}
+            for position, (subscriber, expire_date, is_permanent) in enumerate(_robot_users(config)):
+                if not is_permanent and expire_date:
+                    try:
+                        boundary = expiry_boundary(expire_date)
+                    except ValueError:
+                        # 与 ExpirationManager.is_user_expired 一致，日期无法解析时视为有效
+                        logger.warning(f"机器人 [{config.name}] 用户 {subscriber.phone} 的有效期格式不正确: {expire_date}")
+                        boundary = None
+                    if boundary is not None:
+                        if boundary <= now:
+                            continue
+                        self._heap.append((boundary, robot_idx, position))
+                active[position] = subscriber
+            self._users.append(active)
+            self._active.append(tuple(active.values()))
+
+        heapq.heapify(self._heap)
+        self._next_boundary = self._heap[0][0] if self._heap else float("inf")
+
+    def _expire(self, now):
+        """把过期时间点已到的用户移出有效列表"""
+        with self._lock:
+            changed = set()
+            while self._heap and self._heap[0][0] <= now:
+                _, robot_idx, position = heapq.heappop(self._heap)
+                subscriber = self._users[robot_idx].pop(position, None)
+                if subscriber is not None:
+                    changed.add(robot_idx)
+                    logger.info(f"用户 {subscriber.phone} 的订阅已到期，不再参与关键词匹配")
+            for robot_idx in changed:
+                self._active[robot_idx] = tuple(self._users[robot_idx].values())
+            self._next_boundary = self._heap[0][0] if self._heap else float("inf")
+
+    def current(self):
+        """
+        获取各机器人当前有效的用户，每条消息调用一次；只有最早的过期时间点已到时才会修改索引
+
+        Returns:
+            list: 按机器人索引排列的 Subscriber 元组，元组内按配置中的顺序排列
+        """
+        now = self.clock.time()
+        if now >= self._next_boundary:
+            self._expire(now)
+        return self._active
@@ -0,0 +1,364 @@
+"""
+订阅批量导入导出模块 - 解析和校验 机器人 × 用户 × 关键词 的批量数据，并在一次配置修改中应用；
+以及为Web界面提供分页查询
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from informer.config_store import ConfigUpdateError
+
+# 批量数据的列，每行对应一个 (机器人, 用户, 关键词)，导出和导入使用相同的格式
+FIELDS = ["robot", "phone", "keyword", "action", "always_at", "is_permanent", "expire_date"]
+ACTIONS = ("add", "delete")
+MAX_ROWS = 50000
+_TRUE_VALUES = ("1", "true", "yes", "y", "是")
+_FALSE_VALUES = ("0", "false", "no", "n", "否", "")
+
+
+class SubscriptionImportError(ConfigUpdateError):
+    """批量数据校验失败，errors为 [(行号, 错误信息)]，任何一行有错误时整批都不会应用"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        summary = "；".join(f"第{line}行: {message}" for line, message in errors[:5])
+        if len(errors) > 5:
+            summary += f"；另有{len(errors) - 5}处错误"
+        super().__init__(f"导入数据有 {len(errors)} 处错误: {summary}")
+
+
+def _parse_bool(value, default):
+    """解析CSV和JSON中的布尔值，无法识别时返回None"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return default if text == "" else False
+    return None
+
+
+def parse_rows(data, fmt):
+    """
+    解析批量数据
+
+    Args:
+        data: CSV文本，或JSON文本/已解析的JSON对象（行列表，或包含rows字段的对象）
+        fmt: 数据格式，"csv" 或 "json"
+
+    Returns:
+        list: (行号, 行字典) 列表，CSV的行号从表头之后的第2行开始
+
+    Raises:
+        SubscriptionImportError: 数据格式无法解析
+    """
+    if fmt == "csv":
+        if isinstance(data, bytes):
+            data = data.decode("utf-8-sig")
+        reader = csv.DictReader(io.StringIO(data.lstrip("﻿")))
+        if not reader.fieldnames or "robot" not in reader.fieldnames or "phone" not in reader.fieldnames:
+            raise SubscriptionImportError([(1, f"CSV表头至少需要包含 robot 和 phone 列，可用列: {','.join(FIELDS)}")])
+        rows = list(enumerate(reader, start=2))
+    elif fmt == "json":
+        if isinstance(data, (str, bytes)):
+            try:
+                data = json.loads(data)
+            except ValueError as e:
+                raise SubscriptionImportError([(1, f"JSON格式错误: {e}")])
+        rows = data.get("rows") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise SubscriptionImportError([(1, "JSON数据应为行列表，或包含rows字段的对象")])
+        rows = list(enumerate(rows, start=1))
+    else:
+        raise SubscriptionImportError([(1, f"不支持的格式: {fmt}")])
+
+    if len(rows) > MAX_ROWS:
+        raise SubscriptionImportError([(1, f"单次最多导入 {MAX_ROWS} 行，当前 {len(rows)} 行")])
+    return rows
+
+
+def validate_rows(rows, robot_names):
+    """
+    一次性校验所有行，收集全部错误后再决定是否应用
+
+    Args:
+        rows: parse_rows 返回的 (行号, 行字典) 列表
+        robot_names: 配置中现有的机器人名称集合
+
+    Returns:
+        list: 规范化后的行字典列表
+
+    Raises:
+        SubscriptionImportError: 任意一行校验失败
+    """
+    errors = []
+    normalized = []
+    for line, row in rows:
+        if not isinstance(row, dict):
+            errors.append((line, "每一行应为对象"))
+            continue
+
+        robot = str(row.get("robot") or "").strip()
+        phone = str(row.get("phone") or "").strip()
+        keyword = str(row.get("keyword") or "").strip()
+        action = str(row.get("action") or "add").strip().lower()
+        always_at = _parse_bool(row.get("always_at"), None)
+        is_permanent = _parse_bool(row.get("is_permanent"), None)
+        expire_date = str(row.get("expire_date") or "").strip()
+
+        if not robot:
+            errors.append((line, "机器人名称不能为空"))
+        elif robot not in robot_names:
+            errors.append((line, f"机器人不存在: {robot}"))
+        if not phone.isdigit() or len(phone) != 11:
+            errors.append((line, f"手机号格式不正确: {phone}"))
+        if action not in ACTIONS:
+            errors.append((line, f"不支持的操作: {action}，可选 {'/'.join(ACTIONS)}"))
+        elif action == "delete" and not keyword:
+            errors.append((line, "删除操作需要指定关键词"))
+        if row.get("always_at") not in (None, "") and always_at is None:
+            errors.append((line, f"always_at 无法识别: {row.get('always_at')}"))
+        if row.get("is_permanent") not in (None, "") and is_permanent is None:
+            errors.append((line, f"is_permanent 无法识别: {row.get('is_permanent')}"))
+        if expire_date:
+            try:
+                datetime.strptime(expire_date, "%Y-%m-%d")
+            except ValueError:
+                errors.append((line, f"有效期格式应为YYYY-MM-DD: {expire_date}"))
+
+        normalized.append({
+            "robot": robot,
+            "phone": phone,
+            "keyword": keyword,
+            "action": action,
+            "always_at": always_at,
+            "is_permanent": is_permanent,
+            "expire_date": expire_date,
+        })
+
+    if errors:
+        raise SubscriptionImportError(errors)
+    return normalized
+
+
+def apply_rows(config, rows, mode="merge"):
+    """
+    将批量数据应用到配置字典，所有行先校验再修改，校验失败时配置保持不变
+
+    Args:
+        config: 可修改的配置字典
+        rows: parse_rows 返回的 (行号, 行字典) 列表
+        mode: merge 在现有关键词基础上增删；replace 用本批数据替换涉及用户的关键词列表
+
+    Returns:
+        dict: 各类修改的数量统计
+
+    Raises:
+        SubscriptionImportError: 数据校验失败
+    """
+    if mode not in ("merge", "replace"):
+        raise SubscriptionImportError([(1, f"不支持的导入模式: {mode}，可选 merge/replace")])
+
+    robots = {}
+    for robot in (config.get("dingtalk") or {}).get("robots") or []:
+        # 重名的机器人以第一个为准，与界面显示顺序一致
+        robots.setdefault(robot.get("name"), robot)
+    rows = validate_rows(rows, set(robots))
+
+    stats = {"rows": len(rows), "users_created": 0, "users_updated": 0,
+             "keywords_added": 0, "keywords_removed": 0, "unchanged": 0}
+    replaced = set()
+    for row in rows:
+        robot = robots[row["robot"]]
+        if not robot.get("users"):
+            robot["users"] = {}
+        users = robot["users"]
+        user = users.get(row["phone"])
+        if user is None and row["action"] != "add":
+            # 删除不存在的用户的关键词不需要修改配置，也不应凭空创建用户
+            stats["unchanged"] += 1
+            continue
+        if user is None:
+            user = users[row["phone"]] = {
+                "always_at": False,
+                "keywords": [],
+                "expire_date": "",
+                "is_permanent": True,
+            }
+            stats["users_created"] += 1
+        keywords = user.setdefault("keywords", [])
+
+        key = (row["robot"], row["phone"])
+        if mode == "replace" and key not in replaced:
+            replaced.add(key)
+            stats["keywords_removed"] += len(keywords)
+            keywords.clear()
+
+        updated = False
+        for field in ("always_at", "is_permanent"):
+            if row[field] is not None and user.get(field) != row[field]:
+                user[field] = row[field]
+                updated = True
+        if row["expire_date"] and user.get("expire_date") != row["expire_date"]:
+            user["expire_date"] = row["expire_date"]
+            updated = True
+        if updated:
+            stats["users_updated"] += 1
+
+        keyword = row["keyword"]
+        if not keyword:
+            continue
+        if row["action"] == "add":
+            if keyword in keywords:
+                stats["unchanged"] += 1
+            else:
+                keywords.append(keyword)
+                stats["keywords_added"] += 1
+        elif keyword in keywords:
+            keywords.remove(keyword)
+            stats["keywords_removed"] += 1
+        else:
+            stats["unchanged"] += 1
+    return stats
+
+
+def iter_rows(config):
+    """
+    按导入格式遍历配置中的全部订阅，没有关键词的用户输出一行空关键词
+
+    Args:
+        config: 配置字典或只读视图
+
+    Yields:
+        dict: 行字典
+    """
+    for robot in (config.get("dingtalk") or {}).get("robots") or []:
+        for phone, user in (robot.get("users") or {}).items():
+            for keyword in user.get("keywords") or [""]:
+                yield {
+                    "robot": robot.get("name", ""),
+                    "phone": str(phone),
+                    "keyword": keyword,
+                    "action": "add",
+                    "always_at": bool(user.get("always_at", False)),
+                    "is_permanent": bool(user.get("is_permanent", True)),
+                    "expire_date": user.get("expire_date", "") or "",
+                }
+
+
+def export_csv(config):
+    """
+    逐行生成CSV导出内容
+
+    Args:
+        config: 配置字典或只读视图
+
+    Yields:
+        str: CSV文本片段
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    # 带BOM便于Excel识别编码
+    buffer.write("﻿")
+    writer.writeheader()
+    for row in iter_rows(config):
+        writer.writerow(row)
+        if buffer.tell() >= 8192:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_json(config):
+    """
+    逐行生成JSON导出内容，格式为可直接重新导入的行列表
+
+    Args:
+        config: 配置字典或只读视图
+
+    Yields:
+        str: JSON文本片段
+    """
+    yield "["
+    separator = "\n"
+    for row in iter_rows(config):
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def robot_summaries(config):
+    """
+    机器人列表摘要，不包含用户详情
+
+    Args:
+        config: 配置字典或只读视图
+
+    Returns:
+        list: 机器人摘要字典列表
+    """
+    summaries = []
+    for index, robot in enumerate((config.get("dingtalk") or {}).get("robots") or []):
+        users = robot.get("users") or {}
+        summaries.append({
+            "index": index,
+            "name": robot.get("name", ""),
+            "enabled": bool(robot.get("enabled", True)),
+            "receive_all": bool(robot.get("receive_all", True)),
+            "user_count": len(users),
+            "keyword_count": sum(len(user.get("keywords") or []) for user in users.values()),
+        })
+    return summaries
+
+
+def query_users(config, robot_index=None, phone="", keyword="", today=None):
+    """
+    按条件筛选用户
+
+    Args:
+        config: 配置字典或只读视图
+        robot_index: 机器人索引，为None时查询所有机器人
+        phone: 手机号片段，为空时不筛选
+        keyword: 关键词片段（不区分大小写），为空时不筛选；用户任一关键词包含该片段即匹配
+        today: 判断过期使用的当前日期字符串（YYYY-MM-DD），默认为今天
+
+    Returns:
+        list: 用户字典列表，按机器人和配置中的顺序排列
+    """
+    robots = (config.get("dingtalk") or {}).get("robots") or []
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    keyword = keyword.lower()
+    indexes = range(len(robots)) if robot_index is None else [robot_index]
+
+    results = []
+    for index in indexes:
+        if index < 0 or index >= len(robots):
+            continue
+        robot = robots[index]
+        for user_phone, user in (robot.get("users") or {}).items():
+            user_phone = str(user_phone)
+            keywords = list(user.get("keywords") or [])
+            if phone and phone not in user_phone:
+                continue
+            if keyword and not any(keyword in str(item).lower() for item in keywords):
+                continue
+            is_permanent = user.get("is_permanent", True)
+            expire_date = user.get("expire_date", "") or ""
+            results.append({
+                "robot_index": index,
+                "robot": robot.get("name", ""),
+                "phone": user_phone,
+                "keywords": keywords,
+                "always_at": bool(user.get("always_at", False)),
+                "is_permanent": bool(is_permanent),
+                "expire_date": expire_date,
+                # 与页面原来的判断一致：非永久且有效期早于今天
+                "expired": is_permanent is not True and bool(expire_date) and today > expire_date,
+            })
+    return results
@@ -0,0 +1,185 @@
+"""
+Web服务模块 - 使用多线程WSGI服务器运行配置界面，并提供gzip压缩和静态资源缓存
+"""
+
+import gzip
+import os
+
+from loguru import logger
+
+# waitress为可选依赖，未安装时使用Werkzeug的多线程服务器
+try:
+    from waitress.server import create_server as create_waitress_server
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+# 只压缩文本类响应，图片等已压缩的格式压缩收益很小
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def _accepts_gzip(request):
+    """客户端是否接受gzip编码"""
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def setup_compression(app, min_size=1024, level=6):
+    """
+    为应用注册gzip压缩，流式响应（如订阅导出）保持不压缩以便边生成边发送
+
+    Args:
+        app: Flask应用
+        min_size: 小于该字节数的响应不压缩
+        level: gzip压缩级别
+    """
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+        # 只压缩完整的200响应；206等分段响应的Content-Range针对原始字节，压缩后会错位
+        if (not _accepts_gzip(request)
+                or response.status_code != 200
+                or "Content-Range" in response.headers
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        # 静态文件以文件对象直接传递，读入内存后压缩；其他流式响应保持原样
+        if response.direct_passthrough:
+            response.direct_passthrough = False
+        elif response.is_streamed:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers["Content-Encoding"] = "gzip"
+        # 压缩后的内容与原内容字节不同，强ETag改为弱ETag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def setup_static_cache(app, max_age):
+    """
+    为静态文件设置长期缓存：url_for生成的静态文件地址带上文件修改时间，文件更新后地址随之变化
+
+    Args:
+        app: Flask应用
+        max_age: 浏览器缓存时间（秒）
+    """
+    from flask import request
+
+    app.config["SEND_FILE_MAX_AGE_DEFAULT"] = max_age
+    versions = {}  # 文件名 -> (修改时间, 版本号)
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint != "static" or "v" in values or not values.get("filename"):
+            return
+        path = os.path.join(app.static_folder, values["filename"])
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        cached = versions.get(values["filename"])
+        if not cached or cached[0] != mtime:
+            cached = versions[values["filename"]] = (mtime, format(mtime // 1_000_000, "x"))
+        values["v"] = cached[1]
+
+    @app.after_request
+    def mark_static_immutable(response):
+        # 带版本号的地址内容不会变化，浏览器无需重新验证
+        if request.endpoint == "static" and request.args.get("v") and response.status_code == 200:
+            response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+        return response
+
+
+class WebServer:
+    """可在收到停止信号后关闭的WSGI服务器"""
+
+    def __init__(self, app, config):
+        """
+        初始化Web服务器
+
+        Args:
+            app: Flask应用
+            config: WebConfig配置
+        """
+        self.config = config
+        self.closed = False
+        backend = config.server
+        if backend == "auto" and WAITRESS_AVAILABLE:
+            backend = "waitress"
+        if backend in ("auto", "waitress") and not WAITRESS_AVAILABLE:
+            logger.warning("无法导入waitress，改用Werkzeug多线程服务器（不建议在生产环境使用）。请运行 'pip install -r requirements.txt'")
+            backend = "development"
+        if backend not in ("waitress", "development"):
+            raise ValueError(f"不支持的Web服务器: {config.server}")
+        self.backend = backend
+
+        if backend == "waitress":
+            self.server = create_waitress_server(
+                app,
+                host=config.host,
+                port=config.port,
+                threads=config.threads,
+                connection_limit=config.connection_limit,
+                channel_timeout=config.channel_timeout,
+                ident="informer",
+            )
+        else:
+            from werkzeug.serving import make_server
+            # 开发服务器为每个请求创建一个线程，threads只对waitress生效
+            self.server = make_server(config.host, config.port, app, threaded=True)
+
+    def serve_forever(self):
+        """处理请求直到收到KeyboardInterrupt或SystemExit"""
+        threads = f"{self.config.threads}线程" if self.backend == "waitress" else "每个请求一个线程"
+        logger.info(f"Web服务器已启动（{self.backend}，{threads}），请访问 http://{self.config.host}:{self.config.port}")
+        if self.backend == "waitress":
+            self.server.run()
+        else:
+            self.server.serve_forever()
+
+    def close(self):
+        """关闭监听端口并停止处理线程"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.backend == "waitress":
+                self.server.close()
+            else:
+                self.server.server_close()
+        except Exception as e:
+            logger.error(f"关闭Web服务器时出错: {e}")
+        logger.info("Web服务器已停止")
+
+
+def create_server(app, config):
+    """
+    按配置注册压缩和静态缓存，并创建Web服务器
+
+    Args:
+        app: Flask应用
+        config: WebConfig配置
+
+    Returns:
+        WebServer: 尚未开始处理请求的服务器
+    """
+    if config.gzip:
+        setup_compression(app, config.gzip_min_size)
+    if config.static_max_age:
+        setup_static_cache(app, config.static_max_age)
+    return WebServer(app, config)
@@ -0,0 +1,101 @@
+"""配置存储的合并写入和原子替换测试"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import yaml
+
+from informer.config import DingTalkRobot
+from informer.config_store import ConfigStore
+
+CONFIG = {
+    "cookies": "a=1",
+    "dingtalk": {"robots": [{
+        "name": "机器人A",
+        "token": "token-a",
+        "secret": "secret-a",
+        "enabled": True,
+        "receive_all": False,
+        "users": {"13800000000": {"keywords": ["4090"], "always_at": False,
+                                  "expire_date": "", "is_permanent": True}},
+    }]},
+}
+
+
+def add_keyword(keyword):
+    def mutation(config):
+        config["dingtalk"]["robots"][0]["users"]["13800000000"]["keywords"].append(keyword)
+    return mutation
+
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.yaml")
+        with open(self.path, "w", encoding="utf-8") as f:
+            yaml.dump(CONFIG, f, allow_unicode=True, sort_keys=False)
+        self.changed = threading.Event()
+        self.robots = []
+        self.store = ConfigStore(self.path, debounce=0.05, max_delay=1.0, on_robots_changed=self.on_robots_changed)
+
+    def tearDown(self):
+        self.store.flush()
+        self.directory.cleanup()
+
+    def on_robots_changed(self, robots):
+        self.robots.append(robots)
+        self.changed.set()
+
+    def read_keywords(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        return data["dingtalk"]["robots"][0]["users"]["13800000000"]["keywords"]
+
+    def test_flush_writes_temp_file_and_replaces(self):
+        self.store.update(add_keyword("3080"))
+        with mock.patch("informer.config_store.os.fsync", wraps=os.fsync) as fsync, \
+                mock.patch("informer.config_store.os.replace", wraps=os.replace) as replace:
+            self.assertTrue(self.store.flush())
+        fsync.assert_called_once()
+        replace.assert_called_once_with(f"{self.path}.tmp", self.path)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        self.assertEqual(self.read_keywords(), ["4090", "3080"])
+
+    def test_falls_back_to_in_place_write_when_replace_fails(self):
+        self.store.update(add_keyword("3080"))
+        with mock.patch("informer.config_store.os.replace", side_effect=OSError("Device or resource busy")):
+            self.assertTrue(self.store.flush())
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        self.assertEqual(self.read_keywords(), ["4090", "3080"])
+
+    def test_updates_within_debounce_are_written_once(self):
+        with mock.patch.object(self.store, "_write", wraps=self.store._write) as write:
+            for keyword in ("3080", "3090", "5090"):
+                self.store.update(add_keyword(keyword))
+            self.assertEqual(self.read_keywords(), ["4090"])
+            self.assertEqual(self.store.get()["dingtalk"]["robots"][0]["users"]["13800000000"]["keywords"],
+                             ("4090", "3080", "3090", "5090"))
+            self.assertTrue(self.changed.wait(2))
+        write.assert_called_once()
+        self.assertEqual(self.read_keywords(), ["4090", "3080", "3090", "5090"])
+
+    def test_robots_changed_callback_receives_robot_configs(self):
+        self.store.update(add_keyword("3080"))
+        self.assertTrue(self.store.flush())
+        self.assertEqual(len(self.robots), 1)
+        robot = self.robots[0][0]
+        self.assertIsInstance(robot, DingTalkRobot)
+        self.assertEqual(robot.name, "机器人A")
+        self.assertEqual(robot.users[0].keywords, ["4090", "3080"])
+
+    def test_non_robot_update_skips_callback(self):
+        self.store.update(lambda config: config.update(cookies="a=2"), robots=False)
+        self.assertTrue(self.store.flush())
+        self.assertEqual(self.robots, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
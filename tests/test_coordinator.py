@@ -0,0 +1,65 @@
+"""多实例协调器的租约心跳测试"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+from informer.config import CoordinationConfig
+from informer.coordinator import Coordinator
+from informer.database import Database
+
+
+class FlakyLeaseDatabase:
+    """第一次获取租约时抛出异常，之后正常返回"""
+
+    def __init__(self):
+        self.calls = 0
+        self.renewed = threading.Event()
+
+    def acquire_lease(self, name, holder, ttl):
+        self.calls += 1
+        if self.calls == 1:
+            raise OperationalError("UPDATE leader_leases", {}, Exception("database is locked"))
+        if self.calls >= 3:
+            self.renewed.set()
+        return True
+
+    def release_lease(self, name, holder):
+        pass
+
+
+class HeartbeatTest(unittest.TestCase):
+    def test_heartbeat_survives_lease_error(self):
+        database = FlakyLeaseDatabase()
+        coordinator = Coordinator(database, CoordinationConfig(enabled=True, heartbeat_interval=0.01))
+        coordinator.start()
+        try:
+            self.assertTrue(database.renewed.wait(2))
+            self.assertTrue(coordinator.is_leader())
+        finally:
+            coordinator.stop()
+
+
+class AcquireLeaseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = Database(os.path.join(self.directory.name, "posts.db"))
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+    def test_insert_error_returns_false_and_recovers(self):
+        error = OperationalError("INSERT INTO leader_leases", {}, Exception("database is locked"))
+        with mock.patch.object(self.database.session, "commit", side_effect=error):
+            self.assertFalse(self.database.acquire_lease("monitor", "a", 15))
+        self.assertTrue(self.database.acquire_lease("monitor", "a", 15))
+        self.assertFalse(self.database.acquire_lease("monitor", "b", 15))
+
+
+if __name__ == "__main__":
+    unittest.main()
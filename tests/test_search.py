@@ -0,0 +1,63 @@
+"""帖子归档全文搜索的分词和查询测试"""
+
+import os
+import tempfile
+import unittest
+
+from informer.database import Database
+from informer.search import build_match_query, segment
+
+
+class SegmentTest(unittest.TestCase):
+    def test_model_numbers_split_on_letter_digit_boundaries(self):
+        self.assertEqual(segment("RTX4090D"), "rtx 4090 d")
+        self.assertEqual(segment("出4090FE"), "出 4090 fe")
+
+    def test_cjk_bigrams_with_trailing_unigrams(self):
+        self.assertEqual(segment("显卡价格"), "显卡 卡价 价格 显 卡 价 格")
+
+    def test_query_expression(self):
+        self.assertEqual(build_match_query("RTX4090 -求购"), '("rtx 4090") NOT ("求购")')
+        self.assertIsNone(build_match_query("-求购"))
+
+
+class SearchPostsTest(unittest.TestCase):
+    POSTS = [
+        ("1", "出4090FE 公版", "自用一个月"),
+        ("2", "收 RTX4090D 显卡", "预算一万"),
+        ("3", "出 索尼 A7M4 相机", "快门三千次"),
+        ("4", "出 RTX 3080 显卡", "矿卡勿扰"),
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = Database(os.path.join(self.directory.name, "posts.db"))
+        rows = [{"forum": "二手", "post_id": post_id, "title": title, "url": f"http://x/{post_id}",
+                 "body_length": len(body)} for post_id, title, body in self.POSTS]
+        documents = [(title, "", body) for _, title, body in self.POSTS]
+        self.database.archive_posts(rows, documents)
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+    def search(self, query):
+        return sorted(post["post_id"] for post in self.database.search_posts(query)["posts"])
+
+    def test_number_inside_model_string(self):
+        self.assertEqual(self.search("4090"), ["1", "2"])
+        self.assertEqual(self.search("RTX4090"), ["2"])
+        self.assertEqual(self.search("4090 FE"), ["1"])
+
+    def test_chinese_terms(self):
+        self.assertEqual(self.search("显卡"), ["2", "4"])
+        self.assertEqual(self.search("卡"), ["2", "4"])
+        self.assertEqual(self.search("显卡 -收"), ["4"])
+
+    def test_rebuild_keeps_results(self):
+        self.assertEqual(self.database.rebuild_search_index(), len(self.POSTS))
+        self.assertEqual(self.search("a7m4"), ["3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""有效订阅索引的到期、重建和匹配快照测试"""
+
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from informer.config import DingTalkRobot, UserConfig
+from informer.expiration_manager import expiry_boundary
+from informer.notifier import MultiRobotNotifier
+from informer.subscriber_index import ActiveSubscriberIndex
+
+
+class FakeClock:
+    """手动拨动的时钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def robot(name, users, receive_all=False):
+    return DingTalkRobot(name=name, token=f"token-{name}", secret=f"secret-{name}",
+                         receive_all=receive_all, users=users)
+
+
+class ExpiryTest(unittest.TestCase):
+    def test_user_expires_at_local_midnight_after_expire_date(self):
+        boundary = expiry_boundary("2026-03-01")
+        self.assertEqual(datetime.fromtimestamp(boundary), datetime(2026, 3, 2))
+
+        clock = FakeClock(boundary - 1)
+        index = ActiveSubscriberIndex([robot("A", [
+            UserConfig("1", ["4090"], expire_date="2026-03-01"),
+            UserConfig("2", ["4090"], is_permanent=True),
+        ])], clock)
+        self.assertEqual([user.phone for user in index.current()[0]], ["1", "2"])
+
+        clock.now = boundary
+        self.assertEqual([user.phone for user in index.current()[0]], ["2"])
+        self.assertEqual(index._next_boundary, float("inf"))
+
+    def test_already_expired_and_invalid_dates(self):
+        index = ActiveSubscriberIndex([robot("A", [
+            UserConfig("1", ["4090"], expire_date="2026-03-01"),
+            UserConfig("2", ["4090"], expire_date="下个月"),
+        ])], FakeClock(expiry_boundary("2026-03-01")))
+        # 已过期的用户不进入索引，日期无法解析时视为有效
+        self.assertEqual([user.phone for user in index.current()[0]], ["2"])
+
+
+class MultiRobotNotifierIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(expiry_boundary("2026-03-01") - 1)
+        self.robots = [
+            robot("A", [UserConfig("1", ["4090"], is_permanent=True)]),
+            robot("B", [UserConfig("2", ["4090"], is_permanent=True)]),
+        ]
+        self.notifier = MultiRobotNotifier(self.robots, self.clock)
+
+    def test_index_rebuilt_when_robots_change(self):
+        index = self.notifier.subscribers
+        self.assertFalse(self.notifier.update_robots(list(self.robots)))
+        self.assertIs(self.notifier.subscribers, index)
+
+        changed = [self.robots[0], robot("B", [UserConfig("3", ["4090"], expire_date="2026-03-01")])]
+        self.assertTrue(self.notifier.update_robots(changed))
+        self.assertIsNot(self.notifier.subscribers, index)
+        self.assertEqual(self.notifier.match_keyword_to_robot("出4090"), [(0, ["1"], []), (1, ["3"], [])])
+
+        self.clock.now += 1
+        self.assertEqual(self.notifier.match_keyword_to_robot("出4090"), [(0, ["1"], [])])
+
+    def test_send_uses_the_index_it_matched_against(self):
+        old_notifiers = [r["notifier"] for r in self.notifier.robots]
+        match = self.notifier.match_keyword_to_robot
+
+        def match_then_reorder(title, index=None):
+            matches = match(title, index)
+            # 匹配完成后、发送之前配置被改为相反顺序
+            self.notifier.update_robots(list(reversed(self.robots)))
+            return matches
+
+        sent = []
+        with mock.patch.object(self.notifier, "match_keyword_to_robot", side_effect=match_then_reorder):
+            for notifier in old_notifiers:
+                mock.patch.object(notifier, "send_text_notification",
+                                  side_effect=lambda title, message, at, name=notifier.name:
+                                  sent.append((name, at)) or True).start()
+            self.addCleanup(mock.patch.stopall)
+            self.assertTrue(self.notifier.send_notification_by_keyword_match("标题", "内容", "出4090"))
+
+        self.assertEqual([config.name for config in self.notifier.subscribers.configs], ["B", "A"])
+        self.assertEqual(sent, [("A", ["1"]), ("B", ["2"])])
+
+
+if __name__ == "__main__":
+    unittest.main()